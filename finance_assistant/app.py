@@ -3,13 +3,80 @@ import json
 import sqlite3
 from datetime import datetime
 import os
+from app.banking.anomaly_detector import StreamingAnomalyDetector
+from app.banking.categorizer import KeywordCategorizer, load_categories
+from app.banking.csv_importer import CSVImportError, CSVTransactionImporter
+from app.banking.batch_validator import validate_transaction, validate_transaction_batch
+from app.database.connection import existing_connection, get_connection
+from app.database.writer import GroupCommitWriter
+from app.database.migrations import migrate
+from app.database.rollups import fetch_user_rollups, summarize_rollups, RAW_SCHEMA
+from app.monitoring.middleware import init_metrics
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'finance-assistant-secret-key'
 
+# Per-route latency and SQL metrics, scraped from /metrics
+init_metrics(app)
+
+# Running per-user/category stats so new expenses are scored without rescanning history
+anomaly_detector = StreamingAnomalyDetector()
+
+# Shared description categorizer for imports and bulk posts
+categorizer = KeywordCategorizer(load_categories())
+
+# Bank statement CSV importer (streams the upload in chunks)
+csv_importer = CSVTransactionImporter(categorizer)
+
+# All transaction inserts go through one writer thread that group-commits them
+transaction_writer = GroupCommitWriter()
+MAX_BULK_TRANSACTIONS = 10000
+
+INSERT_TRANSACTION_SQL = '''
+    INSERT INTO transactions (user_id, amount, type, category, description)
+    VALUES (?, ?, ?, ?, ?)
+'''
+INSERT_DATED_TRANSACTION_SQL = '''
+    INSERT INTO transactions (user_id, amount, type, category, description, date)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+SEED_ANOMALY_STATS_SQL = '''
+    SELECT COUNT(*), SUM(amount), SUM(amount * amount)
+    FROM transactions
+    WHERE user_id = ? AND type = 'expense' AND category = ?
+'''
+
+def insert_and_score(values):
+    """Insert one validated transaction and score it against the running stats
+    
+    Seeding the stats from history, the insert and folding the amount in all
+    run in one writer transaction, so two concurrent first expenses of a
+    category can neither miss nor double-count each other.
+    """
+    user_id, amount, transaction_type, category, _ = values
+    is_expense = transaction_type == 'expense'
+    
+    def write(cursor):
+        # Seeded from history before this row is part of it
+        if is_expense and not anomaly_detector.is_seeded(user_id, category):
+            cursor.execute(SEED_ANOMALY_STATS_SQL, (user_id, category))
+            anomaly_detector.seed(user_id, category, *cursor.fetchone())
+        cursor.execute(INSERT_TRANSACTION_SQL, values)
+        transaction_id = cursor.lastrowid
+        anomaly = anomaly_detector.observe(user_id, category, amount, transaction_id) if is_expense else None
+        return transaction_id, anomaly
+    
+    try:
+        return transaction_writer.call(write)
+    except Exception:
+        # The amount may be counted for a row that was rolled back: re-seed next time
+        anomaly_detector.forget_user(user_id)
+        raise
+
 # Initialize SQLite database
 def init_db():
-    conn = sqlite3.connect('finance.db')
+    conn = get_connection()
     c = conn.cursor()
     
     # Users table
@@ -39,9 +106,21 @@ def init_db():
     ''')
     
     conn.commit()
-    conn.close()
+    
+    # Versioned schema changes: rollups, composite indexes, ...
+    migrate(conn, RAW_SCHEMA)
     print("✅ Database initialized successfully!")
 
+@app.teardown_request
+def rollback_unfinished(exc):
+    """Pooled connections outlive the request, so never leak a half-done write
+    
+    Requests that never touched the database (e.g. /metrics) open nothing here.
+    """
+    conn = existing_connection()
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -55,8 +134,11 @@ def api_info():
         'endpoints': {
             '/api/register': 'POST - Register new user',
             '/api/transactions': 'POST - Add transaction',
+            '/api/transactions/bulk': 'POST - Add up to 10000 transactions in one call',
+            '/api/transactions/import': 'POST - Import bank statement CSV (multipart: file, user_id)',
             '/api/analysis/<user_id>': 'GET - Get spending analysis',
-            '/api/chat': 'POST - Chat with finance assistant'
+            '/api/chat': 'POST - Chat with finance assistant',
+            '/metrics': 'GET - Request, SQL and engine metrics (Prometheus text format)'
         }
     })
 
@@ -68,7 +150,7 @@ def register():
         if not data or not all(k in data for k in ['email', 'password', 'first_name', 'last_name']):
             return jsonify({'success': False, 'message': 'Missing required fields'}), 400
         
-        conn = sqlite3.connect('finance.db')
+        conn = get_connection()
         c = conn.cursor()
         
         c.execute(
@@ -78,7 +160,6 @@ def register():
         
         conn.commit()
         user_id = c.lastrowid
-        conn.close()
         
         return jsonify({
             'success': True,
@@ -99,47 +180,103 @@ def add_transaction():
         if not data or not all(k in data for k in ['user_id', 'amount', 'type', 'category']):
             return jsonify({'success': False, 'message': 'Missing required fields'}), 400
         
-        conn = sqlite3.connect('finance.db')
-        c = conn.cursor()
+        values, errors = validate_transaction(data, categorizer)
+        if errors:
+            return jsonify({'success': False, 'message': 'Invalid transaction: ' + ', '.join(errors)}), 400
         
-        c.execute('''
-            INSERT INTO transactions (user_id, amount, type, category, description)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (data['user_id'], data['amount'], data['type'], data['category'], data.get('description', '')))
+        # Group-committed with any other inserts arriving concurrently
+        transaction_id, anomaly = insert_and_score(values)
         
-        conn.commit()
-        conn.close()
+        return jsonify({
+            'success': True,
+            'message': 'Transaction added successfully',
+            'transaction_id': transaction_id,
+            'anomaly': anomaly
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@app.route('/api/transactions/bulk', methods=['POST'])
+def add_transactions_bulk():
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('transactions'), list):
+            return jsonify({'success': False, 'message': 'Missing transactions list'}), 400
+        
+        records = data['transactions']
+        if len(records) > MAX_BULK_TRANSACTIONS:
+            return jsonify({
+                'success': False,
+                'message': f'At most {MAX_BULK_TRANSACTIONS} transactions per request'
+            }), 413
+        if not all(isinstance(record, dict) for record in records):
+            return jsonify({'success': False, 'message': 'Each transaction must be an object'}), 400
+        
+        # Column-wise validation and batch categorization, then one transaction
+        rows, results = validate_transaction_batch(records, categorizer, data.get('user_id'))
+        if rows:
+            transaction_ids = transaction_writer.execute_many(
+                INSERT_DATED_TRANSACTION_SQL, [row for _, row in rows]
+            )
+            for (index, row), transaction_id in zip(rows, transaction_ids):
+                results[index]['transaction_id'] = transaction_id
+            for user_id in {row[0] for _, row in rows}:
+                anomaly_detector.forget_user(user_id)
         
-        return jsonify({'success': True, 'message': 'Transaction added successfully'})
+        return jsonify({
+            'success': True,
+            'inserted': len(rows),
+            'rejected': len(records) - len(rows),
+            'results': results
+        })
     
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
 
-@app.route('/api/analysis/<int:user_id>')
-def analyze_spending(user_id):
+@app.route('/api/transactions/import', methods=['POST'])
+def import_transactions():
     try:
-        conn = sqlite3.connect('finance.db')
-        c = conn.cursor()
+        upload = request.files.get('file')
+        user_id = request.form.get('user_id', type=int)
+        # Set from a failed import's resume_line to import only the rest of the file
+        start_line = request.form.get('start_line', type=int)
         
-        # Get spending by category
-        c.execute('''
-            SELECT category, SUM(amount) as total 
-            FROM transactions 
-            WHERE user_id = ? AND type = 'expense'
-            GROUP BY category
-        ''', (user_id,))
+        if upload is None or user_id is None:
+            return jsonify({'success': False, 'message': 'Missing file or user_id'}), 400
         
-        spending_data = c.fetchall()
-        spending_by_category = {row[0]: abs(row[1]) for row in spending_data}
+        conn = get_connection()
+        try:
+            summary = csv_importer.import_file(conn, upload.stream, user_id, start_line=start_line)
+        except CSVImportError as e:
+            if e.summary['rows_imported']:
+                anomaly_detector.forget_user(user_id)
+            return jsonify({'success': False, 'message': str(e), **e.summary}), 400
         
-        # Get totals
-        c.execute('SELECT SUM(amount) FROM transactions WHERE user_id = ? AND type = "income"', (user_id,))
-        total_income = c.fetchone()[0] or 0
+        # Imported history invalidates the running anomaly statistics
+        anomaly_detector.forget_user(user_id)
         
-        c.execute('SELECT SUM(amount) FROM transactions WHERE user_id = ? AND type = "expense"', (user_id,))
-        total_expenses = abs(c.fetchone()[0] or 0)
+        return jsonify({
+            'success': True,
+            'message': f"Imported {summary['rows_imported']} transactions",
+            **summary
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+@app.route('/api/analysis/<int:user_id>')
+def analyze_spending(user_id):
+    try:
+        conn = get_connection()
+        c = conn.cursor()
         
-        conn.close()
+        # Totals come from the per-month rollups, not the raw transactions
+        summary = summarize_rollups(fetch_user_rollups(c.execute, user_id))
+        spending_by_category = {category: abs(total) for category, total in summary['spending_by_category'].items()}
+        total_income = summary['total_income']
+        total_expenses = abs(summary['total_expenses'])
         
         net_savings = total_income - total_expenses
         savings_rate = (net_savings / total_income * 100) if total_income > 0 else 0
@@ -221,7 +358,7 @@ def chat():
 def add_sample_data():
     """Add sample data for testing"""
     try:
-        conn = sqlite3.connect('finance.db')
+        conn = get_connection()
         c = conn.cursor()
         
         # First, ensure we have a user
@@ -234,6 +371,7 @@ def add_sample_data():
         
         # Clear existing sample transactions for user 1
         c.execute('DELETE FROM transactions WHERE user_id = 1')
+        anomaly_detector.forget_user(1)
         
         # Add sample transactions for user 1
         sample_transactions = [
@@ -254,7 +392,6 @@ def add_sample_data():
         )
         
         conn.commit()
-        conn.close()
         
         return jsonify({'success': True, 'message': 'Sample data added successfully'})
     
@@ -270,9 +407,12 @@ if __name__ == '__main__':
     print("   GET  /api/                  - API information")
     print("   POST /api/register          - Register new user")
     print("   POST /api/transactions      - Add transaction") 
+    print("   POST /api/transactions/bulk - Add many transactions at once")
+    print("   POST /api/transactions/import - Import bank statement CSV")
     print("   GET  /api/analysis/<id>     - Get spending analysis")
     print("   POST /api/chat              - Chat with AI assistant")
     print("   POST /api/sample-data       - Add sample data for testing")
+    print("   GET  /metrics               - Prometheus metrics")
     print("\n💡 Open http://localhost:5000 in your browser to use the web interface!")
     app.run(debug=True, host='0.0.0.0', port=5000)
     
\ No newline at end of file
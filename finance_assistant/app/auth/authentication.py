@@ -1,14 +1,22 @@
 from flask import request, jsonify, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 import jwt
+import uuid
 from datetime import datetime, timedelta
 from ..models.user import User, db
+from .security import HasherBusy, PasswordHasher
 
 class AuthenticationManager:
-    """Handles user authentication with MFA support"""
+    """Handles user authentication with MFA support
     
-    def __init__(self):
+    Passwords are hashed and checked by `hasher`, off the request thread;
+    when its pool is saturated or too slow `HasherBusy` (or `HasherTimeout`)
+    propagates to the caller.
+    """
+    
+    def __init__(self, hasher=None):
         self.mfa_required = True
+        self.hasher = hasher or PasswordHasher(workers=0)
     
     def register_user(self, email, password, first_name, last_name):
         """Register a new user with multi-factor authentication"""
@@ -23,7 +31,7 @@ class AuthenticationManager:
                 first_name=first_name,
                 last_name=last_name
             )
-            user.set_password(password)
+            user.password_hash = self.hasher.hash(password)
             
             db.session.add(user)
             db.session.commit()
@@ -38,6 +46,8 @@ class AuthenticationManager:
                 'user_id': user.id
             }
             
+        except HasherBusy:
+            raise
         except Exception as e:
             db.session.rollback()
             return {'success': False, 'message': str(e)}
@@ -47,9 +57,12 @@ class AuthenticationManager:
         try:
             user = User.query.filter_by(email=email).first()
             
-            if not user or not user.check_password(password):
+            if not user or not self.hasher.verify(user.password_hash, password):
                 return {'success': False, 'message': 'Invalid credentials'}
             
+            if self.hasher.needs_rehash(user.password_hash):
+                self._upgrade_hash(user, password)
+            
             if not user.is_active:
                 return {'success': False, 'message': 'Account deactivated'}
             
@@ -61,7 +74,7 @@ class AuthenticationManager:
             login_user(user)
             
             # Generate JWT token for API access
-            auth_token = self._generate_auth_token(user.id)
+            auth_token = self._generate_auth_token(user)
             
             return {
                 'success': True,
@@ -75,9 +88,20 @@ class AuthenticationManager:
                 }
             }
             
+        except HasherBusy:
+            raise
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
+    def _upgrade_hash(self, user, password):
+        """Re-hash a password stored at an older cost, now that we have it in clear"""
+        try:
+            user.password_hash = self.hasher.hash(password)
+            db.session.commit()
+        except HasherBusy:
+            # Not worth failing a valid login over: upgrade on a later one
+            pass
+    
     def _generate_mfa_token(self, user_id):
         """Generate MFA token (simplified implementation)"""
         payload = {
@@ -94,10 +118,20 @@ class AuthenticationManager:
         except:
             return False
     
-    def _generate_auth_token(self, user_id):
-        """Generate JWT authentication token"""
+    def _generate_auth_token(self, user):
+        """Generate JWT authentication token
+        
+        The claims carry everything API handlers need to know about the
+        caller, so bearer requests are authenticated without a user lookup.
+        """
+        now = datetime.utcnow()
         payload = {
-            'user_id': user_id,
-            'exp': datetime.utcnow() + timedelta(days=7)
+            'user_id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'jti': uuid.uuid4().hex,
+            'iat': now,
+            'exp': now + current_app.config['AUTH_TOKEN_LIFETIME']
         }
         return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""Token-bucket throttling of login attempts, checked before any real work
+
+Each attempt draws one token from a bucket per key: the client IP and the
+(hashed) email being tried. A bucket holds up to `capacity` tokens and
+refills continuously at `capacity / period` per second, so a client can
+burst `capacity` attempts and then sustain one every `period / capacity`
+seconds. An attempt is admitted only if every bucket it draws from has a
+token; otherwise nothing is drawn and the caller is told how long to wait.
+
+Buckets live in process memory by default. `SQLiteBucketStore` keeps them
+in a small SQLite file instead, updated in one write transaction per
+attempt, so every worker process on the host enforces the same limits.
+
+Every decision is also counted in the process metrics registry, so
+`/metrics` shows admitted and rejected attempts next to request rates:
+
+    login_rate_limit_allowed_total     attempts admitted
+    login_rate_limit_rejected_total    attempts refused, by the rule that refused them
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from ..database.connection import get_connection
+from ..monitoring.metrics import REGISTRY
+
+ALLOWED = REGISTRY.counter(
+    'login_rate_limit_allowed_total', 'Login and registration attempts admitted by the rate limiter'
+)
+REJECTED = REGISTRY.counter(
+    'login_rate_limit_rejected_total', 'Login and registration attempts refused by the rate limiter',
+    ('rule',)
+)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when an attempt is over a rate limit; `retry_after` is in seconds"""
+
+    def __init__(self, rule, retry_after):
+        super().__init__(f'Too many attempts, retry in {math.ceil(retry_after)}s')
+        self.rule = rule
+        self.retry_after = retry_after
+
+
+def refill(tokens, updated_at, capacity, rate, now):
+    """Tokens in a bucket at `now`, given its level when last updated"""
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+def take(levels, buckets, now):
+    """Draw one token from every bucket, or none if any is empty
+
+    `levels` maps key -> (tokens, updated_at) for the buckets seen before;
+    returns (new levels for the keys, rejecting bucket or None, retry_after).
+    """
+    refilled = {}
+    for key, capacity, rate in buckets:
+        tokens, updated_at = levels.get(key, (capacity, now))
+        refilled[key] = refill(tokens, updated_at, capacity, rate, now)
+
+    for key, capacity, rate in buckets:
+        if refilled[key] < 1:
+            return {}, key, (1 - refilled[key]) / rate
+    return {key: (refilled[key] - 1, now) for key, _, _ in buckets}, None, 0
+
+
+class MemoryBucketStore:
+    """Buckets for this process only, in an LRU bounded to `max_keys`
+
+    Evicting a bucket refills it, so the bound only ever errs on the side of
+    letting an idle client back in.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._levels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now):
+        with self._lock:
+            levels = {key: self._levels[key] for key, _, _ in buckets if key in self._levels}
+            updated, rejected, retry_after = take(levels, buckets, now)
+            for key, level in updated.items():
+                self._levels[key] = level
+                self._levels.move_to_end(key)
+            while len(self._levels) > self.max_keys:
+                self._levels.popitem(last=False)
+        return rejected, retry_after
+
+    def __len__(self):
+        return len(self._levels)
+
+
+class SQLiteBucketStore:
+    """Buckets shared by every process on the host through a SQLite file"""
+
+    # Drop rows of buckets that have been full for a while every N attempts
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._attempts = 0
+        conn = get_connection(path)
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    full_at REAL NOT NULL
+                )
+            ''')
+
+    def take(self, buckets, now):
+        conn = get_connection(self.path)
+        keys = [key for key, _, _ in buckets]
+        # IMMEDIATE takes the write lock up front: read-modify-write is atomic across processes
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                f"SELECT key, tokens, updated_at FROM rate_limit_buckets "
+                f"WHERE key IN ({', '.join('?' * len(keys))})", keys
+            ).fetchall()
+            levels = {key: (tokens, updated_at) for key, tokens, updated_at in rows}
+            updated, rejected, retry_after = take(levels, buckets, now)
+            rates = {key: (capacity, rate) for key, capacity, rate in buckets}
+            conn.executemany(
+                'INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at, full_at) '
+                'VALUES (?, ?, ?, ?)',
+                [(key, tokens, updated_at,
+                  updated_at + (rates[key][0] - tokens) / rates[key][1])
+                 for key, (tokens, updated_at) in updated.items()]
+            )
+            self._attempts += 1
+            if self._attempts % self.PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM rate_limit_buckets WHERE full_at < ?', (now,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return rejected, retry_after
+
+    def __len__(self):
+        return get_connection(self.path).execute('SELECT COUNT(*) FROM rate_limit_buckets').fetchone()[0]
+
+
+class LoginRateLimiter:
+    """Per-IP and per-email token buckets for login and registration attempts
+
+    `rules` maps a rule name ('ip', 'email') to (capacity, period seconds).
+    Emails are normalized and hashed before they become keys, so the
+    shared store never holds addresses in clear.
+    """
+
+    def __init__(self, rules, store=None, clock=time.time):
+        self.rules = dict(rules)
+        self.store = store if store is not None else MemoryBucketStore()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = {rule: 0 for rule in self.rules}
+
+    def check(self, ip=None, email=None):
+        """Admit one attempt or raise RateLimitExceeded (no token is drawn then)"""
+        buckets = []
+        for rule, value in (('ip', ip), ('email', email)):
+            if value is None or rule not in self.rules:
+                continue
+            if rule == 'email':
+                value = hashlib.sha256(str(value).strip().lower().encode('utf-8')).hexdigest()
+            capacity, period = self.rules[rule]
+            buckets.append((f'{rule}:{value}', capacity, capacity / period))
+        if not buckets:
+            return
+
+        rejected, retry_after = self.store.take(buckets, self.clock())
+        with self._lock:
+            if rejected is None:
+                self.allowed += 1
+            else:
+                rule = rejected.split(':', 1)[0]
+                self.rejected[rule] += 1
+        if rejected is None:
+            ALLOWED.inc()
+            return
+        REJECTED.inc(rule=rule)
+        raise RateLimitExceeded(rule, retry_after)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'allowed': self.allowed,
+                'rejected': dict(self.rejected),
+                'rules': {rule: {'capacity': capacity, 'period_seconds': period}
+                          for rule, (capacity, period) in self.rules.items()},
+                'store': type(self.store).__name__,
+                'tracked_keys': len(self.store)
+            }
@@ -0,0 +1,325 @@
+"""Password hashing off the request thread, and stateless bearer-token checks
+
+bcrypt at BCRYPT_LOG_ROUNDS = 13 costs about half a second of CPU per hash
+or check. `PasswordHasher` runs that work in a small, dedicated process
+pool and admits at most `max_pending` operations at once; beyond that it
+raises `HasherBusy` immediately, so a burst of logins gets fast rejections
+instead of queueing behind each other and starving every other endpoint.
+An operation that does not finish within `timeout` raises `HasherTimeout`
+(a `HasherBusy`) and keeps its slot until its worker is actually done.
+
+`TokenVerifier` authenticates API requests from the signed claims of their
+bearer JWT alone: no session store and no database query for identity,
+only an in-memory revocation set for tokens that were logged out.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent import futures
+import bcrypt
+import jwt
+from flask_login import UserMixin
+from ..processes import process_pool
+
+# $2b$13$<53 chars of salt and digest>
+HASH_COST_PATTERN = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+
+class HasherBusy(Exception):
+    """Raised when the password hashing pool is at its queue-depth limit"""
+
+
+class HasherTimeout(HasherBusy):
+    """Raised when a hash or check did not finish within the hasher's timeout"""
+
+
+def hash_password(password, rounds):
+    """bcrypt hash of a password as text (the format Flask-Bcrypt stores)"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def check_password(password_hash, password):
+    """True if the password matches the bcrypt hash"""
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed or non-bcrypt hash
+        return False
+
+
+def hash_cost(password_hash):
+    """Cost factor (log rounds) a bcrypt hash was made with, or None if unrecognized"""
+    match = HASH_COST_PATTERN.match(password_hash or '')
+    return int(match.group(1)) if match else None
+
+
+class PasswordHasher:
+    """bcrypt hashing and verification in a bounded process pool
+
+    `workers=0` hashes inline on the calling thread (still subject to the
+    admission limit), which is what the app did before and what the login
+    benchmark compares against.
+    """
+
+    def __init__(self, rounds=13, workers=2, max_pending=8, timeout=10):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.peak_pending = 0
+
+    def hash(self, password):
+        """Hash a new password at the configured cost"""
+        return self._run(hash_password, password, self.rounds)
+
+    def verify(self, password_hash, password):
+        """Check a password against its stored hash"""
+        return self._run(check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made at a lower cost than the configured one"""
+        cost = hash_cost(password_hash)
+        return cost is not None and cost < self.rounds
+
+    def _run(self, function, *args):
+        self._admit()
+        if not self.workers:
+            try:
+                return function(*args)
+            finally:
+                self._release()
+
+        try:
+            future = self._get_executor().submit(function, *args)
+        except Exception:
+            self._release()
+            raise
+        # Released when the worker is done, not when the caller stops waiting
+        future.add_done_callback(self._release)
+        try:
+            return future.result(self.timeout)
+        except futures.TimeoutError:
+            # Still queued: give the slot back now; running: it is freed when it ends
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise HasherTimeout('Sign-in is taking too long, please retry shortly') from None
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy('Too many sign-in attempts in progress, please retry shortly')
+            self._pending += 1
+            self.peak_pending = max(self.peak_pending, self._pending)
+
+    def _get_executor(self):
+        # Started on first use so processes that never hash start no workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = process_pool(self.workers)
+        return self._executor
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'peak_pending': self.peak_pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class TokenUser(UserMixin):
+    """The authenticated user as described by a verified token's claims
+
+    Carries what the API handlers read about the caller (id, name, email),
+    so a bearer-authenticated request never loads the User row.
+    """
+
+    def __init__(self, claims):
+        self.id = claims['user_id']
+        self.email = claims.get('email')
+        self.first_name = claims.get('first_name', '')
+        self.last_name = claims.get('last_name', '')
+        self.claims = claims
+
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+    def __repr__(self):
+        return f'<TokenUser {self.id}>'
+
+
+class RevocationList:
+    """Revoked token ids (jti) until their tokens expire, optionally kept on disk
+
+    Revocations are appended to a JSON-lines file so they survive restarts
+    and reach the app's other worker processes, which pick up new lines at
+    most `reload_interval` seconds later. Every process only ever appends
+    to the file; entries whose tokens have expired anyway are skipped when
+    read and dropped from memory, so they stop counting without anyone
+    rewriting a file other processes are reading.
+    """
+
+    def __init__(self, path=None, reload_interval=1.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._revoked = {}  # jti -> exp (unix time)
+        self._lock = threading.Lock()
+        self._file_id = None
+        self._offset = 0
+        self._checked_at = 0.0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.refresh()
+
+    def revoke(self, jti, exp):
+        with self._lock:
+            self._revoked[jti] = exp
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'jti': jti, 'exp': exp}) + '\n')
+
+    def is_revoked(self, jti):
+        if self.path and time.monotonic() - self._checked_at >= self.reload_interval:
+            self.refresh()
+        return self._revoked.get(jti, 0) > time.time()
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def prune(self, now=None):
+        """Forget revocations of tokens that have expired anyway"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._prune(now)
+
+    def _prune(self, now):
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+
+    def refresh(self):
+        """Read revocations appended to the file since the last read"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            if (stat.st_dev, stat.st_ino) != self._file_id or stat.st_size < self._offset:
+                # Replaced or truncated (e.g. cleared by an operator): read it from the start
+                self._file_id = (stat.st_dev, stat.st_ino)
+                self._offset = 0
+            if stat.st_size == self._offset:
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+            # Only consume complete lines; a half-written one is read next time
+            complete = data[:data.rfind(b'\n') + 1]
+            self._offset += len(complete)
+            now = time.time()
+            for line in complete.splitlines():
+                try:
+                    entry = json.loads(line)
+                    if entry['exp'] > now:
+                        self._revoked[entry['jti']] = entry['exp']
+                except (ValueError, KeyError, TypeError):
+                    # A torn line from a crash mid-append
+                    continue
+            self._prune(now)
+
+
+class TokenVerifier:
+    """Verifies bearer JWTs, caching decoded claims until the token expires
+
+    The cache is an LRU keyed by the SHA-256 of the token, so tokens are
+    never kept in memory in clear and a repeat request costs one hash and
+    one dict lookup instead of a signature check. Revocation is checked on
+    every request, cached or not.
+    """
+
+    def __init__(self, secret_key, revocations=None, max_entries=10000, algorithm='HS256'):
+        self.secret_key = secret_key
+        # Not `or`: an empty RevocationList is falsy
+        self.revocations = revocations if revocations is not None else RevocationList()
+        self.max_entries = max_entries
+        self.algorithm = algorithm
+        # token digest -> claims, least recently used first
+        self._claims = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def verify(self, token):
+        """Claims of a valid, unexpired, unrevoked token, else None"""
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        with self._lock:
+            claims = self._claims.get(key)
+            if claims is not None:
+                if claims['exp'] <= now:
+                    del self._claims[key]
+                    claims = None
+                else:
+                    self._claims.move_to_end(key)
+                    self.hits += 1
+
+        if claims is None:
+            try:
+                claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm],
+                                    options={'require': ['exp', 'jti', 'user_id']})
+            except jwt.InvalidTokenError:
+                self.rejected += 1
+                return None
+            with self._lock:
+                self.misses += 1
+                self._claims[key] = claims
+                if len(self._claims) > self.max_entries:
+                    self._claims.popitem(last=False)
+
+        if self.revocations.is_revoked(claims['jti']):
+            self.rejected += 1
+            return None
+        return claims
+
+    def revoke(self, claims):
+        """Revoke the token these claims came from until it expires"""
+        self.revocations.revoke(claims['jti'], claims['exp'])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._claims),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'rejected': self.rejected,
+                'revoked': len(self.revocations)
+            }
@@ -0,0 +1,86 @@
+import math
+import threading
+
+
+class RunningStats:
+    """Welford running count/mean/M2 for one stream of amounts"""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def from_aggregates(cls, count, total, total_squares):
+        """Build stats from SQL COUNT/SUM/SUM(x*x) aggregates"""
+        if not count:
+            return cls()
+        mean = total / count
+        m2 = max(total_squares - total * mean, 0.0)
+        return cls(count, mean, m2)
+
+    def update(self, value):
+        """Fold a new value into the running statistics"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self):
+        """Sample standard deviation (matches pandas' default ddof=1)"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+class StreamingAnomalyDetector:
+    """Scores new transactions in O(1) against per-user, per-category running stats"""
+
+    def __init__(self, threshold=2.0, min_count=6):
+        self.threshold = threshold
+        self.min_count = min_count
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def is_seeded(self, user_id, category):
+        """Whether running stats exist for this user and category"""
+        return (user_id, category) in self._stats
+
+    def seed(self, user_id, category, count, total, total_squares):
+        """Initialise stats for a user/category from historical aggregates"""
+        with self._lock:
+            self._stats[(user_id, category)] = RunningStats.from_aggregates(
+                count or 0, total or 0.0, total_squares or 0.0
+            )
+
+    def observe(self, user_id, category, amount, transaction_id=None):
+        """Score a newly inserted transaction, then fold it into the stats
+
+        Returns an anomaly dict when the amount is more than `threshold`
+        standard deviations from the category mean, otherwise None.
+        """
+        with self._lock:
+            stats = self._stats.setdefault((user_id, category), RunningStats())
+            anomaly = None
+            std = stats.std
+            if stats.count >= self.min_count and std > 0:
+                z_score = abs(amount - stats.mean) / std
+                if z_score > self.threshold:
+                    anomaly = {
+                        'transaction_id': transaction_id,
+                        'category': category,
+                        'amount': amount,
+                        'z_score': z_score,
+                        'message': f'Unusually high spending in {category}'
+                    }
+            stats.update(amount)
+        return anomaly
+
+    def forget_user(self, user_id):
+        """Drop all running stats for a user (e.g. after deletes or a reset)"""
+        with self._lock:
+            for key in [key for key in self._stats if key[0] == user_id]:
+                del self._stats[key]
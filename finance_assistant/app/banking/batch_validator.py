@@ -0,0 +1,121 @@
+import math
+from ..monitoring.tracing import note_frame, traced
+
+TRANSACTION_TYPES = ('income', 'expense')
+REQUIRED_FIELDS = ('user_id', 'amount', 'type')
+
+
+def _booleans(column):
+    """Mask of the cells of a column holding booleans"""
+    import numpy as np
+    import pandas as pd
+
+    if column.dtype == object:
+        return column.map(type).isin((bool, np.bool_))
+    return pd.Series(column.dtype == bool, index=column.index)
+
+
+@traced('batch_validator.validate_transaction_batch')
+def validate_transaction_batch(records, categorizer, default_user_id=None):
+    """Validate and categorize a list of transaction dicts with column-wise checks
+
+    Returns `(rows, results)`: `rows` holds `(index, insert_tuple)` for every
+    valid record in input order, `results` one dict per input record with
+    either `success: True` or the reasons it was rejected.
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(records, columns=[
+        'user_id', 'amount', 'type', 'category', 'description', 'date'
+    ])
+    note_frame('transaction_batch', df)
+    if default_user_id is not None:
+        df['user_id'] = df['user_id'].fillna(default_user_id)
+
+    # JSON true/false would otherwise be coerced to 1/0
+    user_ids = pd.to_numeric(df['user_id'], errors='coerce').mask(_booleans(df['user_id']))
+    amounts = pd.to_numeric(df['amount'], errors='coerce').mask(_booleans(df['amount']))
+    types = df['type'].astype(str).str.strip().str.lower()
+    descriptions = df['description'].fillna('').astype(str)
+
+    categories = df['category'].fillna('').astype(str).str.strip()
+    missing = categories == ''
+    if missing.any():
+        categories[missing] = categorizer.categorize_many(descriptions[missing])
+
+    # Offsets may differ within a batch (e.g. across a DST change): store UTC
+    dates = pd.to_datetime(df['date'], errors='coerce', format='ISO8601', utc=True).dt.tz_localize(None)
+    now = pd.Timestamp.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    date_strings = dates.dt.strftime('%Y-%m-%d %H:%M:%S').where(dates.notna(), now)
+
+    checks = {
+        'missing or invalid user_id': user_ids.isna() | (user_ids != user_ids.round()),
+        'missing or invalid amount': amounts.isna() | ~np.isfinite(amounts.fillna(0)),
+        'type must be income or expense': ~types.isin(TRANSACTION_TYPES),
+        'invalid date': df['date'].notna() & dates.isna(),
+    }
+    invalid = pd.Series(False, index=df.index)
+    for failed in checks.values():
+        invalid |= failed
+
+    results = [{'index': i, 'success': True} for i in range(len(df))]
+    for position in invalid.to_numpy().nonzero()[0]:
+        results[position] = {
+            'index': int(position),
+            'success': False,
+            'errors': [reason for reason, failed in checks.items() if failed.iat[position]]
+        }
+
+    valid = ~invalid
+    rows = list(zip(
+        valid[valid].index.tolist(),
+        zip(
+            user_ids[valid].astype('int64').tolist(),
+            amounts[valid].tolist(),
+            types[valid].tolist(),
+            categories[valid].tolist(),
+            descriptions[valid].tolist(),
+            date_strings[valid].tolist()
+        )
+    ))
+    return rows, results
+
+
+def _number(value):
+    """A finite float from a number or numeric string, else None (booleans are not numbers)"""
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def validate_transaction(record, categorizer=None):
+    """Validate one transaction dict with the same rules as the batch path
+
+    Returns `(values, errors)`: `values` is the
+    `(user_id, amount, type, category, description)` tuple to insert, or
+    None when `errors` lists why the record was rejected. A blank category
+    is filled in by `categorizer` from the description when one is given.
+    """
+    user_id = _number(record.get('user_id'))
+    amount = _number(record.get('amount'))
+    transaction_type = str(record.get('type', '')).strip().lower()
+    description = str(record.get('description') or '')
+    category = str(record.get('category') or '').strip()
+    if not category and categorizer is not None:
+        category = categorizer.categorize(description)
+
+    checks = {
+        'missing or invalid user_id': user_id is None or not user_id.is_integer(),
+        'missing or invalid amount': amount is None,
+        'type must be income or expense': transaction_type not in TRANSACTION_TYPES,
+        'missing category': not category,
+    }
+    errors = [reason for reason, failed in checks.items() if failed]
+    if errors:
+        return None, errors
+    return (int(user_id), amount, transaction_type, category, description), []
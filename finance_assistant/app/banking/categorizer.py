@@ -0,0 +1,99 @@
+import json
+import re
+
+CATEGORIES_FILE = 'data/categories.json'
+
+# Default categories if the categories file is not found
+DEFAULT_CATEGORIES = {
+    "Food & Dining": ["restaurant", "cafe", "food", "grocery", "supermarket", "dining"],
+    "Transportation": ["uber", "lyft", "taxi", "gas", "fuel", "transport", "bus", "train"],
+    "Entertainment": ["movie", "netflix", "spotify", "concert", "game", "entertainment"],
+    "Utilities": ["electric", "water", "gas", "internet", "phone", "utility"],
+    "Shopping": ["amazon", "walmart", "target", "mall", "shopping", "store"],
+    "Healthcare": ["hospital", "doctor", "pharmacy", "medical", "health"],
+    "Education": ["school", "university", "course", "book", "education"],
+    "Salary": ["salary", "paycheck", "income", "payment"],
+    "Investment": ["stock", "investment", "dividend", "interest"],
+    "Other": []
+}
+
+
+def load_categories(path=CATEGORIES_FILE):
+    """Load transaction categories and keywords"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return DEFAULT_CATEGORIES
+
+
+class KeywordCategorizer:
+    """Compiled single-pass keyword matcher for transaction descriptions
+
+    All category keywords are folded into one regular expression (longest
+    keyword first) so a description is scanned once regardless of how many
+    categories or keywords exist. Every keyword hit votes for the categories
+    that own it; a keyword shared by several categories splits its vote, so
+    "gas bill electric" resolves to Utilities while "shell gas" still resolves
+    to Transportation. Ties go to the category listed first (its priority).
+    """
+
+    def __init__(self, categories, default='Other', cache_size=65536):
+        self.default = default
+        self.cache_size = cache_size
+        self._cache = {}
+
+        owners = {}
+        self._priority = {}
+        for priority, (category, keywords) in enumerate(categories.items()):
+            self._priority[category] = priority
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and category not in owners.setdefault(keyword, []):
+                    owners[keyword].append(category)
+
+        # Each keyword maps to the (category, weight) votes it casts
+        self._votes = {
+            keyword: [(category, 1.0 / len(cats)) for category in cats]
+            for keyword, cats in owners.items()
+        }
+
+        if owners:
+            alternation = '|'.join(re.escape(k) for k in sorted(owners, key=len, reverse=True))
+            self._pattern = re.compile(alternation)
+        else:
+            self._pattern = None
+
+    def categorize(self, description):
+        """Return the best matching category for a single description"""
+        if not description or self._pattern is None:
+            return self.default
+
+        text = description.lower()
+        cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+
+        scores = {}
+        for match in self._pattern.finditer(text):
+            for category, weight in self._votes[match.group()]:
+                scores[category] = scores.get(category, 0.0) + weight
+
+        if scores:
+            category = min(scores, key=lambda c: (-scores[c], self._priority[c]))
+        else:
+            category = self.default
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[text] = category
+        return category
+
+    def clear_cache(self):
+        """Forget every cached description"""
+        self._cache.clear()
+
+    def categorize_many(self, descriptions):
+        """Categorize an iterable of descriptions, returning a list"""
+        categorize = self.categorize
+        return [categorize(description) for description in descriptions]
@@ -1,67 +1,68 @@
 import pandas as pd
 from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from ..models.user import db
 from ..models.transaction import Transaction, TransactionCategory
-import json
+from ..monitoring.tracing import traced
+from .categorizer import KeywordCategorizer, load_categories
+from .transaction_loader import load_transaction_frame
+from .anomaly_detector import StreamingAnomalyDetector
 
 class TransactionProcessor:
     """Processes and analyzes financial transactions"""
     
     def __init__(self):
         self.categories = self._load_categories()
+        self.categorizer = KeywordCategorizer(self.categories)
+        self.anomaly_detector = StreamingAnomalyDetector()
     
     def _load_categories(self):
         """Load transaction categories and keywords"""
-        try:
-            with open('data/categories.json', 'r') as f:
-                return json.load(f)
-        except:
-            # Default categories if file not found
-            return {
-                "Food & Dining": ["restaurant", "cafe", "food", "grocery", "supermarket", "dining"],
-                "Transportation": ["uber", "lyft", "taxi", "gas", "fuel", "transport", "bus", "train"],
-                "Entertainment": ["movie", "netflix", "spotify", "concert", "game", "entertainment"],
-                "Utilities": ["electric", "water", "gas", "internet", "phone", "utility"],
-                "Shopping": ["amazon", "walmart", "target", "mall", "shopping", "store"],
-                "Healthcare": ["hospital", "doctor", "pharmacy", "medical", "health"],
-                "Education": ["school", "university", "course", "book", "education"],
-                "Salary": ["salary", "paycheck", "income", "payment"],
-                "Investment": ["stock", "investment", "dividend", "interest"],
-                "Other": []
-            }
+        return load_categories()
     
     def categorize_transaction(self, description, amount):
         """Automatically categorize transaction based on description"""
-        description_lower = description.lower()
-        
-        for category, keywords in self.categories.items():
-            for keyword in keywords:
-                if keyword in description_lower:
-                    return category
-        
-        # Determine if it's income or expense based on amount context
-        transaction_type = "income" if amount > 0 else "expense"
-        
-        return "Other"
+        return self.categorizer.categorize(description)
     
-    def analyze_spending_patterns(self, transactions, period_days=30):
-        """Analyze spending patterns over a period"""
-        if not transactions:
-            return {}
+    def categorize_many(self, descriptions, amounts):
+        """Categorize a batch of transactions in one pass over the descriptions"""
+        return self.categorizer.categorize_many(descriptions)
+    
+    @traced('transaction_processor.analyze_spending_patterns')
+    def analyze_spending_patterns(self, user_id, period_days=30, end_date=None):
+        """Analyze spending patterns over a period
         
-        df = pd.DataFrame([t.to_dict() for t in transactions])
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
+        The date window, type filter and per-category totals are evaluated in
+        the database against the (user_id, transaction_date) index, so the cost
+        follows the size of the window rather than the user's full history.
+        """
+        end_date = end_date or datetime.now()
+        start_date = end_date - timedelta(days=period_days)
         
-        # Filter for the last period_days
-        cutoff_date = datetime.now() - timedelta(days=period_days)
-        recent_transactions = df[df['transaction_date'] >= cutoff_date]
+        query = (
+            select(Transaction.transaction_type, Transaction.category, func.sum(Transaction.amount))
+            .where(
+                Transaction.user_id == user_id,
+                Transaction.transaction_date >= start_date,
+                Transaction.transaction_date <= end_date,
+                Transaction.transaction_type.in_(('income', 'expense'))
+            )
+            .group_by(Transaction.transaction_type, Transaction.category)
+        )
+        rows = db.session.execute(query).all()
         
-        # Analyze by category
-        expense_analysis = recent_transactions[recent_transactions['transaction_type'] == 'expense']
-        income_analysis = recent_transactions[recent_transactions['transaction_type'] == 'income']
+        if not rows and not self._has_transactions(user_id):
+            return {}
         
-        spending_by_category = expense_analysis.groupby('category')['amount'].sum().to_dict()
-        total_income = income_analysis['amount'].sum()
-        total_expenses = expense_analysis['amount'].sum()
+        spending_by_category = {}
+        total_income = 0.0
+        total_expenses = 0.0
+        for transaction_type, category, total in rows:
+            if transaction_type == 'expense':
+                spending_by_category[category] = total
+                total_expenses += total
+            else:
+                total_income += total
         
         return {
             'spending_by_category': spending_by_category,
@@ -71,32 +72,73 @@ class TransactionProcessor:
             'savings_rate': ((total_income - total_expenses) / total_income * 100) if total_income > 0 else 0
         }
     
-    def detect_anomalies(self, transactions, threshold=2.0):
-        """Detect unusual spending patterns"""
-        if len(transactions) < 10:  # Need sufficient data
+    def _has_transactions(self, user_id):
+        """Check whether the user has any transactions at all (index lookup)"""
+        query = select(Transaction.id).where(Transaction.user_id == user_id).limit(1)
+        return db.session.execute(query).first() is not None
+    
+    @traced('transaction_processor.detect_anomalies')
+    def detect_anomalies(self, user_id, threshold=2.0):
+        """Detect unusual spending patterns
+        
+        Per-category mean/std are computed with one groupby/transform pass and
+        the most recent five expenses of each category are scored against them.
+        """
+        df = load_transaction_frame(
+            user_id, columns=('id', 'amount', 'category', 'transaction_date'), transaction_type='expense'
+        )
+        if len(df) < 10:  # Need sufficient data
             return []
         
-        df = pd.DataFrame([t.to_dict() for t in transactions])
-        expense_df = df[df['transaction_type'] == 'expense']
+        df = df.sort_values(['transaction_date', 'id'], kind='stable')
+        by_category = df.groupby('category', observed=True)['amount']
+        count = by_category.transform('count')
+        mean = by_category.transform('mean')
+        std = by_category.transform('std')
+        is_recent = df.groupby('category', observed=True).cumcount(ascending=False) < 5
+        
+        z_scores = (df['amount'] - mean).abs() / std
+        # Need enough data points and a non-zero spread
+        flagged = (count > 5) & (std > 0) & is_recent & (z_scores > threshold)
         
         anomalies = []
-        for category in expense_df['category'].unique():
-            category_data = expense_df[expense_df['category'] == category]['amount']
-            if len(category_data) > 5:  # Need enough data points
-                mean = category_data.mean()
-                std = category_data.std()
-                
-                if std > 0:  # Avoid division by zero
-                    recent_transactions = category_data.tail(5)
-                    for idx, amount in recent_transactions.items():
-                        z_score = abs(amount - mean) / std
-                        if z_score > threshold:
-                            anomalies.append({
-                                'transaction_id': idx,
-                                'category': category,
-                                'amount': amount,
-                                'z_score': z_score,
-                                'message': f'Unusually high spending in {category}'
-                            })
+        for transaction_id, category, amount, z_score in zip(
+            df['id'][flagged], df['category'][flagged], df['amount'][flagged], z_scores[flagged]
+        ):
+            anomalies.append({
+                'transaction_id': int(transaction_id),
+                'category': category,
+                'amount': float(amount),
+                'z_score': float(z_score),
+                'message': f'Unusually high spending in {category}'
+            })
+        
+        return anomalies
+    
+    def score_new_transaction(self, transaction):
+        """Score a just-inserted expense in O(1) against running category stats
+        
+        The first time a user/category pair is seen its stats are seeded from a
+        single aggregate query over the history (excluding this transaction);
+        afterwards each insert only updates the in-memory running statistics.
+        """
+        if transaction.transaction_type != 'expense':
+            return None
+        
+        detector = self.anomaly_detector
+        if not detector.is_seeded(transaction.user_id, transaction.category):
+            query = select(
+                func.count(Transaction.id),
+                func.sum(Transaction.amount),
+                func.sum(Transaction.amount * Transaction.amount)
+            ).where(
+                Transaction.user_id == transaction.user_id,
+                Transaction.transaction_type == 'expense',
+                Transaction.category == transaction.category,
+                Transaction.id != transaction.id
+            )
+            detector.seed(transaction.user_id, transaction.category, *db.session.execute(query).one())
         
-        return anomalies
\ No newline at end of file
+        return detector.observe(
+            transaction.user_id, transaction.category, transaction.amount, transaction.id
+        )
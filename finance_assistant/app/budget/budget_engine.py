@@ -1,15 +1,19 @@
 from datetime import datetime
 from ..models.budget import Budget
+from ..models.user import db
+from ..database.rollups import fetch_user_rollups
+from ..monitoring.tracing import traced
 import pandas as pd
 
 class BudgetEngine:
     """Engine for generating and managing budgets"""
     
-    def generate_monthly_budget(self, user, historical_data, income, savings_goal=None):
+    @traced('budget_engine.generate_monthly_budget')
+    def generate_monthly_budget(self, user, income, savings_goal=None):
         """Generate personalized monthly budget based on historical spending"""
         
         # Analyze historical spending patterns
-        spending_analysis = self._analyze_historical_spending(historical_data)
+        spending_analysis = self._analyze_historical_spending(user.id)
         
         # Calculate recommended budget allocations
         budget_allocations = self._calculate_budget_allocations(
@@ -30,16 +34,21 @@ class BudgetEngine:
         
         return budget
     
-    def _analyze_historical_spending(self, transactions):
+    def _analyze_historical_spending(self, user_id):
         """Analyze historical spending patterns"""
-        if not transactions:
+        rollups = fetch_user_rollups(
+            db.session.connection().exec_driver_sql, user_id, transaction_type='expense'
+        )
+        if not rollups:
             return {}
         
-        df = pd.DataFrame([t.to_dict() for t in transactions])
-        expense_df = df[df['transaction_type'] == 'expense']
-        
-        # Calculate average monthly spending by category
-        monthly_spending = expense_df.groupby('category')['amount'].mean().to_dict()
+        # Calculate average spending by category from the per-month sums and counts
+        totals = {}
+        counts = {}
+        for month, transaction_type, category, total, count in rollups:
+            totals[category] = totals.get(category, 0.0) + total
+            counts[category] = counts.get(category, 0) + count
+        monthly_spending = {category: totals[category] / counts[category] for category in totals}
         
         return {
             'average_monthly_spending': monthly_spending,
@@ -0,0 +1,94 @@
+"""Memoized per-user analysis shared by the financial advisor's intent handlers
+
+Every handler needs a spending analysis over the period the query names
+("this week", "last year"; 30 days by default). An `AnalysisContext`
+computes each period's analysis on first access and hands the same result
+to every later handler; contexts are cached per user for a short TTL and
+are only reused while the user's data version is unchanged, so a new
+transaction is never answered from a stale analysis. Windows are measured
+back from the time a context was created, so a context also goes stale
+with age and at midnight, when "today" and "yesterday" move.
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta
+from ..database.versions import get_data_version
+from ..models.user import db
+from ..reporting.report_cache import ReportCache
+
+# time_period entity -> (days covered, days before now the window ends)
+PERIOD_WINDOWS = {
+    'today': (1, 0),
+    'yesterday': (1, 1),
+    'week': (7, 0),
+    'month': (30, 0),
+    'year': (365, 0),
+}
+DEFAULT_PERIOD = 'month'
+
+
+class AnalysisContext:
+    """Lazily computed analysis for one user at one data version"""
+
+    def __init__(self, transaction_processor, user_id, version):
+        self.transaction_processor = transaction_processor
+        self.user_id = user_id
+        self.version = version
+        self.computed_at = time.monotonic()
+        self.day = date.today()
+        self._analyses = {}  # period -> analyze_spending_patterns result
+        self._lock = threading.Lock()
+
+    def is_fresh(self, version, ttl):
+        """Usable at `version`: same data, younger than `ttl` seconds and created today"""
+        return (self.version == version and time.monotonic() - self.computed_at < ttl
+                and self.day == date.today())
+
+    @property
+    def spending_analysis(self):
+        """Analysis of the default 30-day period"""
+        return self.spending_analysis_for(DEFAULT_PERIOD)
+
+    def spending_analysis_for(self, time_period=None):
+        """Analysis of the period a time_period entity names, computed at most once per period"""
+        period = time_period if time_period in PERIOD_WINDOWS else DEFAULT_PERIOD
+        analysis = self._analyses.get(period)
+        if analysis is None:
+            with self._lock:
+                analysis = self._analyses.get(period)
+                if analysis is None:
+                    days, ends_days_ago = PERIOD_WINDOWS[period]
+                    analysis = self._analyses[period] = self.transaction_processor.analyze_spending_patterns(
+                        self.user_id, period_days=days,
+                        end_date=datetime.now() - timedelta(days=ends_days_ago)
+                    )
+        return analysis
+
+    def cached_results(self):
+        """The analyses computed so far (for memory accounting)"""
+        return dict(self._analyses)
+
+
+class AnalysisContextCache:
+    """Short-TTL, version-checked cache of AnalysisContext objects per user"""
+
+    def __init__(self, transaction_processor, max_entries=4096, ttl=30):
+        self.transaction_processor = transaction_processor
+        self.ttl = ttl
+        self._cache = ReportCache(max_entries=max_entries, ttl=ttl)
+
+    def current_version(self, user_id):
+        return get_data_version(db.session.connection().exec_driver_sql, user_id)
+
+    def get(self, user_id, version=None):
+        """Return the user's current context, reusing a cached one when fresh"""
+        if version is None:
+            version = self.current_version(user_id)
+        context = self._cache.get(user_id, version)
+        if context is None or not context.is_fresh(version, self.ttl):
+            context = AnalysisContext(self.transaction_processor, user_id, version)
+            self._cache.put(user_id, version, context)
+        return context
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,141 @@
+"""Bounded per-session conversation state for the financial advisor
+
+A `Conversation` keeps the last few turns (query, intent, entities) of one
+chat session and the analysis context its answers were computed from, so a
+follow-up such as "and last month?" can inherit the previous intent and
+reuse the analysis. `ConversationStore` bounds the memory this takes: an
+LRU over sessions with a cap on both the number of sessions and their
+estimated total size in bytes, plus an idle TTL. Sizes are estimated per
+entry when it is written, so the bound holds no matter how many users chat.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+def estimate_size(obj, _seen=None):
+    """Approximate deep size in bytes of plain data (dicts, lists, strings, numbers)"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key, _seen) + estimate_size(value, _seen)
+                    for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(estimate_size(item, _seen) for item in obj)
+    return size
+
+
+class Conversation:
+    """Recent turns and the cached analysis context of one chat session"""
+
+    def __init__(self, max_turns=10):
+        self.turns = deque(maxlen=max_turns)
+        self.context = None
+
+    @property
+    def last_turn(self):
+        return self.turns[-1] if self.turns else None
+
+    def add_turn(self, query, intent, entities):
+        self.turns.append({'query': query, 'intent': intent, 'entities': dict(entities)})
+
+    def estimated_size(self):
+        """Bytes held by the turns and by the analyses cached on the context"""
+        size = sys.getsizeof(self) + estimate_size(self.turns)
+        if self.context is not None:
+            size += estimate_size(self.context.cached_results())
+        return size
+
+
+class ConversationStore:
+    """LRU + TTL store of conversations bounded by entry count and total bytes"""
+
+    def __init__(self, max_sessions=5000, max_bytes=64 * 1024 * 1024, ttl=1800, max_turns=10):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_turns = max_turns
+        # key -> (conversation, size, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.peak_bytes = 0
+
+    def get(self, key):
+        """Return the session's conversation, starting a new one if absent or expired"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                conversation, size, _ = entry
+                # Idle TTL: every access pushes the expiry back
+                self._entries[key] = (conversation, size, now + self.ttl)
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return conversation
+            self.misses += 1
+        return Conversation(self.max_turns)
+
+    def save(self, key, conversation):
+        """Store a conversation after a turn, re-measuring it and enforcing the bounds"""
+        size = conversation.estimated_size()
+        now = time.monotonic()
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            if size > self.max_bytes:
+                # Larger than the whole budget: never worth keeping
+                self.evictions += 1
+                return
+            self._entries[key] = (conversation, size, now + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_sessions or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+            self.peak_bytes = max(self.peak_bytes, self._bytes)
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def _expire(self, now):
+        # Sessions are kept in recency order, so idle ones are at the front
+        while self._entries:
+            key, (_, size, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+            self._bytes -= size
+            self.expirations += 1
+
+    def stats(self):
+        """Occupancy, memory and eviction counters"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                'sessions': len(self._entries),
+                'max_sessions': self.max_sessions,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'peak_bytes': self.peak_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -1,63 +1,156 @@
 from ..banking.transaction_processor import TransactionProcessor
 from ..budget.budget_engine import BudgetEngine
+from ..models.budget import Budget
+from ..monitoring.tracing import traced
+from .analysis_context import AnalysisContextCache
+from .conversation_store import ConversationStore
 import random
 
+# Short queries starting like this continue the previous turn ("and last month?")
+FOLLOW_UP_PREFIXES = ('and ', 'what about ', 'how about ', 'same for ', 'also ')
+FOLLOW_UP_MAX_WORDS = 6
+# Entities a follow-up may inherit from the previous turn; only the time
+# period changes what the handlers compute
+FOLLOW_UP_ENTITIES = ('time_period',)
+
+PERIOD_LABELS = {
+    'today': 'today',
+    'yesterday': 'yesterday',
+    'week': 'over the last 7 days',
+    'month': 'over the last 30 days',
+    'year': 'over the last year',
+}
+
 class FinancialAdvisor:
     """Financial advisor chatbot that provides intelligent responses"""
     
-    def __init__(self):
-        self.transaction_processor = TransactionProcessor()
-        self.budget_engine = BudgetEngine()
+    def __init__(self, transaction_processor=None, budget_engine=None,
+                 context_cache_size=4096, context_ttl=30, session_max=5000,
+                 session_max_bytes=64 * 1024 * 1024, session_ttl=1800, session_max_turns=10):
+        # Share the app's engines when given instead of building a second set
+        self.transaction_processor = transaction_processor or TransactionProcessor()
+        self.budget_engine = budget_engine or BudgetEngine()
+        self.context_ttl = context_ttl
+        self.contexts = AnalysisContextCache(
+            self.transaction_processor, max_entries=context_cache_size, ttl=context_ttl
+        )
+        self.conversations = ConversationStore(
+            max_sessions=session_max, max_bytes=session_max_bytes,
+            ttl=session_ttl, max_turns=session_max_turns
+        )
+    
+    @traced('financial_advisor.get_context')
+    def get_context(self, user, conversation=None):
+        """Analysis context shared by every handler answering this user
+        
+        A conversation's own context is reused while the user's data version
+        is unchanged, for at most the context TTL and never past midnight,
+        so relative periods ("today", "last 30 days") do not drift.
+        """
+        if conversation is None:
+            return self.contexts.get(user.id)
+        version = self.contexts.current_version(user.id)
+        if conversation.context is None or not conversation.context.is_fresh(version, self.context_ttl):
+            conversation.context = self.contexts.get(user.id, version)
+        return conversation.context
+    
+    def converse(self, user, processed_query, session_id=None):
+        """Answer a query within a chat session, resolving follow-ups to the previous turn
+        
+        Returns (response, processed_query) with the query as it was resolved.
+        """
+        key = (user.id, session_id or 'default')
+        conversation = self.conversations.get(key)
+        processed_query = self._resolve_follow_up(conversation, processed_query)
+        
+        response = self.get_response(user, processed_query, self.get_context(user, conversation))
+        
+        conversation.add_turn(processed_query.get('original_query', ''),
+                              processed_query.get('intent'),
+                              processed_query.get('entities', {}))
+        self.conversations.save(key, conversation)
+        return response, processed_query
     
-    def get_response(self, user, processed_query):
-        """Generate response based on processed user query"""
+    def _resolve_follow_up(self, conversation, processed_query):
+        """Carry the previous turn's intent into an elliptical follow-up query"""
+        last_turn = conversation.last_turn
+        if last_turn is None or last_turn['intent'] == 'general_query':
+            return processed_query
+        
+        text = processed_query.get('original_query', '').strip().lower()
+        entities = processed_query.get('entities', {})
+        short_follow_up = (text.startswith(FOLLOW_UP_PREFIXES)
+                           and len(text.split()) <= FOLLOW_UP_MAX_WORDS)
+        if not short_follow_up and not (processed_query.get('intent') == 'general_query' and entities):
+            return processed_query
+        
+        inherited = {name: value for name, value in last_turn['entities'].items()
+                     if name in FOLLOW_UP_ENTITIES}
+        return dict(
+            processed_query,
+            intent=last_turn['intent'],
+            entities={**inherited, **entities},
+            follow_up=True
+        )
+    
+    @traced('financial_advisor.get_response')
+    def get_response(self, user, processed_query, context=None):
+        """Generate response based on processed user query
+        
+        Pass the same `context` to answer several queries from one analysis;
+        without one, the user's cached context is used.
+        """
         intent = processed_query.get('intent')
         entities = processed_query.get('entities', {})
         
-        if intent == 'get_spending_summary':
-            return self._get_spending_summary(user, entities)
-        elif intent == 'get_budget_status':
-            return self._get_budget_status(user, entities)
-        elif intent == 'get_savings_advice':
-            return self._get_savings_advice(user, entities)
-        elif intent == 'get_income_report':
-            return self._get_income_report(user, entities)
-        elif intent == 'get_financial_report':
-            return self._get_financial_report(user, entities)
-        else:
+        handlers = {
+            'get_spending_summary': self._get_spending_summary,
+            'get_budget_status': self._get_budget_status,
+            'get_savings_advice': self._get_savings_advice,
+            'get_income_report': self._get_income_report,
+            'get_financial_report': self._get_financial_report
+        }
+        handler = handlers.get(intent)
+        if handler is None:
             return self._get_general_response(processed_query)
+        
+        return handler(user, entities, context or self.get_context(user))
     
-    def _get_spending_summary(self, user, entities):
+    def _get_spending_summary(self, user, entities, context):
         """Generate spending summary response"""
-        analysis = self.transaction_processor.analyze_spending_patterns(user.transactions)
+        analysis = context.spending_analysis_for(entities.get('time_period'))
         
         if not analysis:
             return "I don't have enough transaction data to analyze your spending patterns."
         
+        period = self._period_label(entities)
         total_spent = analysis.get('total_expenses', 0)
         top_category = max(analysis.get('spending_by_category', {}).items(), 
                           key=lambda x: x[1], default=('None', 0))
         
         responses = [
-            f"Based on your recent transactions, you've spent ${total_spent:.2f}. "
+            f"Based on your recent transactions, you've spent ${total_spent:.2f} {period}. "
             f"Your highest spending category is {top_category[0]} at ${top_category[1]:.2f}.",
             
-            f"Your spending analysis shows total expenses of ${total_spent:.2f}. "
+            f"Your spending analysis shows total expenses of ${total_spent:.2f} {period}. "
             f"Consider reviewing your {top_category[0]} expenses which are at ${top_category[1]:.2f}.",
             
-            f"Here's your spending summary: Total expenses: ${total_spent:.2f}. "
+            f"Here's your spending summary {period}: Total expenses: ${total_spent:.2f}. "
             f"Top category: {top_category[0]} (${top_category[1]:.2f})."
         ]
         
         return random.choice(responses)
     
-    def _get_budget_status(self, user, entities):
+    def _get_budget_status(self, user, entities, context):
         """Generate budget status response"""
-        if not user.budgets:
+        # Queried by id so a token-authenticated user needs no User row
+        current_budget = (Budget.query.filter_by(user_id=user.id)
+                          .order_by(Budget.created_at.desc()).first())
+        if current_budget is None:
             return "You haven't set up any budgets yet. Would you like me to help you create one?"
         
-        current_budget = user.budgets[-1]  # Get most recent budget
-        spending_analysis = self.transaction_processor.analyze_spending_patterns(user.transactions)
+        # Budgets are monthly, so compliance is always checked on the 30-day window
+        spending_analysis = context.spending_analysis
         
         alerts = self.budget_engine.check_budget_compliance(
             spending_analysis.get('spending_by_category', {}), 
@@ -70,9 +163,9 @@ class FinancialAdvisor:
         else:
             return "Great! You're staying within your budget limits. Keep up the good financial habits!"
     
-    def _get_savings_advice(self, user, entities):
+    def _get_savings_advice(self, user, entities, context):
         """Generate savings advice"""
-        analysis = self.transaction_processor.analyze_spending_patterns(user.transactions)
+        analysis = context.spending_analysis_for(entities.get('time_period'))
         savings_rate = analysis.get('savings_rate', 0)
         
         if savings_rate >= 20:
@@ -82,25 +175,29 @@ class FinancialAdvisor:
         else:
             return "Let's work on improving your savings. Try reducing dining out or entertainment expenses."
     
-    def _get_income_report(self, user, entities):
+    def _get_income_report(self, user, entities, context):
         """Generate income report"""
-        analysis = self.transaction_processor.analyze_spending_patterns(user.transactions)
+        analysis = context.spending_analysis_for(entities.get('time_period'))
         total_income = analysis.get('total_income', 0)
         
-        return f"Your total income from the analyzed period is ${total_income:.2f}."
+        return f"Your total income {self._period_label(entities)} is ${total_income:.2f}."
     
-    def _get_financial_report(self, user, entities):
+    def _get_financial_report(self, user, entities, context):
         """Generate financial report summary"""
-        analysis = self.transaction_processor.analyze_spending_patterns(user.transactions)
+        analysis = context.spending_analysis_for(entities.get('time_period'))
         
         return (
-            f"Financial Summary:\n"
+            f"Financial Summary ({self._period_label(entities)}):\n"
             f"Income: ${analysis.get('total_income', 0):.2f}\n"
             f"Expenses: ${analysis.get('total_expenses', 0):.2f}\n"
             f"Net Savings: ${analysis.get('net_savings', 0):.2f}\n"
             f"Savings Rate: {analysis.get('savings_rate', 0):.1f}%"
         )
     
+    def _period_label(self, entities):
+        """How a response names the period its figures cover"""
+        return PERIOD_LABELS.get(entities.get('time_period'), PERIOD_LABELS['month'])
+    
     def _get_general_response(self, processed_query):
         """Generate general responses"""
         general_responses = [
@@ -0,0 +1,182 @@
+"""Hashing-vectorizer + linear-model intent classifier for chat queries
+
+The model is trained offline from the bundled labeled file and stored as
+plain NumPy arrays (weights, biases) plus a small JSON header, so loading it
+is an `np.load(..., mmap_mode='r')` with no unpickling and no training data
+in memory. A `HashingVectorizer` needs no fitted vocabulary, so prediction
+is one sparse transform and one sparse x dense product for a whole batch
+of queries.
+
+    python -m app.chatbot.intent_classifier            # train and save
+    python -m app.chatbot.intent_classifier --evaluate # cross-validate only
+    python -m app.chatbot.intent_classifier --holdout  # classifier vs keywords on held-out queries
+"""
+import argparse
+import json
+import os
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TRAINING_FILE = os.path.join(DATA_DIR, 'intent_training.tsv')
+# Labeled queries never used for training
+HOLDOUT_FILE = os.path.join(DATA_DIR, 'intent_holdout.tsv')
+MODEL_DIR = os.path.join(DATA_DIR, 'intent_model')
+
+# Kept in the model header so training and inference always hash identically
+VECTORIZER_PARAMS = {
+    'n_features': 2 ** 14,
+    'ngram_range': [1, 2],
+    'alternate_sign': False,
+    'norm': 'l2',
+    'lowercase': True,
+    'token_pattern': r"(?u)\b[a-zA-Z][a-zA-Z']+\b|\b[a-z]\b"
+}
+
+
+def _vectorizer(params):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    params = dict(params, ngram_range=tuple(params['ngram_range']))
+    return HashingVectorizer(**params)
+
+
+def load_training_data(path=TRAINING_FILE):
+    """Return (queries, labels) from a tab-separated `intent<TAB>query` file"""
+    queries = []
+    labels = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            label, query = line.split('\t', 1)
+            labels.append(label)
+            queries.append(query)
+    return queries, labels
+
+
+def _fit(queries, labels, params):
+    from sklearn.linear_model import LogisticRegression
+    model = LogisticRegression(C=20.0, max_iter=2000)
+    model.fit(_vectorizer(params).transform(queries), labels)
+    return model
+
+
+def train(training_file=TRAINING_FILE, model_dir=MODEL_DIR, params=VECTORIZER_PARAMS):
+    """Fit the classifier and write weights.npy, bias.npy and model.json"""
+    queries, labels = load_training_data(training_file)
+    model = _fit(queries, labels, params)
+
+    os.makedirs(model_dir, exist_ok=True)
+    np.save(os.path.join(model_dir, 'weights.npy'),
+            np.ascontiguousarray(model.coef_.T, dtype=np.float32))
+    np.save(os.path.join(model_dir, 'bias.npy'), model.intercept_.astype(np.float32))
+    with open(os.path.join(model_dir, 'model.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'labels': [str(label) for label in model.classes_],
+            'vectorizer': params,
+            'training_examples': len(queries)
+        }, f, indent=2)
+    return model
+
+
+def evaluate(training_file=TRAINING_FILE, params=VECTORIZER_PARAMS, folds=5):
+    """Stratified cross-validated accuracy of the training recipe"""
+    from sklearn.model_selection import StratifiedKFold
+
+    queries, labels = load_training_data(training_file)
+    queries = np.array(queries, dtype=object)
+    labels = np.array(labels)
+    correct = 0
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=0)
+    for train_index, test_index in splitter.split(queries, labels):
+        model = _fit(list(queries[train_index]), labels[train_index], params)
+        predicted = model.predict(_vectorizer(params).transform(list(queries[test_index])))
+        correct += int((predicted == labels[test_index]).sum())
+    return correct / len(labels)
+
+
+def compare_on_holdout(holdout_file=HOLDOUT_FILE):
+    """Held-out intent accuracy of the chat pipeline per intent model
+
+    Returns {'keywords': accuracy, 'classifier': accuracy}, the second being
+    the classifier with its confidence threshold and keyword fallback, as
+    `NLPProcessor(intent_model='classifier')` answers.
+    """
+    from .nlp_processor import NLPProcessor
+
+    queries, labels = load_training_data(holdout_file)
+    accuracy = {}
+    for intent_model in ('keywords', 'classifier'):
+        processed = NLPProcessor(intent_model=intent_model).process_queries(queries)
+        correct = sum(result['intent'] == label for result, label in zip(processed, labels))
+        accuracy[intent_model] = correct / len(labels)
+    return accuracy
+
+
+class IntentClassifier:
+    """Memory-mapped linear intent model with batch prediction"""
+
+    def __init__(self, model_dir=MODEL_DIR):
+        with open(os.path.join(model_dir, 'model.json'), encoding='utf-8') as f:
+            header = json.load(f)
+        self.labels = header['labels']
+        self.vectorizer = _vectorizer(header['vectorizer'])
+        # (n_features, n_labels), paged in on demand rather than read up front
+        self.weights = np.load(os.path.join(model_dir, 'weights.npy'), mmap_mode='r')
+        self.bias = np.load(os.path.join(model_dir, 'bias.npy'))
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR):
+        """Load the model, or return None if it has not been trained or sklearn is missing"""
+        if not os.path.exists(os.path.join(model_dir, 'model.json')):
+            return None
+        try:
+            return cls(model_dir)
+        except ImportError:
+            return None
+
+    def predict_proba(self, queries):
+        """Class probabilities for a batch of queries, shape (len(queries), n_labels)"""
+        features = self.vectorizer.transform(queries)
+        scores = np.asarray(features @ self.weights) + self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, queries):
+        """[(intent, probability)] for a batch of queries"""
+        probabilities = self.predict_proba(queries)
+        best = probabilities.argmax(axis=1)
+        return [
+            (self.labels[index], float(probabilities[row, index]))
+            for row, index in enumerate(best)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the chat intent classifier')
+    parser.add_argument('--training-file', default=TRAINING_FILE)
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--evaluate', action='store_true', help='Only report cross-validated accuracy')
+    parser.add_argument('--holdout', action='store_true',
+                        help='Only compare the saved model with the keyword matcher on held-out queries')
+    args = parser.parse_args()
+
+    if args.holdout:
+        accuracy = compare_on_holdout()
+        print(f"📊 Held-out accuracy: keywords {accuracy['keywords']:.1%}, "
+              f"classifier {accuracy['classifier']:.1%}")
+        return
+
+    accuracy = evaluate(args.training_file)
+    print(f"📊 5-fold cross-validated accuracy: {accuracy:.1%}")
+    if args.evaluate:
+        return
+
+    train(args.training_file, args.model_dir)
+    print(f"✅ Intent model written to {args.model_dir}")
+
+
+if __name__ == '__main__':
+    main()
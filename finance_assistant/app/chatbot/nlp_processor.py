@@ -1,129 +1,143 @@
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+import os
 import re
+from functools import lru_cache
+from ..monitoring.tracing import traced
+from .query_matcher import QueryMatcher
+from .intent_classifier import IntentClassifier
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+# NLTK's English stopword list, vendored so startup never needs the network
+STOPWORDS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'stopwords_english.txt')
+
+# Everything but ASCII letters and whitespace is dropped before tokenizing
+_NON_LETTERS = re.compile(r'[^a-zA-Z\s]')
+
+
+@lru_cache(maxsize=None)
+def load_stopwords(path=STOPWORDS_FILE):
+    """Load the stopword list once per process
+
+    Falls back to NLTK's corpus (if installed and already downloaded) when
+    the vendored file is missing; never downloads anything.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return frozenset(line.strip() for line in f if line.strip())
+    except FileNotFoundError:
+        pass
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    except (ImportError, LookupError):
+        return frozenset()
+
+
+@lru_cache(maxsize=None)
+def _nltk_word_tokenize():
+    """NLTK's word_tokenize if NLTK and its punkt data are available locally"""
+    try:
+        import nltk
+        nltk.data.find('tokenizers/punkt')
+        return nltk.word_tokenize
+    except (ImportError, LookupError):
+        return None
+
+
+def tokenize(text, use_nltk=False):
+    """Lowercase, strip non-letters and split into word tokens
+
+    On the cleaned text (letters and whitespace only) NLTK's word_tokenize
+    produces the same tokens as a whitespace split, so the regex path is the
+    default; `use_nltk=True` opts into NLTK when it is available locally.
+    """
+    cleaned = _NON_LETTERS.sub('', text.lower())
+    if use_nltk:
+        word_tokenize = _nltk_word_tokenize()
+        if word_tokenize is not None:
+            return word_tokenize(cleaned)
+    return cleaned.split()
+
+# Intent keywords in priority order: the first listed intent that matches wins
+INTENT_KEYWORDS = {
+    'get_spending_summary': ['spent', 'spending', 'expense'],
+    'get_budget_status': ['budget', 'limit'],
+    'get_savings_advice': ['save', 'savings', 'goal'],
+    'get_income_report': ['income', 'salary', 'earn'],
+    'get_financial_report': ['report', 'summary', 'overview'],
+    'categorize_spending': ['category', 'type', 'classification']
+}
+
+TIME_KEYWORDS = {
+    'month': ['month', 'monthly'],
+    'week': ['week', 'weekly'],
+    'year': ['year', 'yearly', 'annual'],
+    'today': ['today'],
+    'yesterday': ['yesterday']
+}
+
+FINANCIAL_KEYWORDS = {
+    'budget': ['budget', 'spending', 'limit', 'allocation'],
+    'savings': ['save', 'savings', 'goal', 'target', 'accumulate'],
+    'spending': ['spent', 'expense', 'cost', 'purchase', 'buy'],
+    'income': ['income', 'salary', 'earnings', 'revenue'],
+    'report': ['report', 'summary', 'overview', 'analysis'],
+    'category': ['category', 'type', 'classification'],
+    'time': ['month', 'week', 'year', 'daily', 'weekly', 'monthly']
+}
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
 
 class NLPProcessor:
     """Natural Language Processing for financial chatbot"""
     
-    def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
-        self.financial_keywords = {
-            'budget': ['budget', 'spending', 'limit', 'allocation'],
-            'savings': ['save', 'savings', 'goal', 'target', 'accumulate'],
-            'spending': ['spent', 'expense', 'cost', 'purchase', 'buy'],
-            'income': ['income', 'salary', 'earnings', 'revenue'],
-            'report': ['report', 'summary', 'overview', 'analysis'],
-            'category': ['category', 'type', 'classification'],
-            'time': ['month', 'week', 'year', 'daily', 'weekly', 'monthly']
-        }
+    def __init__(self, use_nltk=False, intent_model='classifier', min_intent_probability=0.35):
+        self.use_nltk = use_nltk
+        self.stop_words = load_stopwords()
+        self.financial_keywords = FINANCIAL_KEYWORDS
+        self.matcher = QueryMatcher(INTENT_KEYWORDS, TIME_KEYWORDS, FINANCIAL_KEYWORDS)
+        # Falls back to keyword intents when the model is not trained or sklearn is missing
+        self.intent_classifier = IntentClassifier.load() if intent_model == 'classifier' else None
+        self.min_intent_probability = min_intent_probability
     
+    @traced('nlp_processor.process_query')
     def process_query(self, user_input):
-        """Process user input and extract intent and entities"""
-        
-        # Preprocess text
-        cleaned_text = self._preprocess_text(user_input)
-        
-        # Extract intent
-        intent = self._extract_intent(cleaned_text)
-        
-        # Extract entities
-        entities = self._extract_entities(cleaned_text)
-        
-        return {
-            'original_query': user_input,
-            'cleaned_text': cleaned_text,
-            'intent': intent,
-            'entities': entities,
-            'confidence': self._calculate_confidence(intent, entities)
-        }
+        """Process user input and extract intent and entities
+        
+        Entities come from one pass of the compiled matcher over the raw
+        query (so amounts survive); the intent and confidence come from the
+        trained classifier when available. `cleaned_text` is the
+        stopword-free text kept for the response payload.
+        """
+        return self.process_queries([user_input])[0]
+    
+    @traced('nlp_processor.process_queries')
+    def process_queries(self, user_inputs):
+        """Process a batch of queries, classifying all intents in one matrix operation"""
+        predictions = self.intent_classifier.predict(user_inputs) if self.intent_classifier else None
+        
+        results = []
+        for position, user_input in enumerate(user_inputs):
+            intent, entities, confidence = self.matcher.match(user_input)
+            if predictions is not None:
+                predicted, probability = predictions[position]
+                # An unsure model keeps the keyword matcher's answer, general_query included
+                if probability >= self.min_intent_probability:
+                    intent, confidence = predicted, round(probability, 2)
+            
+            results.append({
+                'original_query': user_input,
+                'cleaned_text': self._preprocess_text(user_input),
+                'intent': intent,
+                'entities': entities,
+                'confidence': confidence
+            })
+        return results
     
     def _preprocess_text(self, text):
         """Clean and preprocess text"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters and digits
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Tokenize
-        tokens = word_tokenize(text)
+        # Lowercase, remove special characters and digits, tokenize
+        tokens = tokenize(text, self.use_nltk)
         
         # Remove stopwords
-        tokens = [token for token in tokens if token not in self.stop_words]
+        stop_words = self.stop_words
+        tokens = [token for token in tokens if token not in stop_words]
         
         return ' '.join(tokens)
-    
-    def _extract_intent(self, text):
-        """Extract user intent from text"""
-        intents = {
-            'get_spending_summary': any(word in text for word in ['spent', 'spending', 'expense']),
-            'get_budget_status': any(word in text for word in ['budget', 'limit']),
-            'get_savings_advice': any(word in text for word in ['save', 'savings', 'goal']),
-            'get_income_report': any(word in text for word in ['income', 'salary', 'earn']),
-            'get_financial_report': any(word in text for word in ['report', 'summary', 'overview']),
-            'categorize_spending': any(word in text for word in ['category', 'type', 'classification'])
-        }
-        
-        # Return the first matching intent
-        for intent, matches in intents.items():
-            if matches:
-                return intent
-        
-        return 'general_query'
-    
-    def _extract_entities(self, text):
-        """Extract entities like time periods, categories, amounts"""
-        entities = {}
-        
-        # Extract time period
-        time_patterns = {
-            'month': r'\b(month|monthly)\b',
-            'week': r'\b(week|weekly)\b',
-            'year': r'\b(year|yearly|annual)\b',
-            'today': r'\b(today)\b',
-            'yesterday': r'\b(yesterday)\b'
-        }
-        
-        for period, pattern in time_patterns.items():
-            if re.search(pattern, text):
-                entities['time_period'] = period
-                break
-        
-        # Extract amounts (simplified)
-        amount_match = re.search(r'\$?(\d+(?:\.\d{2})?)', text)
-        if amount_match:
-            entities['amount'] = float(amount_match.group(1))
-        
-        # Extract categories
-        for category, keywords in self.financial_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                entities['category'] = category
-                break
-        
-        return entities
-    
-    def _calculate_confidence(self, intent, entities):
-        """Calculate confidence score for the extracted intent"""
-        base_confidence = 0.5
-        
-        # Increase confidence if we have relevant entities
-        if entities:
-            base_confidence += 0.3
-        
-        # Specific intent confidence boost
-        if intent != 'general_query':
-            base_confidence += 0.2
-        
-        return min(base_confidence, 1.0)
\ No newline at end of file
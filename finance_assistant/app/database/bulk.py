@@ -0,0 +1,79 @@
+"""Set-based maintenance of derived tables for large inserts
+
+The rollup and data-version triggers cost a few upserts per inserted row,
+which dominates bulk loads. `insert_many()` puts a row in
+`bulk_load_guard`, which the per-row insert triggers check before firing,
+inserts the rows, applies the same bookkeeping with one aggregate
+statement per table and removes the guard row, all inside the caller's
+transaction. No schema changes in the hot path: other connections never
+see the uncommitted guard row, so their inserts keep firing the triggers,
+and on rollback nothing is left behind.
+
+`indexes_deferred()` goes further for large loads into a comparatively
+small table: it drops the composite transaction indexes for the load and
+rebuilds them in one sorted pass before the transaction commits, instead
+of updating them row by row in random key order.
+"""
+from contextlib import contextmanager
+from .rollups import BULK_LOAD_GUARD, CREATE_GUARD_SQL, apply_rollup_delta, detect_schema, rollup_ddl
+from .versions import bump_versions_after, version_ddl
+
+# Created before migration 4 without the guard condition
+GUARDED_TRIGGERS = ('trg_rollups_after_insert', 'trg_versions_after_insert')
+# Created by migration 2; rebuilt from scratch faster than maintained during big loads
+DEFERRABLE_INDEXES = ('ix_transactions_user_date', 'ix_transactions_user_type_category')
+
+
+def install_bulk_load_guard(conn, schema=None):
+    """Create the guard table and recreate the insert triggers with their guard condition"""
+    schema = schema or detect_schema(conn)
+    conn.execute(CREATE_GUARD_SQL)
+    for name in GUARDED_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    for statement in rollup_ddl(**schema) + version_ddl():
+        conn.execute(statement)
+
+
+def insert_many(conn, sql, rows, schema=None):
+    """executemany `rows` into transactions with triggers replaced by aggregates
+
+    Must be called inside an open transaction (e.g. after BEGIN IMMEDIATE).
+    """
+    if not rows:
+        return
+    if not conn.in_transaction:
+        raise RuntimeError('insert_many() must run inside an open transaction')
+
+    after_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM transactions').fetchone()[0]
+    conn.execute(f'INSERT INTO {BULK_LOAD_GUARD} DEFAULT VALUES')
+    try:
+        conn.executemany(sql, rows)
+        apply_rollup_delta(conn, schema, after_id)
+        bump_versions_after(conn, after_id)
+    finally:
+        conn.execute(f'DELETE FROM {BULK_LOAD_GUARD}')
+
+
+@contextmanager
+def indexes_deferred(conn, names=DEFERRABLE_INDEXES):
+    """Drop the named indexes for the enclosed inserts and rebuild them afterwards
+
+    Must run inside an open transaction, which the caller commits after the
+    block: other connections never see the table without its indexes, and
+    if the block raises, the caller's rollback restores them untouched.
+    The rebuild reads the whole table, so this only pays off when the load
+    is large next to the rows already there.
+    """
+    if not conn.in_transaction:
+        raise RuntimeError('indexes_deferred() must run inside an open transaction')
+
+    placeholders = ', '.join('?' for _ in names)
+    saved = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name IN ({placeholders})",
+        tuple(names)
+    ).fetchall()
+    for name, _ in saved:
+        conn.execute(f'DROP INDEX {name}')
+    yield
+    for _, create_sql in saved:
+        conn.execute(create_sql)
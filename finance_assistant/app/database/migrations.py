@@ -0,0 +1,168 @@
+"""Versioned schema migrations and query-plan checks for the SQLite databases
+
+Migrations are applied in order and the last applied version is stored in
+`PRAGMA user_version`, so running `migrate()` on every start is cheap and
+idempotent. Each migration receives the column names of the schema it runs
+against (see `rollups.RAW_SCHEMA` / `rollups.ORM_SCHEMA`), which lets one
+list serve both the raw app.py database and the SQLAlchemy one.
+
+    python -m app.database.migrations --db finance.db [--check]
+"""
+import argparse
+from .bulk import install_bulk_load_guard
+from .connection import connect
+from .rollups import detect_schema, install_rollups
+from .versions import install_versions
+
+
+def _add_transaction_indexes(conn, schema):
+    type_column = schema['type_column']
+    date_column = schema['date_column']
+    # Windowed per-user analysis: date range scan that never touches the table
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS ix_transactions_user_date
+        ON transactions (user_id, {date_column}, {type_column}, category, amount)
+    ''')
+    # Per-user, per-type, per-category aggregates (anomaly seeding, expense loads)
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS ix_transactions_user_type_category
+        ON transactions (user_id, {type_column}, category, amount)
+    ''')
+    if _table_exists(conn, 'budgets'):
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_budgets_user_id ON budgets (user_id)')
+
+
+# (version, description, function) - append only, never renumber
+MIGRATIONS = [
+    (1, 'monthly category rollups', install_rollups),
+    (2, 'composite transaction indexes', _add_transaction_indexes),
+    (3, 'per-user data versions', install_versions),
+    (4, 'bulk-load guard on the insert triggers', install_bulk_load_guard),
+]
+
+
+def _table_exists(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def current_version(conn):
+    """Return the schema version recorded in the database file"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, schema=None):
+    """Apply pending migrations, each in its own transaction
+
+    Returns the list of versions that were applied.
+    """
+    schema = schema or detect_schema(conn)
+    if conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    version = current_version(conn)
+    for number, description, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        conn.execute('BEGIN')
+        try:
+            apply(conn, schema)
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(number)
+
+    if applied:
+        # Refresh planner statistics for the new indexes
+        conn.execute('PRAGMA optimize')
+    return applied
+
+
+def query_shapes(schema):
+    """The hot query shapes and the indexes allowed to serve each one"""
+    type_column = schema['type_column']
+    date_column = schema['date_column']
+    return [
+        (
+            'windowed spending analysis',
+            f'''SELECT {type_column}, category, SUM(amount) FROM transactions
+                WHERE user_id = ? AND {date_column} >= ? AND {date_column} <= ?
+                  AND {type_column} IN ('income', 'expense')
+                GROUP BY {type_column}, category''',
+            (1, '2024-01-01', '2024-02-01'),
+            ('ix_transactions_user_date',)
+        ),
+        (
+            'category anomaly seed',
+            f'''SELECT COUNT(*), SUM(amount), SUM(amount * amount) FROM transactions
+                WHERE user_id = ? AND {type_column} = 'expense' AND category = ?''',
+            (1, 'Food'),
+            ('ix_transactions_user_type_category',)
+        ),
+        (
+            'user expense load',
+            f'''SELECT id, amount, category, {date_column} FROM transactions
+                WHERE user_id = ? AND {type_column} = 'expense' ''',
+            (1,),
+            ('ix_transactions_user_type_category', 'ix_transactions_user_date')
+        ),
+        (
+            'user rollups',
+            '''SELECT month, transaction_type, category, total, count
+               FROM monthly_rollups WHERE user_id = ? ORDER BY month''',
+            (1,),
+            ('PRIMARY KEY',)
+        ),
+    ]
+
+
+def explain_query_plan(conn, sql, params=()):
+    """Return the detail lines of EXPLAIN QUERY PLAN for a statement"""
+    return [row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+
+
+def check_query_plans(conn, schema=None):
+    """Verify every hot query shape uses its index; return a list of problems
+
+    An empty list means all shapes are served by the expected index. Meant
+    to be asserted on in tests so a dropped index or a rewritten query that
+    falls back to a full table scan is caught.
+    """
+    schema = schema or detect_schema(conn)
+    problems = []
+    for name, sql, params, indexes in query_shapes(schema):
+        plan = explain_query_plan(conn, sql, params)
+        uses_index = any(index in line for line in plan for index in indexes)
+        full_scan = any(line.startswith('SCAN transactions') for line in plan)
+        if not uses_index or full_scan:
+            problems.append(f"{name}: expected {' or '.join(indexes)}, got {' | '.join(plan)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply schema migrations to a finance database')
+    parser.add_argument('--db', default='finance.db', help='SQLite database file (default: finance.db)')
+    parser.add_argument('--check', action='store_true', help='Also verify query plans use the indexes')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        applied = migrate(conn)
+        print(f"✅ Schema at version {current_version(conn)} (applied: {applied or 'none'})")
+        if args.check:
+            problems = check_query_plans(conn)
+            for problem in problems:
+                print(f"❌ {problem}")
+            if problems:
+                raise SystemExit(1)
+            print("✅ All query shapes use their indexes")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""Per-user monthly category rollups maintained by SQLite triggers
+
+`monthly_rollups` holds one row per (user_id, month, transaction_type,
+category) with the running SUM(amount) and COUNT(*). Triggers on the
+transactions table keep it current inside the same transaction as every
+insert, update and delete, so readers pay O(months x categories) instead of
+scanning raw rows. The same DDL serves both schemas in this project: the
+raw sqlite schema of app.py (`type`, `date`) and the SQLAlchemy models
+(`transaction_type`, `transaction_date`).
+
+The per-row insert triggers stand aside while `bulk_load_guard` holds a
+row, which `bulk.insert_many()` does inside its own transaction only.
+"""
+import argparse
+from .connection import connect
+
+ROLLUP_TABLE = 'monthly_rollups'
+
+# Column names of the transactions table for each schema flavour
+RAW_SCHEMA = {'type_column': 'type', 'date_column': 'date'}
+ORM_SCHEMA = {'type_column': 'transaction_type', 'date_column': 'transaction_date'}
+
+# Per-row insert triggers are skipped while this table is non-empty
+BULK_LOAD_GUARD = 'bulk_load_guard'
+CREATE_GUARD_SQL = f'CREATE TABLE IF NOT EXISTS {BULK_LOAD_GUARD} (id INTEGER PRIMARY KEY)'
+UNLESS_BULK_LOAD = f'WHEN NOT EXISTS (SELECT 1 FROM {BULK_LOAD_GUARD})'
+
+CREATE_TABLE_SQL = f'''
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        user_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        transaction_type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, month, transaction_type, category)
+    ) WITHOUT ROWID
+'''
+
+_MONTH = "COALESCE(strftime('%Y-%m', {row}.{date_column}), strftime('%Y-%m', 'now'))"
+
+_ADD_ROW = f'''
+        INSERT INTO {ROLLUP_TABLE} (user_id, month, transaction_type, category, total, count)
+        VALUES ({{row}}.user_id, {_MONTH}, {{row}}.{{type_column}}, {{row}}.category, {{row}}.amount, 1)
+        ON CONFLICT (user_id, month, transaction_type, category)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+'''
+
+_REMOVE_ROW = f'''
+        UPDATE {ROLLUP_TABLE} SET total = total - {{row}}.amount, count = count - 1
+        WHERE user_id = {{row}}.user_id AND month = {_MONTH}
+          AND transaction_type = {{row}}.{{type_column}} AND category = {{row}}.category;
+        DELETE FROM {ROLLUP_TABLE}
+        WHERE user_id = {{row}}.user_id AND month = {_MONTH}
+          AND transaction_type = {{row}}.{{type_column}} AND category = {{row}}.category
+          AND count <= 0;
+'''
+
+
+def rollup_ddl(type_column, date_column):
+    """Return the CREATE statements for the rollup table and its triggers"""
+    add_new = _ADD_ROW.format(row='NEW', type_column=type_column, date_column=date_column)
+    remove_old = _REMOVE_ROW.format(row='OLD', type_column=type_column, date_column=date_column)
+    return [
+        CREATE_GUARD_SQL,
+        CREATE_TABLE_SQL,
+        f'''
+    CREATE TRIGGER IF NOT EXISTS trg_rollups_after_insert
+    AFTER INSERT ON transactions {UNLESS_BULK_LOAD}
+    BEGIN{add_new}    END
+''',
+        f'''
+    CREATE TRIGGER IF NOT EXISTS trg_rollups_after_delete
+    AFTER DELETE ON transactions
+    BEGIN{remove_old}    END
+''',
+        f'''
+    CREATE TRIGGER IF NOT EXISTS trg_rollups_after_update
+    AFTER UPDATE OF user_id, amount, {type_column}, category, {date_column} ON transactions
+    BEGIN{remove_old}{add_new}    END
+''',
+    ]
+
+
+def rebuild_sql(type_column, date_column, user_id=None):
+    """Return (sql, params) statements that recompute rollups from raw rows"""
+    where = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+    month = _MONTH.format(row='transactions', date_column=date_column)
+    return [
+        (f'DELETE FROM {ROLLUP_TABLE} {where}', params),
+        (f'''
+        INSERT INTO {ROLLUP_TABLE} (user_id, month, transaction_type, category, total, count)
+        SELECT user_id, {month}, {type_column}, category, SUM(amount), COUNT(*)
+        FROM transactions {where}
+        GROUP BY 1, 2, 3, 4
+        ''', params),
+    ]
+
+
+def detect_schema(conn):
+    """Tell the raw app.py schema and the SQLAlchemy schema apart"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(transactions)').fetchall()}
+    return ORM_SCHEMA if 'transaction_type' in columns else RAW_SCHEMA
+
+
+def install_rollups(conn, schema=None):
+    """Create the rollup table and triggers, backfilling if the table is new"""
+    schema = schema or detect_schema(conn)
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ROLLUP_TABLE,)
+    ).fetchone() is not None
+    for statement in rollup_ddl(**schema):
+        conn.execute(statement)
+    if not existed:
+        rebuild_rollups(conn, schema)
+
+
+def rebuild_rollups(conn, schema=None, user_id=None):
+    """Recompute rollups from the transactions table (all users or one)"""
+    schema = schema or detect_schema(conn)
+    for sql, params in rebuild_sql(user_id=user_id, **schema):
+        conn.execute(sql, params)
+
+
+def apply_rollup_delta(conn, schema, after_id):
+    """Fold rows with id > after_id into the rollups with one set-based upsert
+
+    Used by bulk loaders that insert with the per-row insert trigger
+    standing aside; the result is identical to what the trigger would produce.
+    """
+    schema = schema or detect_schema(conn)
+    month = _MONTH.format(row='transactions', date_column=schema['date_column'])
+    conn.execute(f'''
+        INSERT INTO {ROLLUP_TABLE} (user_id, month, transaction_type, category, total, count)
+        SELECT user_id, {month}, {schema['type_column']}, category, SUM(amount), COUNT(*)
+        FROM transactions WHERE id > ?
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, month, transaction_type, category)
+        DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+    ''', (after_id,))
+
+
+def fetch_user_rollups(execute, user_id, transaction_type=None):
+    """Fetch (month, transaction_type, category, total, count) rows for a user
+
+    `execute` is any DB-API style callable taking (sql, params), e.g.
+    sqlite3's `conn.execute` or SQLAlchemy's `connection.exec_driver_sql`.
+    """
+    sql = f'''
+        SELECT month, transaction_type, category, total, count
+        FROM {ROLLUP_TABLE}
+        WHERE user_id = ?
+    '''
+    params = (user_id,)
+    if transaction_type is not None:
+        sql += ' AND transaction_type = ?'
+        params += (transaction_type,)
+    return execute(sql + ' ORDER BY month', params).fetchall()
+
+
+def summarize_rollups(rows):
+    """Fold rollup rows into the totals the analysis endpoints report"""
+    summary = {
+        'total_income': 0.0,
+        'total_expenses': 0.0,
+        'spending_by_category': {},
+        'expense_count_by_category': {},
+        'monthly_trends': {}
+    }
+    for month, transaction_type, category, total, count in rows:
+        summary['monthly_trends'][month] = summary['monthly_trends'].get(month, 0.0) + total
+        if transaction_type == 'income':
+            summary['total_income'] += total
+        elif transaction_type == 'expense':
+            summary['total_expenses'] += total
+            spending = summary['spending_by_category']
+            spending[category] = spending.get(category, 0.0) + total
+            counts = summary['expense_count_by_category']
+            counts[category] = counts.get(category, 0) + count
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild monthly category rollups from raw transactions')
+    parser.add_argument('--db', default='finance.db', help='SQLite database file (default: finance.db)')
+    parser.add_argument('--user-id', type=int, help='Only rebuild this user')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        schema = detect_schema(conn)
+        for statement in rollup_ddl(**schema):
+            conn.execute(statement)
+        rebuild_rollups(conn, schema, user_id=args.user_id)
+        conn.commit()
+        count = conn.execute(f'SELECT COUNT(*) FROM {ROLLUP_TABLE}').fetchone()[0]
+        print(f"✅ Rollups rebuilt: {count} rows in {ROLLUP_TABLE}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Per-user data versions bumped by triggers on every transaction write
+
+Caches key derived data (reports, charts, analysis) on (user_id, version):
+any insert, update or delete of a user's transactions bumps the version in
+the same transaction, so a stale entry can never be served and checking
+freshness is a single primary-key lookup that never touches transactions.
+"""
+from .rollups import CREATE_GUARD_SQL, UNLESS_BULK_LOAD
+
+VERSION_TABLE = 'user_data_versions'
+
+_BUMP = f'''
+        INSERT INTO {VERSION_TABLE} (user_id, version) VALUES ({{row}}.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+'''
+
+
+def version_ddl():
+    """Return the CREATE statements for the version table and its triggers"""
+    return [
+        CREATE_GUARD_SQL,
+        f'''
+    CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+''',
+        f'''
+    CREATE TRIGGER IF NOT EXISTS trg_versions_after_insert
+    AFTER INSERT ON transactions {UNLESS_BULK_LOAD}
+    BEGIN{_BUMP.format(row='NEW')}    END
+''',
+        f'''
+    CREATE TRIGGER IF NOT EXISTS trg_versions_after_delete
+    AFTER DELETE ON transactions
+    BEGIN{_BUMP.format(row='OLD')}    END
+''',
+        f'''
+    CREATE TRIGGER IF NOT EXISTS trg_versions_after_update
+    AFTER UPDATE ON transactions
+    BEGIN{_BUMP.format(row='OLD')}{_BUMP.format(row='NEW')}    END
+''',
+    ]
+
+
+def install_versions(conn, schema=None):
+    """Create the version table and triggers (schema-independent)"""
+    for statement in version_ddl():
+        conn.execute(statement)
+
+
+def bump_versions_after(conn, after_id):
+    """Bump the version of every user owning a row with id > after_id, once each"""
+    conn.execute(f'''
+        INSERT INTO {VERSION_TABLE} (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM transactions WHERE id > ?
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+    ''', (after_id,))
+
+
+def get_data_version(execute, user_id):
+    """Return the user's current data version (0 if they never wrote anything)
+
+    `execute` is a DB-API style callable taking (sql, params).
+    """
+    row = execute(f'SELECT version FROM {VERSION_TABLE} WHERE user_id = ?', (user_id,)).fetchone()
+    return row[0] if row else 0
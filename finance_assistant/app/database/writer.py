@@ -0,0 +1,139 @@
+"""Single-writer queue that group-commits concurrent inserts
+
+SQLite allows one writer at a time and every commit costs an fsync, so N
+concurrent single-row requests each committing on their own serialize on
+the write lock and pay N syncs. `GroupCommitWriter` funnels writes through
+one background thread that drains whatever is queued (up to `max_batch`),
+runs it in a single transaction and commits once, then resolves each
+caller's future with its own result. `call()` runs a function inside that
+transaction, for read-then-write steps that must not interleave with
+other writes.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from .connection import connect
+
+
+class GroupCommitWriter:
+    """Background writer thread batching queued statements into shared commits"""
+
+    def __init__(self, path=None, max_batch=1000, max_wait=0.002):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {'batches': 0, 'statements': 0}
+
+    def submit(self, sql, params=()):
+        """Queue one statement; the future resolves to its lastrowid"""
+        return self._enqueue(sql, params, 'one')
+
+    def submit_many(self, sql, rows):
+        """Queue an executemany; the future resolves to the rowids it inserted"""
+        return self._enqueue(sql, rows, 'many')
+
+    def submit_call(self, function):
+        """Queue `function(cursor)` to run in the shared transaction; the future resolves to its result"""
+        return self._enqueue(function, None, 'call')
+
+    def execute(self, sql, params=(), timeout=30):
+        """Run one statement through the writer and wait for its commit"""
+        return self.submit(sql, params).result(timeout)
+
+    def execute_many(self, sql, rows, timeout=60):
+        """Run an executemany through the writer and wait for its commit"""
+        return self.submit_many(sql, rows).result(timeout)
+
+    def call(self, function, timeout=30):
+        """Run `function(cursor)` on the writer thread and wait for its commit"""
+        return self.submit_call(function).result(timeout)
+
+    def _enqueue(self, target, params, kind):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((target, params, kind, future))
+        return future
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='group-commit-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            batch = [self._queue.get()]
+            # Give concurrent requests a moment to join this commit
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                pass
+            self._write_batch(conn, batch)
+
+    def _execute_many(self, cursor, sql, rows):
+        """All-or-nothing executemany inside the shared transaction"""
+        cursor.execute('SAVEPOINT write_many')
+        try:
+            cursor.executemany(sql, rows)
+        except Exception:
+            cursor.execute('ROLLBACK TO write_many')
+            cursor.execute('RELEASE write_many')
+            raise
+        cursor.execute('RELEASE write_many')
+        # One writer, one statement: AUTOINCREMENT ids of the rows are consecutive
+        last = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+        return list(range(last - len(rows) + 1, last + 1))
+
+    def _call(self, cursor, function):
+        """All-or-nothing function call inside the shared transaction"""
+        cursor.execute('SAVEPOINT write_call')
+        try:
+            result = function(cursor)
+        except Exception:
+            cursor.execute('ROLLBACK TO write_call')
+            cursor.execute('RELEASE write_call')
+            raise
+        cursor.execute('RELEASE write_call')
+        return result
+
+    def _write_batch(self, conn, batch):
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            for target, params, kind, future in batch:
+                # A failing statement is rolled back on its own; the rest still commit
+                try:
+                    if kind == 'many':
+                        results.append((future, self._execute_many(cursor, target, params), None))
+                    elif kind == 'call':
+                        results.append((future, self._call(cursor, target), None))
+                    else:
+                        cursor.execute(target, params)
+                        results.append((future, cursor.lastrowid, None))
+                except Exception as e:
+                    results.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.stats['batches'] += 1
+        self.stats['statements'] += len(batch)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -1,33 +1,138 @@
-from flask import Flask, request, jsonify, render_template
-from flask_login import login_required, current_user
-from .models.user import db
-from .auth.authentication import AuthenticationManager
-from .banking.transaction_processor import TransactionProcessor
-from .budget.budget_engine import BudgetEngine
-from .chatbot.nlp_processor import NLPProcessor
-from .chatbot.financial_advisor import FinancialAdvisor
-from .reporting.report_generator import ReportGenerator
+from flask import Flask, request, jsonify, render_template, send_file
+from flask_login import LoginManager, login_required, logout_user, current_user
+from .models.user import db, User
+from .models.budget import Budget
+from .models.transaction import Transaction  # noqa: F401 - mapped before User's relationships resolve
+from .services import ServiceRegistry
+from .auth.security import HasherBusy, RevocationList, TokenUser, TokenVerifier
+from .auth.rate_limit import LoginRateLimiter, MemoryBucketStore, RateLimitExceeded, SQLiteBucketStore
+from .reporting.export_jobs import ExportJobQueue, ExportQueueFull
+from .reporting.visualizations import CHART_FORMATS, ChartRenderer, ChartUnavailable, load_chart_data
+from .database.versions import get_data_version
+from .monitoring.middleware import init_metrics
+from .monitoring.profiler import ProfileStore, SlowRequestProfiler, init_profiler
+from .monitoring.tracing import instrument_sqlalchemy
+import math
 import os
 
+def init_db():
+    """Create tables and apply versioned migrations (rollups, indexes, versions)"""
+    from .database.migrations import migrate
+    from .database.rollups import ORM_SCHEMA
+    
+    db.create_all()
+    connection = db.engine.raw_connection()
+    try:
+        return migrate(connection, ORM_SCHEMA)
+    finally:
+        connection.close()
+
 def create_app():
-    """Application factory pattern"""
+    """Application factory pattern
+    
+    Engines (pandas, NLTK, the chatbot) are built lazily by the service
+    registry on first use, and the schema is created by the explicit
+    `flask init-db` step rather than on every boot.
+    """
     app = Flask(__name__)
     app.config.from_object('config.Config')
     
+    if app.config['METRICS_ENABLED']:
+        # First, so request timings include every other hook
+        init_metrics(app, endpoint=app.config['METRICS_ENDPOINT'])
+        instrument_sqlalchemy()
+    if app.config['PROFILER_ENABLED']:
+        instrument_sqlalchemy()
+        init_profiler(
+            app,
+            SlowRequestProfiler(
+                ProfileStore(app.config['PROFILER_DIR'] or os.path.join(app.instance_path, 'profiles'),
+                             max_profiles=app.config['PROFILER_MAX_PROFILES']),
+                threshold=app.config['QUERY_RESPONSE_TIME'],
+                interval=app.config['PROFILER_SAMPLE_INTERVAL'],
+                sample_after=app.config['PROFILER_SAMPLE_AFTER'],
+                max_statements=app.config['PROFILER_MAX_STATEMENTS']
+            ),
+            admin_token=app.config['PROFILER_ADMIN_TOKEN']
+        )
+    
     # Initialize extensions
     db.init_app(app)
+    login_manager = LoginManager(app)
+    token_verifier = TokenVerifier(
+        app.config['SECRET_KEY'],
+        revocations=RevocationList(
+            app.config['AUTH_REVOCATION_FILE']
+            or os.path.join(app.instance_path, 'revoked_tokens.jsonl')
+        ),
+        max_entries=app.config['AUTH_TOKEN_CACHE_SIZE']
+    )
+    app.extensions['token_verifier'] = token_verifier
+    login_limiter = LoginRateLimiter(
+        rules={'ip': app.config['LOGIN_RATE_LIMIT_PER_IP'],
+               'email': app.config['LOGIN_RATE_LIMIT_PER_EMAIL']},
+        store=(SQLiteBucketStore(app.config['LOGIN_RATE_LIMIT_DB'])
+               if app.config['LOGIN_RATE_LIMIT_DB']
+               else MemoryBucketStore(app.config['LOGIN_RATE_LIMIT_MAX_KEYS']))
+    )
+    app.extensions['login_limiter'] = login_limiter
+    
+    def rate_limited(e):
+        return (jsonify({'success': False, 'message': str(e)}), 429,
+                {'Retry-After': str(math.ceil(e.retry_after))})
+    
+    @login_manager.user_loader
+    def load_user(user_id):
+        return db.session.get(User, int(user_id))
+    
+    def bearer_claims(request):
+        """Verified claims of the request's `Authorization: Bearer` token, if any"""
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token.strip():
+            return None
+        return token_verifier.verify(token.strip())
+    
+    @login_manager.request_loader
+    def load_user_from_token(request):
+        # Bearer API clients: identity comes from the verified claims, not the database
+        claims = bearer_claims(request)
+        return TokenUser(claims) if claims else None
+    
+    @login_manager.unauthorized_handler
+    def unauthorized():
+        return jsonify({'success': False, 'message': 'Authentication required'}), 401
+    
+    # Shared engine instances, constructed on first use
+    services = ServiceRegistry(app.config)
+    app.extensions['services'] = services
+    
+    def render_export(user_id, export_format, filename):
+        user = db.session.get(User, user_id)
+        return services.get('report_generator').export_report(user, export_format, filename)
     
-    # Initialize managers
-    auth_manager = AuthenticationManager()
-    transaction_processor = TransactionProcessor()
-    budget_engine = BudgetEngine()
-    nlp_processor = NLPProcessor()
-    financial_advisor = FinancialAdvisor()
-    report_generator = ReportGenerator()
+    export_queue = ExportJobQueue(
+        app,
+        render_export,
+        output_dir=app.config['EXPORT_DIR'] or os.path.join(app.instance_path, 'exports'),
+        workers=app.config['EXPORT_WORKERS'],
+        max_pending=app.config['EXPORT_MAX_PENDING'],
+        retention=app.config['EXPORT_RETENTION']
+    )
+    chart_renderer = ChartRenderer(
+        cache_dir=app.config['CHART_CACHE_DIR'] or os.path.join(app.instance_path, 'charts'),
+        workers=app.config['CHART_WORKERS'],
+        timeout=app.config['CHART_TIMEOUT'],
+        max_variants=app.config['CHART_CACHE_VARIANTS']
+    )
     
-    with app.app_context():
-        # Create tables
-        db.create_all()
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create the database schema and apply pending migrations"""
+        applied = init_db()
+        print(f"✅ Database ready (applied migrations: {applied or 'none'})")
+    
+    if app.config['WARMUP_SERVICES']:
+        services.start_warmup()
     
     # Routes
     @app.route('/')
@@ -42,36 +147,137 @@ def create_app():
     def register():
         """User registration endpoint"""
         data = request.get_json()
-        result = auth_manager.register_user(
-            email=data.get('email'),
-            password=data.get('password'),
-            first_name=data.get('first_name'),
-            last_name=data.get('last_name')
-        )
+        try:
+            login_limiter.check(ip=request.remote_addr)
+        except RateLimitExceeded as e:
+            return rate_limited(e)
+        try:
+            result = services.get('auth_manager').register_user(
+                email=data.get('email'),
+                password=data.get('password'),
+                first_name=data.get('first_name'),
+                last_name=data.get('last_name')
+            )
+        except HasherBusy as e:
+            return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '1'}
         return jsonify(result)
     
+    @app.route('/api/login', methods=['POST'])
+    def login():
+        """User login endpoint (password + MFA token)"""
+        data = request.get_json(silent=True) or {}
+        # Throttled before the user lookup and the bcrypt check it would cost
+        try:
+            login_limiter.check(ip=request.remote_addr, email=data.get('email'))
+        except RateLimitExceeded as e:
+            return rate_limited(e)
+        try:
+            result = services.get('auth_manager').login_user(
+                email=data.get('email'),
+                password=data.get('password') or '',
+                mfa_token=data.get('mfa_token')
+            )
+        except HasherBusy as e:
+            # Refuse fast rather than queue behind a storm of bcrypt work
+            return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '1'}
+        return jsonify(result), 200 if result['success'] else 401
+    
+    @app.route('/api/auth/stats', methods=['GET'])
+    @login_required
+    def auth_stats():
+        """Rate limiter decisions, password hashing pool and token cache counters"""
+        return jsonify({
+            'success': True,
+            'rate_limiter': login_limiter.stats(),
+            'password_hasher': (services.get('password_hasher').stats()
+                                if services.is_loaded('password_hasher') else None),
+            'token_cache': token_verifier.stats()
+        })
+    
+    @app.route('/api/logout', methods=['POST'])
+    @login_required
+    def logout():
+        """End the session and revoke the bearer token the request was made with
+        
+        The header's token is revoked even when the session cookie is what
+        authenticated the request (the session user carries no claims).
+        """
+        claims = bearer_claims(request)
+        if claims:
+            token_verifier.revoke(claims)
+        logout_user()
+        return jsonify({'success': True, 'message': 'Logged out'})
+    
     @app.route('/api/chat', methods=['POST'])
     @login_required
     def chat():
         """Chatbot endpoint for financial queries"""
         data = request.get_json()
         user_query = data.get('query', '')
+        session_id = str(data.get('session_id') or 'default')[:64]
         
         # Process query with NLP
-        processed_query = nlp_processor.process_query(user_query)
+        processed_query = services.get('nlp_processor').process_query(user_query)
         
-        # Get response from financial advisor
-        response = financial_advisor.get_response(
+        # Get response from financial advisor, in the context of the session's last turns
+        financial_advisor = services.get('financial_advisor')
+        response, processed_query = financial_advisor.converse(
             user=current_user,
-            processed_query=processed_query
+            processed_query=processed_query,
+            session_id=session_id
         )
         
         return jsonify({
             'query': user_query,
             'response': response,
-            'processed_data': processed_query
+            'processed_data': processed_query,
+            'session_id': session_id
         })
     
+    @app.route('/api/chat/stats', methods=['GET'])
+    @login_required
+    def chat_stats():
+        """Occupancy, memory and eviction counters of the chat session store"""
+        financial_advisor = services.get('financial_advisor')
+        return jsonify({
+            'success': True,
+            'sessions': financial_advisor.conversations.stats(),
+            'contexts': financial_advisor.contexts.stats()
+        })
+    
+    @app.route('/api/chat/batch', methods=['POST'])
+    @login_required
+    def chat_batch():
+        """Answer several chatbot queries from a single analysis of the user's data"""
+        data = request.get_json(silent=True) or {}
+        queries = data.get('queries')
+        max_queries = app.config['CHAT_BATCH_MAX_QUERIES']
+        
+        if not isinstance(queries, list) or not queries:
+            return jsonify({'success': False, 'message': 'queries must be a non-empty list'}), 400
+        if len(queries) > max_queries:
+            return jsonify({'success': False, 'message': f'At most {max_queries} queries per batch'}), 400
+        if not all(isinstance(query, str) for query in queries):
+            return jsonify({'success': False, 'message': 'Every query must be a string'}), 400
+        
+        nlp_processor = services.get('nlp_processor')
+        financial_advisor = services.get('financial_advisor')
+        context = financial_advisor.get_context(current_user)
+        
+        results = []
+        for user_query, processed_query in zip(queries, nlp_processor.process_queries(queries)):
+            results.append({
+                'query': user_query,
+                'response': financial_advisor.get_response(
+                    user=current_user,
+                    processed_query=processed_query,
+                    context=context
+                ),
+                'processed_data': processed_query
+            })
+        
+        return jsonify({'success': True, 'results': results})
+    
     @app.route('/api/budget/generate', methods=['POST'])
     @login_required
     def generate_budget():
@@ -80,13 +286,9 @@ def create_app():
         income = data.get('monthly_income')
         savings_goal = data.get('savings_goal')
         
-        # Get user's transactions
-        transactions = current_user.transactions
-        
         # Generate budget
-        budget = budget_engine.generate_monthly_budget(
+        budget = services.get('budget_engine').generate_monthly_budget(
             user=current_user,
-            historical_data=transactions,
             income=income,
             savings_goal=savings_goal
         )
@@ -100,14 +302,98 @@ def create_app():
     @login_required
     def generate_financial_health_report():
         """Generate financial health report"""
-        report = report_generator.generate_financial_health_report(current_user)
+        report = services.get('report_generator').generate_financial_health_report(current_user)
         return jsonify(report)
     
+    @app.route('/api/reports/cache-stats', methods=['GET'])
+    @login_required
+    def report_cache_stats():
+        """Report cache hit/miss counters for sizing"""
+        return jsonify(services.get('report_generator').cache.stats())
+    
+    @app.route('/api/reports/export', methods=['POST'])
+    @login_required
+    def submit_report_export():
+        """Queue a PDF or Excel export of the financial health report"""
+        data = request.get_json(silent=True) or {}
+        try:
+            job = export_queue.submit(current_user.id, data.get('format', 'pdf'))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except ExportQueueFull as e:
+            return jsonify({'success': False, 'message': str(e)}), 503
+        
+        return jsonify({'success': True, **job.to_dict()}), 202
+    
+    @app.route('/api/reports/export/<job_id>', methods=['GET'])
+    @login_required
+    def report_export_status(job_id):
+        """Status of a queued export"""
+        job = export_queue.get(job_id, current_user.id)
+        if job is None:
+            return jsonify({'success': False, 'message': 'Export job not found'}), 404
+        return jsonify({'success': True, **job.to_dict()})
+    
+    @app.route('/api/reports/export/<job_id>/download', methods=['GET'])
+    @login_required
+    def download_report_export(job_id):
+        """Download a finished export"""
+        job = export_queue.get(job_id, current_user.id)
+        if job is None:
+            return jsonify({'success': False, 'message': 'Export job not found'}), 404
+        if job.status != 'done':
+            return jsonify({'success': False, 'message': f'Export is {job.status}', **job.to_dict()}), 409
+        try:
+            return send_file(job.path, mimetype=job.mimetype, as_attachment=True,
+                             download_name=job.download_name)
+        except FileNotFoundError:
+            # Expired by the sweeper between the lookup and the download
+            return jsonify({'success': False, 'message': 'Export job not found'}), 404
+    
+    @app.route('/api/reports/charts/<chart_type>', methods=['GET'])
+    @login_required
+    def render_chart(chart_type):
+        """Render a chart as PNG or SVG (served from the disk cache when fresh)"""
+        chart_format = request.args.get('format', 'png')
+        months = request.args.get('months', type=int)
+        if months is not None and not 1 <= months <= app.config['CHART_MAX_MONTHS']:
+            return jsonify({
+                'success': False,
+                'message': f"months must be between 1 and {app.config['CHART_MAX_MONTHS']}"
+            }), 400
+        params = {'months': months}
+        
+        budget = None
+        if chart_type == 'budget_vs_actual':
+            budget = (Budget.query.filter_by(user_id=current_user.id)
+                      .order_by(Budget.created_at.desc()).first())
+            # Budgets are not covered by the data version, so key on the budget too
+            params['budget_id'] = budget.id if budget else None
+        
+        execute = db.session.connection().exec_driver_sql
+        try:
+            path = chart_renderer.render(
+                current_user.id,
+                get_data_version(execute, current_user.id),
+                chart_type,
+                chart_format,
+                params,
+                lambda: load_chart_data(execute, current_user.id, chart_type, months, budget)
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except ChartUnavailable as e:
+            return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '5'}
+        
+        if path is None:
+            return jsonify({'success': False, 'message': 'No data available for this chart'}), 404
+        return send_file(path, mimetype=CHART_FORMATS[chart_format], max_age=0)
+    
     @app.route('/api/transactions/analyze', methods=['GET'])
     @login_required
     def analyze_spending():
         """Analyze spending patterns"""
-        analysis = transaction_processor.analyze_spending_patterns(current_user.transactions)
+        analysis = services.get('transaction_processor').analyze_spending_patterns(current_user.id)
         return jsonify(analysis)
     
     return app
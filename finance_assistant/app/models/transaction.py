@@ -22,6 +22,18 @@ class Transaction(db.Model):
     """Transaction model for financial transactions"""
     
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Covers windowed per-user analysis: range scan on date, no table lookups
+        db.Index(
+            'ix_transactions_user_date',
+            'user_id', 'transaction_date', 'transaction_type', 'category', 'amount'
+        ),
+        # Per-user type/category aggregates (anomaly seeding, expense loads)
+        db.Index(
+            'ix_transactions_user_type_category',
+            'user_id', 'transaction_type', 'category', 'amount'
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
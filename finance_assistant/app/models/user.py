@@ -1,10 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_login import UserMixin
 from datetime import datetime
 
 db = SQLAlchemy()
-bcrypt = Bcrypt()
 
 class User(UserMixin, db.Model):
     """User model for authentication and user data"""
@@ -23,14 +21,6 @@ class User(UserMixin, db.Model):
     transactions = db.relationship('Transaction', backref='user', lazy=True)
     budgets = db.relationship('Budget', backref='user', lazy=True)
     
-    def set_password(self, password):
-        """Hash and set password"""
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
-    
-    def check_password(self, password):
-        """Check hashed password"""
-        return bcrypt.check_password_hash(self.password_hash, password)
-    
     def get_full_name(self):
         """Return full name of user"""
         return f"{self.first_name} {self.last_name}"
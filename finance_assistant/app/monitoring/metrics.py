@@ -0,0 +1,199 @@
+"""Process-wide counters, gauges and histograms in Prometheus text format
+
+A deliberately small subset of the Prometheus client: metrics are kept in
+plain dicts keyed by label values, updated under one lock per metric, and
+rendered on demand by `MetricsRegistry.render()` (exposition format 0.0.4).
+Recording a sample is a dict lookup and a couple of additions, cheap enough
+to leave on for every request.
+
+Values are per process: with several worker processes each one exposes its
+own `/metrics`, which Prometheus scrapes and sums like any other target.
+"""
+import bisect
+import math
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; from a cached lookup to a cold report over a large history
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def sort_key(item):
+    # Label values are stored as passed (e.g. status codes as ints)
+    return tuple(str(value) for value in item[0])
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{escape_label(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Base of the metric types: a name, help text and label names"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple([labels[name] for name in self.labelnames])
+
+    def samples(self):
+        """[(suffix, label values, extra labels, value)] for rendering"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, values, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{format_labels(self.labelnames, values, extra)} '
+                         f'{format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing total (by convention named `..._total`)"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items(), key=sort_key)
+        return [('', values, (), value) for values, value in items]
+
+
+class Gauge(Metric):
+    """Value that goes up and down (requests in flight, entries cached)"""
+
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items(), key=sort_key)
+        return [('', values, (), value) for values, value in items]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative `le` buckets, with their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Per-bucket (not cumulative) counts; the +Inf bucket is the last slot
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def get(self, **labels):
+        """(count, sum) of the observations with these labels"""
+        series = self._values.get(self._key(labels))
+        return (series[2], series[1]) if series else (0, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(((key, ([*series[0]], series[1], series[2]))
+                            for key, series in self._values.items()), key=sort_key)
+        samples = []
+        for values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', values, (('le', format_value(float(bound))),), cumulative))
+            samples.append(('_sum', values, (), total))
+            samples.append(('_count', values, (), count))
+        return samples
+
+
+class MetricsRegistry:
+    """Named metrics of the process; asking twice for a name returns the same metric"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'Metric {name} is already registered as a different metric')
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return '\n'.join(metric.render() for _, metric in metrics) + '\n'
+
+
+# The registry the app's instrumentation records into
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,91 @@
+"""Per-route request metrics for a Flask app, and the `/metrics` endpoint
+
+`init_metrics(app)` times every request from its first `before_request`
+hook to `teardown_request`, and records per route (the URL rule, so
+`/api/analysis/<int:user_id>` is one series however many users there are):
+
+    http_requests_total               by method, route and status
+    http_request_duration_seconds     latency histogram
+    http_request_sql_statements       statements per request (histogram)
+    http_request_sql_seconds          SQL time per request (histogram)
+    http_request_span_seconds_total   time in each named span, by route
+    http_requests_in_flight
+
+alongside the process-wide SQL and span metrics of `app.monitoring.tracing`.
+"""
+import time
+from flask import Response, g, request
+from .metrics import CONTENT_TYPE, REGISTRY
+from .tracing import begin_request, end_request
+
+# Requests that matched no URL rule (404s, probes) share one series
+UNMATCHED_ROUTE = '<unmatched>'
+
+SQL_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000)
+
+REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'HTTP requests served', ('method', 'route', 'status')
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time to serve an HTTP request', ('method', 'route')
+)
+REQUEST_SQL_STATEMENTS = REGISTRY.histogram(
+    'http_request_sql_statements', 'SQL statements executed per request', ('route',),
+    buckets=SQL_STATEMENT_BUCKETS
+)
+REQUEST_SQL_SECONDS = REGISTRY.histogram(
+    'http_request_sql_seconds', 'Time executing SQL per request', ('route',)
+)
+REQUEST_SPAN_SECONDS = REGISTRY.counter(
+    'http_request_span_seconds_total', 'Time in each named span while serving a route',
+    ('route', 'span')
+)
+IN_FLIGHT = REGISTRY.gauge('http_requests_in_flight', 'HTTP requests being served')
+
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+    g._metrics_stats, g._metrics_token = begin_request()
+    IN_FLIGHT.inc()
+
+
+def _remember_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+def _record(exc):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = g.pop('_metrics_stats')
+    end_request(g.pop('_metrics_token'))
+    IN_FLIGHT.dec()
+
+    rule = request.url_rule
+    route = rule.rule if rule is not None else UNMATCHED_ROUTE
+    status = g.pop('_metrics_status', 500 if exc is not None else 200)
+    REQUESTS.inc(method=request.method, route=route, status=status)
+    REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+    REQUEST_SQL_STATEMENTS.observe(stats.sql_statements, route=route)
+    REQUEST_SQL_SECONDS.observe(stats.sql_seconds, route=route)
+    for name, seconds in stats.spans.items():
+        REQUEST_SPAN_SECONDS.inc(seconds, route=route, span=name)
+
+
+def init_metrics(app, registry=REGISTRY, endpoint='/metrics'):
+    """Instrument every request of `app` and serve `registry` at `endpoint`
+
+    Call before registering other request hooks, so the timing includes them.
+    """
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_timer)
+    app.after_request(_remember_status)
+    app.teardown_request(_record)
+
+    def metrics():
+        """Prometheus scrape endpoint"""
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule(endpoint, 'metrics', metrics)
+    return registry
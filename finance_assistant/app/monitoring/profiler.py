@@ -0,0 +1,336 @@
+"""Opt-in sampling profiler that keeps evidence of slow requests
+
+While a request is served its thread is registered with `StackSampler`, a
+single background thread that every `interval` seconds snapshots the
+stacks of the registered threads (`sys._current_frames()`) and counts them
+in collapsed form (`outer;inner;leaf`). Requests are only sampled once they
+have run for `sample_after` seconds, so a request that finishes sooner
+costs two dict operations and is never interrupted: the sampler sleeps
+until the oldest request in flight becomes due, or until one starts.
+
+A request that ends slower than `threshold` (Config.QUERY_RESPONSE_TIME)
+is written to `ProfileStore`, a ring buffer of JSON files on disk, with
+its stack samples, its distinct SQL statements (text without parameters,
+with execution counts and time), the sizes of the DataFrames built for it
+and its span totals. `flame_graph()` and `collapsed_stacks()` turn stored
+samples into d3-flame-graph JSON or flamegraph.pl input.
+"""
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from flask import g, jsonify, request, Response
+from .tracing import begin_request, current_stats, end_request
+
+# Bounds per stored profile
+MAX_STACK_DEPTH = 128
+MAX_DISTINCT_STACKS = 5000
+MAX_STATEMENT_CHARS = 2000
+
+
+def frame_name(frame):
+    code = frame.f_code
+    # co_qualname (Class.method) is Python 3.11+
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame):
+    """The stack ending at `frame` as 'root;...;leaf'"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def collapsed_stacks(stacks):
+    """flamegraph.pl input: one 'root;...;leaf count' line per stack"""
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+
+
+def flame_graph(stacks, name='root'):
+    """Nested {name, value, children} tree (the d3-flame-graph format)"""
+    root = {'name': name, 'value': 0, 'children': {}}
+    for stack, count in stacks.items():
+        root['value'] += count
+        node = root
+        for part in stack.split(';'):
+            child = node['children'].get(part)
+            if child is None:
+                child = node['children'][part] = {'name': part, 'value': 0, 'children': {}}
+            child['value'] += count
+            node = child
+
+    def finish(node):
+        node['children'] = sorted((finish(child) for child in node['children'].values()),
+                                  key=lambda child: -child['value'])
+        return node
+    return finish(root)
+
+
+class ProfileStore:
+    """The newest `max_profiles` profiles as JSON files in one directory
+
+    File names sort by write time, so the ring is pruned by deleting the
+    oldest names; every worker process can write to the same directory.
+    """
+
+    def __init__(self, directory, max_profiles=100):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        os.makedirs(directory, exist_ok=True)
+
+    def _names(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+
+    def save(self, profile):
+        profile_id = f'{time.time_ns():020d}-{os.getpid()}'
+        profile = {'id': profile_id, **profile}
+        path = os.path.join(self.directory, f'{profile_id}.json')
+        partial = f'{path}.part'
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(profile, f)
+        os.replace(partial, path)
+        for name in self._names()[:-self.max_profiles]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # Pruned concurrently by another process
+                pass
+        return profile_id
+
+    def latest(self, limit=10):
+        """Newest profiles first"""
+        profiles = []
+        for name in reversed(self._names()):
+            if len(profiles) >= limit:
+                break
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue
+        return profiles
+
+    def __len__(self):
+        return len(self._names())
+
+
+class ActiveRequest:
+    """Stack samples of one in-flight request"""
+
+    __slots__ = ('started', 'stacks', 'samples', 'dropped')
+
+    def __init__(self, started):
+        self.started = started
+        self.stacks = {}  # collapsed stack -> samples
+        self.samples = 0
+        self.dropped = 0
+
+    def add(self, stack):
+        self.samples += 1
+        if stack in self.stacks:
+            self.stacks[stack] += 1
+        elif len(self.stacks) < MAX_DISTINCT_STACKS:
+            self.stacks[stack] = 1
+        else:
+            self.dropped += 1
+
+
+class StackSampler:
+    """Background thread sampling the stacks of registered request threads"""
+
+    def __init__(self, interval=0.005, sample_after=0.25):
+        self.interval = interval
+        self.sample_after = sample_after
+        self._active = {}  # thread ident -> ActiveRequest
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def watch(self):
+        """Register the calling thread's request; returns its ActiveRequest"""
+        active = ActiveRequest(time.perf_counter())
+        with self._lock:
+            self._active[threading.get_ident()] = active
+        self._ensure_thread()
+        if not self._wake.is_set():
+            self._wake.set()
+        return active
+
+    def unwatch(self):
+        # Under the lock, so the sampler is never mid-way through this request's samples
+        with self._lock:
+            return self._active.pop(threading.get_ident(), None)
+
+    def _ensure_thread(self):
+        # Started on first use, and again in a worker forked after that
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            delay = self.sample()
+            if delay is not None:
+                time.sleep(delay)
+
+    def sample(self):
+        """Sample every request running for at least `sample_after`
+
+        Returns the seconds until a sample is next due, or None (and the
+        sampler waits for `watch()`) when no request is in flight.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            if not self._active:
+                self._wake.clear()
+                return None
+            due = []
+            next_due = self.sample_after
+            for ident, active in self._active.items():
+                wait = active.started + self.sample_after - now
+                if wait <= 0:
+                    due.append((ident, active))
+                else:
+                    next_due = min(next_due, wait)
+            if not due:
+                # Requests registered later become due later still
+                return next_due
+            frames = sys._current_frames()
+            for ident, active in due:
+                frame = frames.get(ident)
+                if frame is not None:
+                    active.add(collapse(frame))
+            del frames
+        return self.interval
+
+
+class SlowRequestProfiler:
+    """Samples requests and stores the profiles of those slower than `threshold`"""
+
+    def __init__(self, store, threshold=2.0, interval=0.005, sample_after=0.25,
+                 max_statements=500):
+        self.store = store
+        self.threshold = threshold
+        self.max_statements = max_statements
+        self.sampler = StackSampler(interval, sample_after)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.slow = 0
+
+    def start(self):
+        """Begin profiling the current request"""
+        stats = current_stats()
+        token = None
+        if stats is None:
+            # The metrics middleware is off: collect on our own
+            stats, token = begin_request()
+        stats.capture(self.max_statements)
+        g._profile = (self.sampler.watch(), stats, token)
+
+    def finish(self, exc=None):
+        """Stop profiling the current request; store it if it was slow"""
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return None
+        active, stats, token = profile
+        self.sampler.unwatch()
+        if token is not None:
+            end_request(token)
+        elapsed = time.perf_counter() - active.started
+        with self._lock:
+            self.requests += 1
+            if elapsed < self.threshold:
+                return None
+            self.slow += 1
+
+        user = g.get('_login_user')
+        rule = request.url_rule
+        statements = sorted(stats.statements.items(), key=lambda item: -item[1][2])
+        return self.store.save({
+            'recorded_at': time.time(),
+            'pid': os.getpid(),
+            'method': request.method,
+            'path': request.path,
+            'route': rule.rule if rule is not None else None,
+            'status': g.get('_profile_status', 500 if exc is not None else 200),
+            'user_id': getattr(user, 'id', None),
+            'duration_seconds': round(elapsed, 6),
+            'threshold_seconds': self.threshold,
+            'sample_interval': self.sampler.interval,
+            'sampled_after': self.sampler.sample_after,
+            'samples': active.samples,
+            'dropped_samples': active.dropped,
+            'stacks': active.stacks,
+            'sql': {
+                'statements': stats.sql_statements,
+                'seconds': round(stats.sql_seconds, 6),
+                'distinct': [
+                    {'statement': statement[:MAX_STATEMENT_CHARS], 'driver': driver,
+                     'executions': executions, 'seconds': round(seconds, 6)}
+                    for statement, (driver, executions, seconds) in statements
+                ]
+            },
+            'dataframes': [{'name': name, 'rows': rows, 'columns': columns, 'bytes': size}
+                           for name, rows, columns, size in stats.frames],
+            'spans': {name: round(seconds, 6) for name, seconds in stats.spans.items()}
+        })
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'slow': self.slow,
+                'threshold_seconds': self.threshold,
+                'stored': len(self.store),
+                'max_stored': self.store.max_profiles
+            }
+
+
+def init_profiler(app, profiler, admin_token=None, endpoint='/api/admin/profiles'):
+    """Profile every request of `app` and serve the stored profiles at `endpoint`
+
+    Call after `init_metrics()` so both share the request's SQL and span
+    totals. The endpoint requires an `X-Admin-Token` header equal to
+    `admin_token`, and is refused outright when no token is configured.
+    """
+    app.extensions['profiler'] = profiler
+    app.before_request(profiler.start)
+
+    def remember_status(response):
+        g._profile_status = response.status_code
+        return response
+
+    app.after_request(remember_status)
+    app.teardown_request(profiler.finish)
+
+    def slow_request_profiles():
+        """Flame-graph data of the last N slow requests"""
+        supplied = request.headers.get('X-Admin-Token', '')
+        if not admin_token or not hmac.compare_digest(supplied.encode('utf-8'), admin_token.encode('utf-8')):
+            return jsonify({'success': False, 'message': 'Admin token required'}), 403
+
+        limit = min(max(request.args.get('limit', 10, type=int), 1), profiler.store.max_profiles)
+        profiles = profiler.store.latest(limit)
+        if request.args.get('format') == 'collapsed':
+            # Every selected request merged, for flamegraph.pl / speedscope
+            merged = {}
+            for profile in profiles:
+                for stack, count in profile['stacks'].items():
+                    merged[stack] = merged.get(stack, 0) + count
+            return Response(collapsed_stacks(merged), content_type='text/plain; charset=utf-8')
+
+        for profile in profiles:
+            profile['flame_graph'] = flame_graph(profile.pop('stacks'), name=profile['route'] or profile['path'])
+        return jsonify({'success': True, 'profiler': profiler.stats(), 'profiles': profiles})
+
+    app.add_url_rule(endpoint, 'slow_request_profiles', slow_request_profiles)
+    return profiler
@@ -0,0 +1,206 @@
+"""Named spans and SQL accounting, attributed to the request being served
+
+`span(name)` (or the `@traced(name)` decorator) times a block of engine
+work such as a pandas analysis or a chat query. SQL is timed at the driver
+boundary: raw sqlite3 connections opened by `app.database.connection` use
+`TimedConnection`, and `instrument_sqlalchemy()` hooks every SQLAlchemy
+engine's cursor events. Both feed process-wide metrics, and while a request
+is being served (see `app.monitoring.middleware`) also its `RequestStats`,
+which the middleware turns into per-route SQL and span totals. A request
+being profiled (see `app.monitoring.profiler`) also keeps its statements
+and the sizes of the DataFrames built for it (`note_frame()`).
+
+Statement time is what `execute()` takes: for a SELECT that is the first
+step, not the fetching of the remaining rows, which shows up in the
+enclosing span instead. Span times include the spans and SQL nested in
+them.
+"""
+import contextvars
+import functools
+import sqlite3
+import time
+from .metrics import REGISTRY
+
+# Seconds; an indexed lookup takes tens of microseconds, a full scan of a large history tenths
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+SQL_SECONDS = REGISTRY.histogram(
+    'sql_execute_duration_seconds', 'Time to execute one SQL statement', ('driver',),
+    buckets=SQL_BUCKETS
+)
+SPAN_SECONDS = REGISTRY.histogram(
+    'span_duration_seconds', 'Duration of named units of engine work', ('span',)
+)
+
+# RequestStats of the request this thread (or task) is serving, if any
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """SQL and span totals accumulated while serving one request
+
+    `statements` and `frames` stay None (nothing is kept) unless the
+    request is being profiled and `capture()` was called.
+    """
+
+    __slots__ = ('sql_statements', 'sql_seconds', 'spans', 'statements', 'frames',
+                 'max_statements')
+
+    def __init__(self):
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.spans = {}  # span name -> seconds
+        self.statements = None  # SQL text -> [driver, executions, seconds]
+        self.frames = None  # [(name, rows, columns, bytes)]
+        self.max_statements = 0
+
+    def capture(self, max_statements=500):
+        """Keep this request's distinct SQL statements (up to a bound) and DataFrame sizes"""
+        self.statements = {}
+        self.frames = []
+        self.max_statements = max_statements
+
+
+def begin_request():
+    """Start collecting for the current request; returns (stats, reset token)"""
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_stats():
+    return _current.get()
+
+
+def record_sql(driver, seconds, statement=None):
+    SQL_SECONDS.observe(seconds, driver=driver)
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.sql_statements += 1
+    stats.sql_seconds += seconds
+    if stats.statements is not None and statement is not None:
+        # Aggregated by text, so a query run in a loop is one entry with its count
+        entry = stats.statements.get(statement)
+        if entry is not None:
+            entry[1] += 1
+            entry[2] += seconds
+        elif len(stats.statements) < stats.max_statements:
+            stats.statements[statement] = [driver, 1, seconds]
+
+
+def note_frame(name, frame):
+    """Record the size of a DataFrame built for the current request, if profiled"""
+    stats = _current.get()
+    if stats is not None and stats.frames is not None:
+        stats.frames.append((name, len(frame), len(frame.columns),
+                             int(frame.memory_usage(index=True, deep=False).sum())))
+
+
+class span:
+    """Time a block as the named span: `with span('reports.export'): ...`"""
+
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        SPAN_SECONDS.observe(elapsed, span=self.name)
+        stats = _current.get()
+        if stats is not None:
+            stats.spans[self.name] = stats.spans.get(self.name, 0.0) + elapsed
+        return False
+
+
+def traced(name):
+    """Decorator timing every call of a function as the named span"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TimedCursor(sqlite3.Cursor):
+    """sqlite3 cursor that records the time of each execute call"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_sql('sqlite3', time.perf_counter() - started, sql)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_sql('sqlite3', time.perf_counter() - started, sql)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            record_sql('sqlite3', time.perf_counter() - started, sql_script)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection (pass as `factory=`) whose statements are all timed
+
+    `Connection.execute()` and friends do not go through `cursor()`, so
+    they are routed through a `TimedCursor` explicitly.
+    """
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+_sqlalchemy_instrumented = False
+
+
+def instrument_sqlalchemy():
+    """Time the statements of every SQLAlchemy engine in the process (idempotent)"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_sql('sqlalchemy', time.perf_counter() - conn.info['query_started'].pop(), statement)
+
+    @event.listens_for(Engine, 'handle_error')
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started:
+            record_sql('sqlalchemy', time.perf_counter() - started.pop(), context.statement)
+
+    _sqlalchemy_instrumented = True
@@ -0,0 +1,23 @@
+"""Worker process pools that are safe to start from a threaded server
+
+By the time a pool starts, the web process runs request threads, the
+group-commit writer, the profiler's sampler and holds SQLite connections.
+A plain fork copies all of that, including locks other threads happen to
+hold, and a child can hang on the first one it touches. Pools are started
+with 'forkserver' where the platform has it, else 'spawn', so workers
+come from a clean single-threaded process and only import what the
+submitted function needs.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def pool_context():
+    """multiprocessing context for worker pools: forkserver if available, else spawn"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def process_pool(workers):
+    """ProcessPoolExecutor with `workers` processes started from `pool_context()`"""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
@@ -0,0 +1,156 @@
+"""In-process export job queue backed by a small worker pool
+
+Rendering a multi-year statement takes seconds, so the export endpoints
+only enqueue a job and return its id; a `ThreadPoolExecutor` renders the
+file in the background inside its own app context, and the client polls
+the status endpoint until the file can be downloaded. Finished files are
+kept for `retention` seconds and then removed along with their job, both
+on every lookup and by a sweeper thread, so files do not pile up on disk
+while nobody submits new exports.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'pdf': ('pdf', 'application/pdf'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+class ExportQueueFull(Exception):
+    """Raised when too many export jobs are already waiting"""
+
+
+class ExportJob:
+    """State of one export, shared between the request threads and a worker"""
+
+    def __init__(self, user_id, export_format, output_dir):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.format = export_format
+        self.path = os.path.join(output_dir, f'{self.id}.{EXPORT_FORMATS[export_format][0]}')
+        self.status = 'queued'
+        self.error = None
+        self.rows = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def mimetype(self):
+        return EXPORT_FORMATS[self.format][1]
+
+    @property
+    def download_name(self):
+        stamp = time.strftime('%Y%m%d', time.localtime(self.created_at))
+        return f'financial_report_{stamp}.{EXPORT_FORMATS[self.format][0]}'
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'format': self.format,
+            'status': self.status,
+            'rows': self.rows,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class ExportJobQueue:
+    """Runs export jobs on a worker pool and tracks them until they expire"""
+
+    # Upper bound on how often the sweeper looks for expired jobs (seconds)
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, app, render, output_dir, workers=2, max_pending=32, retention=3600):
+        self.app = app
+        self.render = render
+        self.output_dir = output_dir
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-export')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stopped = threading.Event()
+
+    def submit(self, user_id, export_format):
+        """Queue an export for a user; raises ValueError or ExportQueueFull"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+
+        self._expire()
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.status in ('queued', 'running'))
+            if pending >= self.max_pending:
+                raise ExportQueueFull('Too many exports in progress, try again shortly')
+            job = ExportJob(user_id, export_format, self.output_dir)
+            self._jobs[job.id] = job
+            if self._sweeper is None:
+                # Started with the first job: before that there is nothing to expire
+                self._sweeper = threading.Thread(target=self._sweep, name='report-export-sweeper',
+                                                 daemon=True)
+                self._sweeper.start()
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id, user_id):
+        """Return the user's job, or None if it does not exist, is not theirs or has expired"""
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def _run(self, job):
+        job.status = 'running'
+        job.started_at = time.time()
+        partial = f'{job.path}.part'
+        try:
+            with self.app.app_context():
+                job.rows = self.render(job.user_id, job.format, partial)
+            # Only complete files ever appear under the final name
+            os.replace(partial, job.path)
+            job.status = 'done'
+        except Exception:
+            # The traceback goes to the log; the client only learns that it failed
+            logger.exception('Export job %s (%s) failed', job.id, job.format)
+            job.status = 'failed'
+            job.error = 'The export could not be generated'
+            if os.path.exists(partial):
+                os.remove(partial)
+        finally:
+            job.finished_at = time.time()
+
+    def shutdown(self):
+        """Stop the sweeper and wait for running exports"""
+        self._stopped.set()
+        self._executor.shutdown(wait=True)
+
+    def _sweep(self):
+        interval = min(self.SWEEP_INTERVAL, max(self.retention, 1))
+        while not self._stopped.wait(interval):
+            self._expire()
+
+    def _expire(self):
+        """Forget finished jobs older than the retention period and delete their files"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if os.path.exists(job.path):
+                os.remove(job.path)
@@ -0,0 +1,187 @@
+"""Streaming PDF and Excel writers for financial health reports
+
+Both writers take the report dict built by `ReportGenerator` plus an
+iterable of transaction rows `(date, description, category, type, amount)`
+and consume the rows one at a time. openpyxl runs in write-only mode, which
+serializes each appended row straight to the sheet's temp file, so the
+Excel export stays flat. The PDF is drawn directly on a canvas with no
+flowable story, but reportlab's Canvas keeps every finished (compressed)
+page until save(): its memory grows with the page count, about 45 MB at
+100k transactions.
+"""
+TRANSACTION_HEADERS = ('Date', 'Description', 'Category', 'Type', 'Amount')
+
+
+def _summary_rows(report):
+    """(label, value) pairs for the metrics block shared by both formats"""
+    metrics = report.get('financial_metrics', {})
+    return [
+        ('Total income', metrics.get('total_income', 0)),
+        ('Total expenses', metrics.get('total_expenses', 0)),
+        ('Net savings', metrics.get('net_savings', 0)),
+        ('Savings rate (%)', metrics.get('savings_rate', 0)),
+    ]
+
+
+def _format_row(row):
+    date, description, category, transaction_type, amount = row
+    return (str(date or '')[:10], description or '', category or '', transaction_type or '', amount)
+
+
+def write_excel_report(path, report, transactions=()):
+    """Write the report and every transaction row to an .xlsx file
+
+    Returns the number of transaction rows written.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    user = report.get('user', {})
+
+    summary = workbook.create_sheet('Summary')
+    summary.column_dimensions['A'].width = 28
+    summary.column_dimensions['B'].width = 18
+    summary.append(['Financial Health Report'])
+    summary.append(['Name', user.get('name', '')])
+    summary.append(['Email', user.get('email', '')])
+    summary.append(['Report date', report.get('report_date', '')])
+    summary.append([])
+    for label, value in _summary_rows(report):
+        summary.append([label, value])
+    summary.append([])
+    summary.append(['Recommendations'])
+    for recommendation in report.get('recommendations', []):
+        summary.append([recommendation])
+
+    metrics = report.get('financial_metrics', {})
+    categories = workbook.create_sheet('Spending by Category')
+    categories.append(['Category', 'Total'])
+    for category, total in sorted(metrics.get('spending_by_category', {}).items(),
+                                  key=lambda item: item[1], reverse=True):
+        categories.append([category, round(total, 2)])
+
+    trends = workbook.create_sheet('Monthly Trends')
+    trends.append(['Month', 'Net flow'])
+    for month, total in sorted(metrics.get('monthly_trends', {}).items()):
+        trends.append([month, round(total, 2)])
+
+    sheet = workbook.create_sheet('Transactions')
+    for column, width in zip('ABCDE', (12, 48, 20, 10, 14)):
+        sheet.column_dimensions[column].width = width
+    sheet.append(list(TRANSACTION_HEADERS))
+    count = 0
+    for row in transactions:
+        sheet.append(_format_row(row))
+        count += 1
+
+    workbook.save(path)
+    return count
+
+
+def write_pdf_report(path, report, transactions=()):
+    """Write the report followed by a paginated transaction listing to a PDF
+
+    The summary breaks onto further pages when its category or
+    recommendation lists run long; the transaction table starts on a new
+    page with its header repeated on each one. Returns the number of
+    transaction rows written.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    width, height = A4
+    margin = 18 * mm
+    line = 5 * mm
+    columns = (margin, margin + 24 * mm, margin + 100 * mm, margin + 135 * mm)
+    amount_right = width - margin
+
+    pdf = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+    pdf.setTitle('Financial Health Report')
+    page = 1
+
+    def finish_page():
+        nonlocal page
+        pdf.setFont('Helvetica', 8)
+        pdf.drawRightString(amount_right, margin / 2, f'Page {page}')
+        pdf.showPage()
+        page += 1
+
+    def room(y, below=0):
+        """`y`, or the top of a new summary page if `below` more space would not fit"""
+        if y - below >= margin:
+            return y
+        finish_page()
+        pdf.setFont('Helvetica', 10)
+        return height - margin
+
+    def table_header(y):
+        pdf.setFont('Helvetica-Bold', 9)
+        for x, title in zip(columns, TRANSACTION_HEADERS[:4]):
+            pdf.drawString(x, y, title)
+        pdf.drawRightString(amount_right, y, TRANSACTION_HEADERS[4])
+        pdf.line(margin, y - 1.5 * mm, amount_right, y - 1.5 * mm)
+        pdf.setFont('Helvetica', 9)
+        return y - line
+
+    user = report.get('user', {})
+    metrics = report.get('financial_metrics', {})
+    y = height - margin
+    pdf.setFont('Helvetica-Bold', 16)
+    pdf.drawString(margin, y, 'Financial Health Report')
+    y -= 2 * line
+    pdf.setFont('Helvetica', 10)
+    for text in (user.get('name', ''), user.get('email', ''), f"Generated {report.get('report_date', '')}"):
+        pdf.drawString(margin, y, text)
+        y -= line
+    y -= line
+
+    for label, value in _summary_rows(report):
+        pdf.drawString(margin, y, label)
+        pdf.drawRightString(margin + 90 * mm, y, f'{value:,.2f}')
+        y -= line
+    y -= line
+
+    # A heading needs its first entry on the same page
+    y = room(y, line)
+    pdf.setFont('Helvetica-Bold', 11)
+    pdf.drawString(margin, y, 'Spending by category')
+    y -= line
+    pdf.setFont('Helvetica', 10)
+    for category, total in sorted(metrics.get('spending_by_category', {}).items(),
+                                  key=lambda item: item[1], reverse=True):
+        y = room(y)
+        pdf.drawString(margin, y, category)
+        pdf.drawRightString(margin + 90 * mm, y, f'{total:,.2f}')
+        y -= line
+    y -= line
+
+    y = room(y, line)
+    pdf.setFont('Helvetica-Bold', 11)
+    pdf.drawString(margin, y, 'Recommendations')
+    y -= line
+    pdf.setFont('Helvetica', 10)
+    for recommendation in report.get('recommendations', []):
+        y = room(y)
+        pdf.drawString(margin, y, f'- {recommendation}'[:110])
+        y -= line
+    finish_page()
+
+    y = table_header(height - margin)
+    count = 0
+    for row in transactions:
+        if y < margin:
+            finish_page()
+            y = table_header(height - margin)
+        date, description, category, transaction_type, amount = _format_row(row)
+        pdf.drawString(columns[0], y, date)
+        pdf.drawString(columns[1], y, description[:45])
+        pdf.drawString(columns[2], y, category[:20])
+        pdf.drawString(columns[3], y, transaction_type)
+        pdf.drawRightString(amount_right, y, f'{amount:,.2f}')
+        y -= line
+        count += 1
+
+    finish_page()
+    pdf.save()
+    return count
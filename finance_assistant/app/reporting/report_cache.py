@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReportCache:
+    """LRU + TTL cache for generated reports, validated by user data version
+
+    Entries are stored under a key (e.g. the user id) together with the data
+    version they were built from. A lookup only hits when the caller's
+    current version matches, so writes invalidate implicitly; TTL bounds
+    staleness of anything not captured by the version (e.g. profile edits).
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, version):
+        """Return the cached value for key at this version, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            cached_version, expires_at, value = entry
+            if cached_version != version or expires_at <= time.monotonic():
+                if cached_version == version:
+                    self.expirations += 1
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, version, value):
+        """Store a value built from `version`, evicting least recently used entries"""
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        """Hit/miss counters and occupancy, for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -1,19 +1,46 @@
-import pandas as pd
 from datetime import datetime
 import json
+from ..models.user import db
+from ..database.rollups import fetch_user_rollups, summarize_rollups
+from ..database.versions import get_data_version
+from ..monitoring.tracing import traced
+from ..banking.transaction_loader import iter_transaction_rows
+from .report_cache import ReportCache
+from .exporters import write_excel_report, write_pdf_report
 
 class ReportGenerator:
     """Generates financial reports in various formats"""
     
+    def __init__(self, cache_size=1024, cache_ttl=300):
+        self.cache = ReportCache(max_entries=cache_size, ttl=cache_ttl)
+    
+    @traced('report_generator.generate_financial_health_report')
     def generate_financial_health_report(self, user):
-        """Generate comprehensive financial health report"""
-        transactions = user.transactions
+        """Generate comprehensive financial health report
+        
+        Reports are cached per user and reused until a transaction write bumps
+        the user's data version (or the TTL lapses); a hit costs one
+        primary-key lookup and never reads the transactions table.
+        """
+        execute = db.session.connection().exec_driver_sql
+        version = get_data_version(execute, user.id)
+        report = self.cache.get(user.id, version)
+        if report is not None:
+            return report
+        
+        report = self._build_financial_health_report(user, execute)
+        self.cache.put(user.id, version, report)
+        return report
+    
+    def _build_financial_health_report(self, user, execute):
+        """Build the financial health report from the user's rollups"""
+        rollups = fetch_user_rollups(execute, user.id)
         
-        if not transactions:
+        if not rollups:
             return {"error": "No transaction data available"}
         
         # Analyze financial data
-        analysis = self._analyze_financial_health(transactions)
+        analysis = self._analyze_financial_health(rollups)
         
         report = {
             "user": {
@@ -28,30 +55,23 @@ class ReportGenerator:
         
         return report
     
-    def _analyze_financial_health(self, transactions):
-        """Analyze financial health metrics"""
-        df = pd.DataFrame([t.to_dict() for t in transactions])
+    def _analyze_financial_health(self, rollups):
+        """Analyze financial health metrics from monthly category rollups"""
+        summary = summarize_rollups(rollups)
         
         # Basic metrics
-        total_income = df[df['transaction_type'] == 'income']['amount'].sum()
-        total_expenses = df[df['transaction_type'] == 'expense']['amount'].sum()
+        total_income = summary['total_income']
+        total_expenses = summary['total_expenses']
         net_savings = total_income - total_expenses
         savings_rate = (net_savings / total_income * 100) if total_income > 0 else 0
         
-        # Spending by category
-        spending_by_category = df[df['transaction_type'] == 'expense'].groupby('category')['amount'].sum().to_dict()
-        
-        # Monthly trends (simplified)
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-        monthly_trends = df.groupby(df['transaction_date'].dt.to_period('M'))['amount'].sum()
-        
         return {
             "total_income": round(total_income, 2),
             "total_expenses": round(total_expenses, 2),
             "net_savings": round(net_savings, 2),
             "savings_rate": round(savings_rate, 2),
-            "spending_by_category": spending_by_category,
-            "monthly_trends": monthly_trends.to_dict()
+            "spending_by_category": summary['spending_by_category'],
+            "monthly_trends": summary['monthly_trends']
         }
     
     def _generate_recommendations(self, analysis):
@@ -75,14 +95,27 @@ class ReportGenerator:
         
         return recommendations
     
-    def export_report_pdf(self, report_data, filename):
-        """Export report as PDF (simplified implementation)"""
-        # In a real implementation, this would use ReportLab to generate PDF
-        print(f"PDF report generated: {filename}")
-        return {"status": "PDF export functionality would be implemented here"}
+    @traced('report_generator.export_report')
+    def export_report(self, user, export_format, filename):
+        """Render the user's report plus full transaction history to a file
+        
+        Transactions are streamed from the database straight into the writer,
+        so memory stays flat regardless of history length. Returns the number
+        of transaction rows written.
+        """
+        report = self.generate_financial_health_report(user)
+        if 'error' in report:
+            raise ValueError(report['error'])
+        
+        transactions = iter_transaction_rows(user.id)
+        if export_format == 'pdf':
+            return self.export_report_pdf(report, filename, transactions)
+        return self.export_report_excel(report, filename, transactions)
+    
+    def export_report_pdf(self, report_data, filename, transactions=()):
+        """Export report as PDF, drawing the transaction listing page by page"""
+        return write_pdf_report(filename, report_data, transactions)
     
-    def export_report_excel(self, report_data, filename):
-        """Export report as Excel (simplified implementation)"""
-        # In a real implementation, this would use openpyxl to generate Excel
-        print(f"Excel report generated: {filename}")
-        return {"status": "Excel export functionality would be implemented here"}
\ No newline at end of file
+    def export_report_excel(self, report_data, filename, transactions=()):
+        """Export report as Excel using openpyxl's write-only mode"""
+        return write_excel_report(filename, report_data, transactions)
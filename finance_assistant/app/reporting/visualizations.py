@@ -0,0 +1,252 @@
+"""Chart rendering in a process pool with an on-disk image cache
+
+Charts are drawn by matplotlib's headless Agg/SVG backends in worker
+processes, so neither the GIL nor pyplot's global figure state serializes
+concurrent requests. The web process only gathers the (small) chart data
+from the rollups and hands it over as plain lists.
+
+Rendered files are cached on disk under a name derived from the user's
+data version and the chart parameters, so a cache hit is a file lookup:
+no SQL beyond the version check, and matplotlib is never imported in API
+workers that only ever serve cached or non-chart requests. Each user keeps
+at most `max_variants` files per chart type (the newest ones, all at the
+current data version), so parameters like `months` cannot fill the disk.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from ..database.rollups import fetch_user_rollups
+from ..monitoring.tracing import traced
+from ..processes import process_pool
+
+CHART_TYPES = ('category_breakdown', 'monthly_trend', 'budget_vs_actual')
+CHART_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+# Shared palette so a category keeps its colour across charts
+PALETTE = ('#4C72B0', '#DD8452', '#55A868', '#C44E52', '#8172B3',
+           '#937860', '#DA8BC3', '#8C8C8C', '#CCB974', '#64B5CD')
+
+
+class ChartUnavailable(Exception):
+    """Raised when a chart could not be drawn in time (busy, hung or crashed worker)"""
+
+
+def category_breakdown_data(rollups, months=None):
+    """Expense totals per category, largest first, over the last `months` months"""
+    expense_rows = [row for row in rollups if row[1] == 'expense']
+    if months:
+        recent = sorted({row[0] for row in expense_rows})[-months:]
+        expense_rows = [row for row in expense_rows if row[0] in recent]
+
+    totals = {}
+    for month, transaction_type, category, total, count in expense_rows:
+        totals[category] = totals.get(category, 0.0) + total
+    ordered = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return {
+        'labels': [category for category, _ in ordered],
+        'values': [round(total, 2) for _, total in ordered]
+    }
+
+
+def monthly_trend_data(rollups, months=None):
+    """Income and expenses per month, oldest first"""
+    income = {}
+    expenses = {}
+    for month, transaction_type, category, total, count in rollups:
+        if transaction_type == 'income':
+            income[month] = income.get(month, 0.0) + total
+        elif transaction_type == 'expense':
+            expenses[month] = expenses.get(month, 0.0) + total
+
+    labels = sorted(set(income) | set(expenses))
+    if months:
+        labels = labels[-months:]
+    return {
+        'labels': labels,
+        'income': [round(income.get(month, 0.0), 2) for month in labels],
+        'expenses': [round(expenses.get(month, 0.0), 2) for month in labels]
+    }
+
+
+def budget_vs_actual_data(rollups, allocations, month):
+    """Budgeted vs actual spending per category for one month"""
+    actual = {}
+    for row_month, transaction_type, category, total, count in rollups:
+        if row_month == month and transaction_type == 'expense':
+            actual[category] = actual.get(category, 0.0) + total
+
+    labels = sorted(set(allocations) | set(actual))
+    return {
+        'month': month,
+        'labels': labels,
+        'budgeted': [round(float(allocations.get(category, 0.0)), 2) for category in labels],
+        'actual': [round(actual.get(category, 0.0), 2) for category in labels]
+    }
+
+
+def render_chart(chart_type, data, chart_format, path):
+    """Draw one chart and write it to `path` (runs inside a worker process)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+
+    # A bare Figure avoids pyplot's global figure registry entirely
+    figure = Figure(figsize=(8, 5), dpi=100)
+    axes = figure.add_subplot()
+
+    if chart_type == 'category_breakdown':
+        labels, values = data['labels'], data['values']
+        if values:
+            axes.pie(values, labels=labels, autopct='%1.1f%%', startangle=90,
+                     colors=[PALETTE[i % len(PALETTE)] for i in range(len(values))])
+            axes.axis('equal')
+        axes.set_title('Spending by category')
+    elif chart_type == 'monthly_trend':
+        positions = range(len(data['labels']))
+        axes.plot(positions, data['income'], marker='o', color=PALETTE[2], label='Income')
+        axes.plot(positions, data['expenses'], marker='o', color=PALETTE[3], label='Expenses')
+        axes.set_xticks(list(positions), data['labels'], rotation=45, ha='right')
+        axes.set_ylabel('Amount')
+        axes.set_title('Monthly income and expenses')
+        axes.legend()
+    elif chart_type == 'budget_vs_actual':
+        positions = range(len(data['labels']))
+        width = 0.4
+        axes.bar([p - width / 2 for p in positions], data['budgeted'], width,
+                 color=PALETTE[0], label='Budgeted')
+        axes.bar([p + width / 2 for p in positions], data['actual'], width,
+                 color=PALETTE[1], label='Actual')
+        axes.set_xticks(list(positions), data['labels'], rotation=45, ha='right')
+        axes.set_ylabel('Amount')
+        axes.set_title(f"Budget vs actual ({data['month']})")
+        axes.legend()
+    else:
+        raise ValueError(f"Unknown chart type: {chart_type}")
+
+    figure.tight_layout()
+    partial = f'{path}.{os.getpid()}.part'
+    figure.savefig(partial, format=chart_format)
+    os.replace(partial, path)
+    return path
+
+
+class ChartRenderer:
+    """Renders charts in a process pool and caches the files by data version"""
+
+    def __init__(self, cache_dir, workers=2, timeout=30, max_variants=8):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.max_variants = max_variants
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def cache_path(self, user_id, version, chart_type, chart_format, params):
+        """File name for a chart: user, data version, type and a digest of the params"""
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+        return os.path.join(
+            self.cache_dir, f'{user_id}-{version}-{chart_type}-{digest}.{chart_format}'
+        )
+
+    @traced('chart_renderer.render')
+    def render(self, user_id, version, chart_type, chart_format, params, load_data):
+        """Return the path of the rendered chart, drawing it only on a cache miss
+
+        `load_data()` is called on a miss to build the chart data; it must
+        return None when there is nothing to draw. Raises ChartUnavailable
+        when the worker does not deliver within `timeout` or its pool broke.
+        """
+        if chart_type not in CHART_TYPES:
+            raise ValueError(f"Unknown chart type: {chart_type}")
+        if chart_format not in CHART_FORMATS:
+            raise ValueError(f"Unsupported chart format: {chart_format}")
+
+        path = self.cache_path(user_id, version, chart_type, chart_format, params)
+        if os.path.exists(path):
+            return path
+
+        data = load_data()
+        if data is None:
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._prune(user_id, version, chart_type)
+        try:
+            future = self._get_executor().submit(render_chart, chart_type, data, chart_format, path)
+            return future.result(self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise ChartUnavailable('Chart rendering timed out, try again shortly')
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            self._reset_executor()
+            raise ChartUnavailable('Chart renderer restarted, try again shortly')
+
+    def _prune(self, user_id, version, chart_type):
+        """Delete this user's charts of this type built from older data, and
+        the oldest variants beyond `max_variants - 1` to make room for a new one"""
+        current = []
+        for cached in glob.glob(os.path.join(self.cache_dir, f'{user_id}-*-{chart_type}-*')):
+            if os.path.basename(cached).split('-', 2)[1] != str(version):
+                _remove(cached)
+            elif not cached.endswith('.part'):
+                current.append(cached)
+        if len(current) >= self.max_variants:
+            current.sort(key=_mtime)
+            for cached in current[:len(current) - self.max_variants + 1]:
+                _remove(cached)
+
+    def _get_executor(self):
+        # Started on the first cache miss so processes that never draw start no workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = process_pool(self.workers)
+        return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0.0
+
+
+def load_chart_data(execute, user_id, chart_type, months=None, budget=None):
+    """Build the data for a chart from the user's rollups, or None if empty"""
+    if chart_type == 'budget_vs_actual':
+        if budget is None:
+            return None
+        rollups = fetch_user_rollups(execute, user_id, transaction_type='expense')
+        return budget_vs_actual_data(
+            rollups, budget.get_allocations(), budget.start_date.strftime('%Y-%m')
+        )
+
+    rollups = fetch_user_rollups(execute, user_id)
+    if not rollups:
+        return None
+    if chart_type == 'category_breakdown':
+        return category_breakdown_data(rollups, months)
+    return monthly_trend_data(rollups, months)
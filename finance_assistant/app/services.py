@@ -0,0 +1,130 @@
+"""Lazily constructed, app-wide registry of engine instances
+
+The engines pull in pandas, NLTK and the chatbot stack, which together
+cost seconds to import. Route handlers ask the registry for a service by
+name instead: the module is imported and the instance built on first use,
+then shared by every request (and by other services, e.g. the financial
+advisor reuses the same transaction processor and budget engine).
+"""
+import logging
+import threading
+from .monitoring.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def _password_hasher(services):
+    from .auth.security import PasswordHasher
+    return PasswordHasher(
+        rounds=services.config['BCRYPT_LOG_ROUNDS'],
+        workers=services.config['PASSWORD_HASH_WORKERS'],
+        max_pending=services.config['PASSWORD_HASH_MAX_PENDING'],
+        timeout=services.config['PASSWORD_HASH_TIMEOUT']
+    )
+
+
+def _auth_manager(services):
+    from .auth.authentication import AuthenticationManager
+    return AuthenticationManager(hasher=services.get('password_hasher'))
+
+
+def _transaction_processor(services):
+    from .banking.transaction_processor import TransactionProcessor
+    return TransactionProcessor()
+
+
+def _budget_engine(services):
+    from .budget.budget_engine import BudgetEngine
+    return BudgetEngine()
+
+
+def _nlp_processor(services):
+    from .chatbot.nlp_processor import NLPProcessor
+    return NLPProcessor(
+        use_nltk=services.config['NLP_USE_NLTK'],
+        intent_model=services.config['NLP_INTENT_MODEL']
+    )
+
+
+def _financial_advisor(services):
+    from .chatbot.financial_advisor import FinancialAdvisor
+    return FinancialAdvisor(
+        transaction_processor=services.get('transaction_processor'),
+        budget_engine=services.get('budget_engine'),
+        context_cache_size=services.config['CHAT_CONTEXT_CACHE_SIZE'],
+        context_ttl=services.config['CHAT_CONTEXT_TTL'],
+        session_max=services.config['CHAT_SESSION_MAX'],
+        session_max_bytes=services.config['CHAT_SESSION_MAX_BYTES'],
+        session_ttl=services.config['CHAT_SESSION_TTL'],
+        session_max_turns=services.config['CHAT_SESSION_MAX_TURNS']
+    )
+
+
+def _report_generator(services):
+    from .reporting.report_generator import ReportGenerator
+    return ReportGenerator(
+        cache_size=services.config['REPORT_CACHE_SIZE'],
+        cache_ttl=services.config['REPORT_CACHE_TTL']
+    )
+
+
+DEFAULT_FACTORIES = {
+    'password_hasher': _password_hasher,
+    'auth_manager': _auth_manager,
+    'transaction_processor': _transaction_processor,
+    'budget_engine': _budget_engine,
+    'nlp_processor': _nlp_processor,
+    'financial_advisor': _financial_advisor,
+    'report_generator': _report_generator,
+}
+
+
+class ServiceRegistry:
+    """Builds each registered service once, on first request, and shares it"""
+
+    def __init__(self, config, factories=None):
+        self.config = config
+        self._factories = dict(DEFAULT_FACTORIES if factories is None else factories)
+        self._instances = {}
+        # Reentrant: factories resolve their own dependencies through get()
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        """Add or replace a factory taking the registry and returning the service"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                with span(f'services.build.{name}'):
+                    self._instances[name] = self._factories[name](self)
+            return self._instances[name]
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def warm_up(self, names=None):
+        """Construct services ahead of the first request that needs them"""
+        for name in names or list(self._factories):
+            self.get(name)
+
+    def start_warmup(self, names=None):
+        """Warm up on a daemon thread so startup itself is not delayed"""
+        thread = threading.Thread(
+            target=self._warm_up_logged, args=(names,), name='service-warmup', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _warm_up_logged(self, names):
+        # A failed warmup is not fatal: the service is retried on first use
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception:
+                logger.exception('Warmup of %s failed', name)
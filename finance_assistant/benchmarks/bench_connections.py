@@ -0,0 +1,122 @@
+"""Requests/second of the app.py API with per-request vs pooled SQLite connections
+
+Drives the real Flask handlers (through the test client, no network) from
+several threads with a read-heavy mix of GET /api/analysis/<id> and
+POST /api/transactions. The "before" run restores the old
+`sqlite3.connect('finance.db')`-per-request behaviour against a fresh,
+non-WAL database file: reads get a new connection per request, and the
+group-commit writer is replaced by one that opens, commits and closes its
+own connection per write, so inserts do not keep the writer's WAL
+connection.
+
+    python -m benchmarks.bench_connections --threads 8 --seconds 5
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def load_api(workdir):
+    """Import app.py as a module with its database living in `workdir`"""
+    os.chdir(workdir)
+    spec = importlib.util.spec_from_file_location('finance_api', APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def connect_per_request():
+    return sqlite3.connect('finance.db', timeout=5)
+
+
+class PerRequestWriter:
+    """Stand-in for GroupCommitWriter: every write commits on its own new connection"""
+
+    def call(self, function, timeout=30):
+        conn = connect_per_request()
+        try:
+            with conn:
+                return function(conn.cursor())
+        finally:
+            conn.close()
+
+    def execute_many(self, sql, rows, timeout=60):
+        def write(cursor):
+            cursor.executemany(sql, rows)
+            last = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+            return list(range(last - len(rows) + 1, last + 1))
+        return self.call(write, timeout)
+
+
+def run_workload(api, threads, seconds, write_ratio):
+    """Hammer the API from `threads` workers and return (requests, latencies)"""
+    client_lock = threading.Lock()
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        client = api.app.test_client()
+        local = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if rnd.random() < write_ratio:
+                client.post('/api/transactions', json={
+                    'user_id': 1, 'amount': -round(rnd.uniform(5, 120), 2),
+                    'type': 'expense', 'category': 'Food', 'description': 'bench'
+                })
+            else:
+                client.get('/api/analysis/1')
+            local.append(time.perf_counter() - started)
+        with client_lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return len(latencies), sorted(latencies)
+
+
+def report(label, count, latencies, seconds):
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    print(f"{label:<28} {count / seconds:>10,.0f} req/s   p50 {p50:6.2f} ms   p95 {p95:6.2f} ms")
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    api = load_api(tempfile.mkdtemp())
+    api.init_db()
+    api.app.test_client().post('/api/sample-data')
+
+    print(f"🏁 {args.threads} threads x {args.seconds:.0f}s, {args.write_ratio:.0%} writes")
+    pooled = report('pooled (WAL, tuned)', *run_workload(api, args.threads, args.seconds, args.write_ratio), args.seconds)
+
+    # Before: a brand-new default connection per request on a rollback-journal database
+    api = load_api(tempfile.mkdtemp())
+    api.get_connection = connect_per_request
+    api.transaction_writer = PerRequestWriter()
+    api.init_db()
+    api.app.test_client().post('/api/sample-data')
+    per_request = report('connect per request', *run_workload(api, args.threads, args.seconds, args.write_ratio), args.seconds)
+
+    print(f"📈 Speed-up: {pooled / per_request:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
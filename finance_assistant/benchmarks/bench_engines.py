@@ -0,0 +1,228 @@
+"""Timings of the core engines at several data sizes, saved as JSON
+
+Builds (or reuses) a synthetic database with one user per requested size
+(see `benchmarks.synthetic_data`) and times, against each user:
+
+    categorize_transaction            the user's descriptions made unique, cache cleared
+    analyze_spending_patterns         last 30 days of the synthetic history
+    detect_anomalies                  full expense history
+    generate_monthly_budget           from the expense rollups
+    generate_financial_health_report  cold (cache invalidated) and cached
+    NLPProcessor.process_query        the chat query corpus (size-independent)
+
+The synthetic history ends at `--end`, which is also the "now" of the
+time-windowed cases; a reused `--db` should be given the end it was
+generated with. Each case runs once to warm up, then `--repeat` times. Results go to
+`benchmarks/results/engines-<timestamp>.json` (or `--output`); with
+`--compare` a previous results file is read and every case slower than
+`--tolerance` times its baseline median (and by over `--min-delta-ms`) is
+reported, exiting 1.
+
+    python -m benchmarks.bench_engines --sizes 1000 10000 100000 1000000
+    python -m benchmarks.bench_engines --db /tmp/engines.db --compare benchmarks/results/engines-<...>.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from benchmarks.synthetic_data import DEFAULT_END
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+CHAT_CORPUS = os.path.join(ROOT, 'benchmarks', 'data', 'chat_queries.txt')
+
+# Cap on descriptions categorized per size: past this the categorizer cost is linear
+CATEGORIZE_LIMIT = 100000
+
+
+def prepare_database(path, sizes, seed, end):
+    """Return {size: user_id}, generating the database if `path` does not exist"""
+    from benchmarks.synthetic_data import populate
+    from app.database.connection import connect
+
+    if not os.path.exists(path):
+        print(f"⏳ Generating {sum(sizes):,} transactions into {path}")
+        return dict(zip(sizes, populate(path, sizes, seed=seed, end=end)))
+
+    conn = connect(path)
+    try:
+        counts = conn.execute('SELECT user_id, COUNT(*) FROM transactions GROUP BY user_id').fetchall()
+    finally:
+        conn.close()
+    users = {count: user_id for user_id, count in counts}
+    missing = [size for size in sizes if size not in users]
+    if missing:
+        raise SystemExit(f"{path} has no user with exactly {missing} transactions; "
+                         f"use a new --db to generate them")
+    return {size: users[size] for size in sizes}
+
+
+def build_cases(services, user, size, end):
+    """[(name, size, calls per run, function)] for one user"""
+    from app.models.transaction import Transaction
+    from app.models.user import db
+
+    transaction_processor = services.get('transaction_processor')
+    report_generator = services.get('report_generator')
+    # The generator draws from a few dozen merchants, which the categorizer's
+    # cache would answer after the first pass; the id makes each one a miss
+    descriptions = [f'{description} {transaction_id}' for transaction_id, description in db.session.execute(
+        db.select(Transaction.id, Transaction.description).where(Transaction.user_id == user.id)
+        .limit(CATEGORIZE_LIMIT)
+    )]
+
+    def categorize():
+        transaction_processor.categorizer.clear_cache()
+        categorize_transaction = transaction_processor.categorize_transaction
+        for description in descriptions:
+            categorize_transaction(description, 0)
+
+    def health_report_cold():
+        report_generator.cache.invalidate(user.id)
+        report_generator.generate_financial_health_report(user)
+
+    return [
+        ('categorize_transaction', len(descriptions), len(descriptions), categorize),
+        ('analyze_spending_patterns', size, 1,
+         lambda: transaction_processor.analyze_spending_patterns(user.id, end_date=end)),
+        ('detect_anomalies', size, 1, lambda: transaction_processor.detect_anomalies(user.id)),
+        ('generate_monthly_budget', size, 1,
+         lambda: services.get('budget_engine').generate_monthly_budget(user, 5000, 500)),
+        ('generate_financial_health_report', size, 1, health_report_cold),
+        ('generate_financial_health_report (cached)', size, 1,
+         lambda: report_generator.generate_financial_health_report(user)),
+    ]
+
+
+def nlp_case(services):
+    with open(CHAT_CORPUS, encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip()]
+    process_query = services.get('nlp_processor').process_query
+
+    def run():
+        for query in queries:
+            process_query(query)
+
+    return ('NLPProcessor.process_query', len(queries), len(queries), run)
+
+
+def time_case(name, size, calls, function, repeat):
+    function()  # warm-up: imports, caches, SQLite page cache
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    median = statistics.median(timings)
+    return {
+        'name': name,
+        'size': size,
+        'calls': calls,
+        'repeat': repeat,
+        'min_ms': round(min(timings), 4),
+        'median_ms': round(median, 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'median_us_per_call': round(median * 1000 / max(calls, 1), 3)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance, min_delta_ms):
+    """Print the change against a previous run; return the regressed cases
+
+    A case regresses when its median is over `tolerance` times the baseline
+    and also slower by more than `min_delta_ms`, so sub-millisecond noise on
+    the fastest cases is not reported.
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['name'], r['size']): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\n📊 Against {baseline_path} (tolerance {tolerance:.2f}x)")
+    for result in results:
+        before = baseline.get((result['name'], result['size']))
+        if before is None or not before['median_ms']:
+            continue
+        ratio = result['median_ms'] / before['median_ms']
+        regressed = ratio > tolerance and result['median_ms'] - before['median_ms'] > min_delta_ms
+        print(f"{'❌' if regressed else '✅'} {result['name']:<44} {result['size']:>9,}  "
+              f"{before['median_ms']:>10.2f} -> {result['median_ms']:>10.2f} ms  ({ratio:.2f}x)")
+        if regressed:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='transactions per benchmarked user')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', type=datetime.fromisoformat, default=DEFAULT_END,
+                        help=f'end of the synthetic history (default: {DEFAULT_END.date()})')
+    parser.add_argument('--db', help='synthetic database to reuse (generated if missing)')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/engines-<timestamp>.json)')
+    parser.add_argument('--compare', help='previous results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    parser.add_argument('--min-delta-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or os.path.join(tempfile.mkdtemp(), 'engines.db'))
+    users_by_size = prepare_database(db_path, args.sizes, args.seed, args.end)
+
+    # Config reads DATABASE_URL when it is first imported, i.e. in create_app()
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    from app.main import create_app
+    from app.models.user import User, db
+
+    app = create_app()
+    services = app.extensions['services']
+    results = []
+    with app.app_context():
+        cases = [nlp_case(services)]
+        for size, user_id in users_by_size.items():
+            cases.extend(build_cases(services, db.session.get(User, user_id), size, args.end))
+        for name, size, calls, function in cases:
+            result = time_case(name, size, calls, function, args.repeat)
+            results.append(result)
+            print(f"{name:<44} {size:>9,}  median {result['median_ms']:>10.2f} ms  "
+                  f"({result['median_us_per_call']:,.2f} us/call)")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"engines-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'end': args.end.isoformat(),
+                'sizes': args.sizes,
+                'repeat': args.repeat
+            },
+            'results': results
+        }, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance, args.min_delta_ms):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Latency of the trained intent classifier, per query and in batches
+
+Loads the memory-mapped model, then classifies every query of the chat
+corpus one at a time (reporting p50/p95/p99) and in batches (reporting the
+amortized cost per query), both for the bare classifier and for the full
+`NLPProcessor.process_query` path. Fails if the per-query p99 of the
+classifier exceeds the budget.
+
+    python -m benchmarks.bench_intents --repeat 50 --batch-size 64
+"""
+import argparse
+import time
+from app.chatbot.intent_classifier import IntentClassifier
+from app.chatbot.nlp_processor import NLPProcessor
+from .bench_nlp import CORPUS_PATH, load_corpus
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def single_query_latencies(process, queries, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            process(query)
+            latencies.append(time.perf_counter() - started)
+    return sorted(latencies)
+
+
+def batch_cost_per_query(process_batch, queries, repeat, batch_size):
+    batch = (queries * (batch_size // len(queries) + 1))[:batch_size]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        process_batch(batch)
+    return (time.perf_counter() - started) / (repeat * batch_size)
+
+
+def report(label, latencies):
+    p50, p95, p99 = (percentile(latencies, f) * 1000 for f in (0.5, 0.95, 0.99))
+    print(f"{label:<28} p50 {p50:6.3f} ms   p95 {p95:6.3f} ms   p99 {p99:6.3f} ms")
+    return p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    parser.add_argument('--p99-budget-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    queries = load_corpus(args.corpus)
+    started = time.perf_counter()
+    classifier = IntentClassifier.load()
+    if classifier is None:
+        raise SystemExit("❌ No trained model: run python -m app.chatbot.intent_classifier")
+    print(f"📦 model loaded in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    processor = NLPProcessor(intent_model='classifier')
+    # Warm up caches and the sparse code paths
+    classifier.predict(queries)
+    processor.process_queries(queries)
+
+    print(f"🏁 {len(queries)} queries x {args.repeat}")
+    p99 = report('classifier, 1 query', single_query_latencies(
+        lambda query: classifier.predict([query]), queries, args.repeat))
+    report('process_query', single_query_latencies(processor.process_query, queries, args.repeat))
+
+    for label, process_batch in (('classifier', classifier.predict),
+                                 ('process_queries', processor.process_queries)):
+        per_query = batch_cost_per_query(process_batch, queries, args.repeat, args.batch_size)
+        print(f"{label + f', batch of {args.batch_size}':<28} {per_query * 1e6:8.1f} us/query")
+
+    if p99 > args.p99_budget_ms:
+        raise SystemExit(f"❌ p99 {p99:.3f} ms exceeds the {args.p99_budget_ms} ms budget")
+    print(f"✅ p99 within {args.p99_budget_ms} ms")
+
+
+if __name__ == '__main__':
+    main()
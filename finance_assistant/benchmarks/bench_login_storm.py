@@ -0,0 +1,133 @@
+"""Login throughput and other endpoints' latency during a login storm
+
+Models a server with a fixed number of request threads (`--server-threads`,
+like gunicorn's threads): every request, logins and probes alike, is
+submitted to that pool and timed from submission, so time spent queueing
+for a free request thread counts. `--clients` threads post /api/login in a
+loop while one probe thread calls GET / every few milliseconds.
+
+The "inline" run hashes on the request thread as the app used to; the
+"pool" run uses the bounded bcrypt process pool, whose admission limit
+turns excess logins into fast 503s and leaves request threads free.
+
+    python -m benchmarks.bench_login_storm --clients 16 --seconds 10
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def make_app(rounds, workers, max_pending):
+    from app.main import create_app, init_db
+
+    # Read once, when config is first imported: both runs share the database
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    app = create_app()
+    app.config.update(
+        BCRYPT_LOG_ROUNDS=rounds,
+        PASSWORD_HASH_WORKERS=workers,
+        PASSWORD_HASH_MAX_PENDING=max_pending
+    )
+    with app.app_context():
+        init_db()
+    return app
+
+
+def register(app):
+    response = app.test_client().post('/api/register', json={
+        'email': 'storm@example.com', 'password': 'correct horse battery',
+        'first_name': 'Storm', 'last_name': 'Test'
+    })
+    return response.get_json()['mfa_token']
+
+
+def run_storm(app, mfa_token, clients, server_threads, seconds, probe_interval):
+    """Return (logins ok, logins refused, login latencies, probe latencies)"""
+    server = ThreadPoolExecutor(max_workers=server_threads)
+    deadline = time.perf_counter() + seconds
+    lock = threading.Lock()
+    results = {'ok': 0, 'refused': 0, 'login': [], 'probe': []}
+    login_body = {'email': 'storm@example.com', 'password': 'correct horse battery',
+                  'mfa_token': mfa_token}
+
+    def serve(method, path, body=None):
+        started = time.perf_counter()
+        future = server.submit(lambda: app.test_client().open(path, method=method, json=body).status_code)
+        return future.result(), time.perf_counter() - started
+
+    def login_client():
+        while time.perf_counter() < deadline:
+            status, elapsed = serve('POST', '/api/login', login_body)
+            with lock:
+                results['login'].append(elapsed)
+                if status == 200:
+                    results['ok'] += 1
+                elif status == 503:
+                    results['refused'] += 1
+            if status == 503:
+                # What a well-behaved client does with Retry-After, scaled down
+                time.sleep(0.05)
+
+    def probe():
+        while time.perf_counter() < deadline:
+            _, elapsed = serve('GET', '/')
+            results['probe'].append(elapsed)
+            time.sleep(probe_interval)
+
+    threads = [threading.Thread(target=login_client) for _ in range(clients)]
+    threads.append(threading.Thread(target=probe))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    return results['ok'], results['refused'], sorted(results['login']), sorted(results['probe'])
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000 if values else 0
+
+
+def report(label, ok, refused, logins, probes, seconds):
+    print(f"{label}")
+    print(f"  logins     {ok / seconds:7.1f} ok/s   {refused / seconds:7.1f} refused/s   "
+          f"p50 {percentile(logins, 0.5):8.1f} ms   p99 {percentile(logins, 0.99):8.1f} ms")
+    print(f"  GET /      {len(probes):7d} reqs     "
+          f"p50 {percentile(probes, 0.5):8.1f} ms   p95 {percentile(probes, 0.95):8.1f} ms   "
+          f"p99 {percentile(probes, 0.99):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16, help='concurrent login loops')
+    parser.add_argument('--server-threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--rounds', type=int, default=13, help='bcrypt log rounds')
+    parser.add_argument('--workers', type=int, default=2, help='bcrypt pool processes')
+    parser.add_argument('--max-pending', type=int, default=4)
+    parser.add_argument('--probe-interval', type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(f"🏁 {args.clients} login clients, {args.server_threads} request threads, "
+          f"bcrypt cost {args.rounds}, {args.seconds:.0f}s per run")
+
+    # Before: bcrypt on the request thread, no admission limit
+    app = make_app(args.rounds, workers=0, max_pending=args.clients + args.server_threads)
+    mfa_token = register(app)
+    results = run_storm(app, mfa_token, args.clients, args.server_threads,
+                        args.seconds, args.probe_interval)
+    report('inline hashing', *results, args.seconds)
+
+    app = make_app(args.rounds, workers=args.workers, max_pending=args.max_pending)
+    results = run_storm(app, mfa_token, args.clients, args.server_threads,
+                        args.seconds, args.probe_interval)
+    report(f'process pool ({args.workers} workers, {args.max_pending} max pending)',
+           *results, args.seconds)
+    app.extensions['services'].get('password_hasher').shutdown()
+
+
+if __name__ == '__main__':
+    main()
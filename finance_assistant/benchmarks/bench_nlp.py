@@ -0,0 +1,113 @@
+"""Per-query cost of NLPProcessor.process_query: compiled matcher vs keyword scans
+
+Runs every query of a corpus of typical chat messages (one per line in
+`benchmarks/data/chat_queries.txt`) through the current processor and
+through `legacy_process_query`, a copy of the previous implementation
+(substring scan per intent list, one `re.search` per entity, on the
+cleaned text). Reports microseconds per query and how many intents the
+two agree on.
+
+    python -m benchmarks.bench_nlp --repeat 200
+"""
+import argparse
+import os
+import re
+import time
+from app.chatbot.nlp_processor import FINANCIAL_KEYWORDS, NLPProcessor
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'chat_queries.txt')
+
+LEGACY_INTENTS = {
+    'get_spending_summary': ['spent', 'spending', 'expense'],
+    'get_budget_status': ['budget', 'limit'],
+    'get_savings_advice': ['save', 'savings', 'goal'],
+    'get_income_report': ['income', 'salary', 'earn'],
+    'get_financial_report': ['report', 'summary', 'overview'],
+    'categorize_spending': ['category', 'type', 'classification']
+}
+
+LEGACY_TIME_PATTERNS = {
+    'month': r'\b(month|monthly)\b',
+    'week': r'\b(week|weekly)\b',
+    'year': r'\b(year|yearly|annual)\b',
+    'today': r'\b(today)\b',
+    'yesterday': r'\b(yesterday)\b'
+}
+
+
+def legacy_process_query(processor, user_input):
+    """The previous extraction: eager per-intent scans and per-entity regexes"""
+    cleaned_text = processor._preprocess_text(user_input)
+
+    intents = {intent: any(word in cleaned_text for word in words)
+               for intent, words in LEGACY_INTENTS.items()}
+    intent = next((name for name, matches in intents.items() if matches), 'general_query')
+
+    entities = {}
+    for period, pattern in LEGACY_TIME_PATTERNS.items():
+        if re.search(pattern, cleaned_text):
+            entities['time_period'] = period
+            break
+    amount_match = re.search(r'\$?(\d+(?:\.\d{2})?)', cleaned_text)
+    if amount_match:
+        entities['amount'] = float(amount_match.group(1))
+    for category, keywords in FINANCIAL_KEYWORDS.items():
+        if any(keyword in cleaned_text for keyword in keywords):
+            entities['category'] = category
+            break
+
+    confidence = 0.5 + (0.3 if entities else 0) + (0.2 if intent != 'general_query' else 0)
+    return {
+        'original_query': user_input,
+        'cleaned_text': cleaned_text,
+        'intent': intent,
+        'entities': entities,
+        'confidence': min(confidence, 1.0)
+    }
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def time_per_query(process, queries, repeat):
+    """Best-of-3 mean microseconds per query"""
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                process(query)
+        best = min(best, (time.perf_counter() - started) / (repeat * len(queries)))
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    queries = load_corpus(args.corpus)
+    # Keyword intents only: the trained classifier is measured by bench_intents
+    processor = NLPProcessor(intent_model='keywords')
+
+    current = time_per_query(processor.process_query, queries, args.repeat)
+    legacy = time_per_query(lambda query: legacy_process_query(processor, query), queries, args.repeat)
+    matcher = time_per_query(processor.matcher.match, queries, args.repeat)
+
+    agree = sum(processor.process_query(q)['intent'] == legacy_process_query(processor, q)['intent']
+                for q in queries)
+    amounts = sum('amount' in processor.process_query(q)['entities'] for q in queries)
+
+    print(f"🏁 {len(queries)} queries x {args.repeat}")
+    print(f"{'legacy process_query':<28} {legacy:>8.2f} us/query")
+    print(f"{'compiled process_query':<28} {current:>8.2f} us/query")
+    print(f"{'  of which matcher':<28} {matcher:>8.2f} us/query")
+    print(f"📈 Speed-up: {legacy / current:.2f}x")
+    print(f"Intent agreement with legacy: {agree}/{len(queries)}; amounts found: {amounts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Cold-start time of the SQLAlchemy app: lazy factory vs eagerly built engines
+
+Each run is a fresh interpreter that imports `app.main`, calls
+`create_app()` and serves one request, timed from process launch to exit.
+The "eager" run additionally warms up every service before the request,
+which is what the factory used to pay on every boot. `-X importtime` is
+then used to list the slowest imports left on the startup path.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY = '''
+from app.main import create_app
+app = create_app()
+app.test_client().get('/')
+'''
+
+EAGER = LAZY + '''
+services = app.extensions['services']
+for name in ('auth_manager', 'transaction_processor', 'budget_engine',
+             'financial_advisor', 'report_generator', 'nlp_processor'):
+    try:
+        services.get(name)
+    except Exception:
+        pass
+'''
+
+
+def time_cold_start(code, runs):
+    """Median wall time in seconds of `runs` fresh interpreters running `code`"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def slowest_imports(code, limit):
+    """(cumulative microseconds, module) of the top-level imports, slowest first"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Only direct children of the root: nested imports are already in their parent
+        if name.startswith('   ') and not name.startswith('    '):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    baseline = time_cold_start('pass', args.runs)
+    lazy = time_cold_start(LAZY, args.runs)
+    eager = time_cold_start(EAGER, args.runs)
+
+    print(f"🏁 median of {args.runs} fresh interpreters")
+    print(f"{'bare interpreter':<28} {baseline * 1000:>8.0f} ms")
+    print(f"{'lazy create_app + request':<28} {lazy * 1000:>8.0f} ms")
+    print(f"{'all engines built eagerly':<28} {eager * 1000:>8.0f} ms")
+    print(f"📈 Cold start {eager / lazy:.1f}x faster with lazy services")
+
+    print(f"\nSlowest imports on the lazy path:")
+    for cumulative, name in slowest_imports(LAZY, args.top):
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,520 @@
+"""Concurrent load test of the real endpoints, checked against the configured SLA
+
+Starts the chosen app on a local port in a separate process (a threaded
+Werkzeug server on a fresh synthetic database), then drives it with
+`--users` virtual users written with asyncio, each holding one keep-alive
+HTTP/1.1 connection. Throughput and p50/p95/p99 are reported per endpoint.
+
+Two load models:
+
+- closed loop (default): every user loops over a weighted mix of requests
+  with an exponential think time, latency measured from send to last
+  byte. A slow server slows the users down too, so fewer requests are
+  sent exactly when latency is high and the percentiles look better than
+  what clients would see (coordinated omission).
+- open loop (`--arrival-rate R`): requests arrive as a Poisson process at
+  R per second whatever the server does, and are sent on the first free
+  connection. Latency is measured from the scheduled arrival, so time
+  spent queued behind slow responses counts.
+
+The SLA is stated for Config.MAX_CONCURRENT_USERS, which is also the
+default `--users`. Exit status: 1 when, for any endpoint, the
+`--percentile` latency exceeds Config.QUERY_RESPONSE_TIME or the error
+rate exceeds `--max-error-rate`; 2 when nothing breached but the run used
+fewer users than the SLA is stated for (a partial check); 0 when the SLA
+was met at full concurrency. Thousands of connections need a matching
+open-file limit; the soft limit is raised up to the hard one.
+
+    python -m benchmarks.load_test --target api --duration 30
+    python -m benchmarks.load_test --target api --users 500 --arrival-rate 400
+    python -m benchmarks.load_test --target factory --users 100 --output /tmp/load.json
+
+Targets:
+    api      app.py: GET /api/analysis/<id>, POST /api/chat, POST /api/transactions
+    factory  app.main (bearer tokens): POST /api/chat, GET /api/transactions/analyze,
+             GET /api/reports/financial-health, GET /api/reports/charts/<type>
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from benchmarks.bench_nlp import load_corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'app.py')
+
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client over asyncio streams (JSON bodies)"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send one request and return (status, body bytes)"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}',
+                 f'Content-Length: {len(payload)}']
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Server closed the connection')
+        version, status = status_line.split(b' ', 2)[:2]
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in response_headers:
+            data = await self.reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            data = await self._read_chunked()
+        else:
+            data = await self.reader.read()
+            response_headers['connection'] = 'close'
+
+        if response_headers.get('connection', '').lower() == 'close' or version == b'HTTP/1.0':
+            self.close()
+        return int(status), data
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Stats:
+    """Latencies and errors per endpoint name"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, name, seconds, ok):
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, duration):
+        rows = {}
+        everything = []
+        for name, values in sorted(self.latencies.items()):
+            everything.extend(values)
+            rows[name] = self._row(values, self.errors.get(name, 0), duration)
+        rows['ALL'] = self._row(everything, sum(self.errors.values()), duration)
+        return rows
+
+    @staticmethod
+    def _row(values, errors, duration):
+        values = sorted(values)
+
+        def percentile(fraction):
+            return values[min(int(len(values) * fraction), len(values) - 1)] * 1000 if values else 0.0
+
+        return {
+            'requests': len(values),
+            'errors': errors,
+            'error_rate': errors / len(values) if values else 0.0,
+            'throughput_rps': len(values) / duration,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': values[-1] * 1000 if values else 0.0
+        }
+
+
+def api_scenario(user_ids, queries):
+    """Weighted request mix for app.py"""
+    return [
+        (0.45, 'GET /api/analysis/<id>',
+         lambda vu, rng: ('GET', f'/api/analysis/{user_ids[vu % len(user_ids)]}', None, None)),
+        (0.35, 'POST /api/chat',
+         lambda vu, rng: ('POST', '/api/chat', {'query': rng.choice(queries)}, None)),
+        (0.20, 'POST /api/transactions',
+         lambda vu, rng: ('POST', '/api/transactions', {
+             'user_id': user_ids[vu % len(user_ids)], 'amount': -round(rng.uniform(3, 120), 2),
+             'type': 'expense', 'category': 'Food & Dining', 'description': 'Load test cafe'
+         }, None)),
+    ]
+
+
+def factory_scenario(tokens, queries):
+    """Weighted request mix for the app.main factory, authenticated with bearer tokens"""
+    def auth(vu):
+        return {'Authorization': f'Bearer {tokens[vu % len(tokens)]}'}
+
+    return [
+        (0.40, 'POST /api/chat',
+         lambda vu, rng: ('POST', '/api/chat',
+                          {'query': rng.choice(queries), 'session_id': f'vu{vu}'}, auth(vu))),
+        (0.25, 'GET /api/transactions/analyze',
+         lambda vu, rng: ('GET', '/api/transactions/analyze', None, auth(vu))),
+        (0.25, 'GET /api/reports/financial-health',
+         lambda vu, rng: ('GET', '/api/reports/financial-health', None, auth(vu))),
+        (0.10, 'GET /api/reports/charts/<type>',
+         lambda vu, rng: ('GET', f"/api/reports/charts/{rng.choice(['category_breakdown', 'monthly_trend'])}"
+                                 f"?format=svg", None, auth(vu))),
+    ]
+
+
+async def virtual_user(vu, users, host, port, scenario, measure_from, deadline,
+                       ramp_up, think, timeout, stats):
+    """One user's request loop; only requests started after the ramp-up are recorded"""
+    rng = random.Random(vu)
+    weights = [weight for weight, _, _ in scenario]
+    loop = asyncio.get_running_loop()
+    # Users join evenly over the ramp-up period
+    await asyncio.sleep(ramp_up * vu / users)
+    connection = HTTPConnection(host, port)
+    try:
+        while loop.time() < deadline:
+            _, name, build = rng.choices(scenario, weights)[0]
+            method, path, body, headers = build(vu, rng)
+            measured = loop.time() >= measure_from
+            request_started = time.perf_counter()
+            try:
+                status, _ = await asyncio.wait_for(connection.request(method, path, body, headers), timeout)
+                ok = status < 400
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                connection.close()
+                ok = False
+            if measured:
+                stats.record(name, time.perf_counter() - request_started, ok)
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+    finally:
+        connection.close()
+
+
+async def open_loop_request(connections, scenario, weights, rng, intended, measure_from,
+                            timeout, stats, in_flight):
+    """One arrival: wait for a free connection, send, and record latency from `intended`"""
+    loop = asyncio.get_running_loop()
+    _, name, build = rng.choices(scenario, weights)[0]
+    in_flight[0] += 1
+    in_flight[1] = max(in_flight[1], in_flight[0])
+    vu, connection = await connections.get()
+    try:
+        method, path, body, headers = build(vu, rng)
+        try:
+            status, _ = await asyncio.wait_for(connection.request(method, path, body, headers), timeout)
+            ok = status < 400
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            connection.close()
+            ok = False
+    finally:
+        connections.put_nowait((vu, connection))
+        in_flight[0] -= 1
+    if intended >= measure_from:
+        stats.record(name, loop.time() - intended, ok)
+
+
+async def run_open_loop(host, port, scenario, users, duration, ramp_up, rate, timeout):
+    """Poisson arrivals at `rate`/s over `users` connections; returns (stats, peak in flight)"""
+    stats = Stats()
+    loop = asyncio.get_running_loop()
+    rng = random.Random(0)
+    weights = [weight for weight, _, _ in scenario]
+    connections = asyncio.Queue()
+    for vu in range(users):
+        connections.put_nowait((vu, HTTPConnection(host, port)))
+    in_flight = [0, 0]  # current, peak
+
+    measure_from = loop.time() + ramp_up
+    deadline = measure_from + duration
+    intended = loop.time()
+    tasks = []
+    while True:
+        intended += rng.expovariate(rate)
+        if intended >= deadline:
+            break
+        await asyncio.sleep(max(0.0, intended - loop.time()))
+        tasks.append(asyncio.ensure_future(open_loop_request(
+            connections, scenario, weights, random.Random(len(tasks)), intended, measure_from,
+            timeout, stats, in_flight
+        )))
+    await asyncio.gather(*tasks)
+    while not connections.empty():
+        connections.get_nowait()[1].close()
+    return stats, in_flight[1]
+
+
+async def run_load(host, port, scenario, users, duration, ramp_up, think, timeout):
+    stats = Stats()
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + ramp_up
+    deadline = measure_from + duration
+    await asyncio.gather(*(
+        virtual_user(vu, users, host, port, scenario, measure_from, deadline,
+                     ramp_up, think, timeout, stats)
+        for vu in range(users)
+    ))
+    return stats
+
+
+def serve(target, port):
+    """Run the target app on 127.0.0.1:<port> (in the server subprocess)"""
+    from werkzeug.serving import make_server
+
+    if target == 'api':
+        import importlib.util
+        spec = importlib.util.spec_from_file_location('finance_api', APP_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.init_db()
+        app = module.app
+    else:
+        from app.main import create_app
+        app = create_app()
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(target, port, env, timeout=60):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.load_test', '--serve', target, '--port', str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'The {target} server exited during startup')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f'The {target} server did not start within {timeout}s')
+
+
+def post_json(port, path, body):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}{path}', data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.load(response)
+
+
+def seed_api(port, accounts, rows_per_user, seed):
+    """Register users on app.py and bulk-load synthetic history through its API"""
+    import numpy as np
+    from datetime import datetime
+    from benchmarks.synthetic_data import generate_user_transactions
+
+    user_ids = []
+    end = datetime.now().replace(microsecond=0)
+    for index in range(accounts):
+        user_id = post_json(port, '/api/register', {
+            'email': f'load{index}-{seed}@synthetic.example', 'password': 'load-test',
+            'first_name': 'Load', 'last_name': f'User{index}'
+        })['user_id']
+        user_ids.append(user_id)
+        rng = np.random.default_rng([seed, index])
+        for rows in generate_user_transactions(user_id, rows_per_user, end, 12, rng, batch_size=10000):
+            # app.py stores expenses as negative amounts
+            post_json(port, '/api/transactions/bulk', {'transactions': [
+                {'user_id': row[0], 'amount': row[1] if row[2] == 'income' else -row[1],
+                 'type': row[2], 'category': row[3], 'description': row[4], 'date': row[5]}
+                for row in rows
+            ]})
+    return user_ids
+
+
+def seed_factory(db_path, accounts, rows_per_user, seed):
+    """Generate the factory app's database and mint a bearer token per user"""
+    from datetime import datetime
+    from benchmarks.synthetic_data import populate
+    from app.auth.authentication import AuthenticationManager
+    from app.main import create_app
+    from app.models.user import User, db
+
+    # History up to today, so the "last 30 days" views the chat asks about have data
+    user_ids = populate(db_path, [rows_per_user] * accounts, seed=seed,
+                        end=datetime.now().replace(microsecond=0), months=12)
+    app = create_app()
+    with app.app_context():
+        # Minted directly: logging every virtual user in would trip the login rate limiter
+        auth_manager = AuthenticationManager()
+        return [auth_manager._generate_auth_token(db.session.get(User, user_id)) for user_id in user_ids]
+
+
+def raise_open_file_limit(connections):
+    """Lift the soft open-file limit towards the hard one for `connections` sockets"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = connections + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+
+
+def check_sla(summary, percentile, limit_ms, max_error_rate):
+    """[(endpoint, reason)] for every SLA breach"""
+    key = f'p{percentile}_ms'
+    breaches = []
+    for name, row in summary.items():
+        if row[key] > limit_ms:
+            breaches.append((name, f'p{percentile} {row[key]:.0f} ms > {limit_ms:.0f} ms'))
+        if row['error_rate'] > max_error_rate:
+            breaches.append((name, f"error rate {row['error_rate']:.2%} > {max_error_rate:.2%}"))
+    return breaches
+
+
+def report(summary):
+    print(f"\n{'endpoint':<36} {'reqs':>7} {'req/s':>8} {'errors':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, row in summary.items():
+        print(f"{name:<36} {row['requests']:>7} {row['throughput_rps']:>8.1f} {row['errors']:>7} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=('api', 'factory'), default='api')
+    parser.add_argument('--users', type=int,
+                        help='concurrent virtual users/connections (default: Config.MAX_CONCURRENT_USERS)')
+    parser.add_argument('--duration', type=float, default=30.0, help='measured seconds after ramp-up')
+    parser.add_argument('--ramp-up', type=float, default=5.0)
+    parser.add_argument('--think', type=float, default=0.5, help='mean think time between requests (s)')
+    parser.add_argument('--arrival-rate', type=float,
+                        help='open loop: Poisson arrivals per second instead of think-time loops')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout (s)')
+    parser.add_argument('--accounts', type=int, default=20, help='seeded user accounts')
+    parser.add_argument('--rows-per-user', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--percentile', type=int, choices=(50, 95, 99), default=95)
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--output', help='write the summary and verdict as JSON')
+    parser.add_argument('--serve', choices=('api', 'factory'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='load-test-')
+    db_path = os.path.join(workdir, 'load.db')
+    env = dict(os.environ, FINANCE_DB=db_path, DATABASE_URL=f'sqlite:///{db_path}',
+               EXPORT_DIR=os.path.join(workdir, 'exports'),
+               CHART_CACHE_DIR=os.path.join(workdir, 'charts'),
+               AUTH_REVOCATION_FILE=os.path.join(workdir, 'revoked_tokens.jsonl'))
+    os.environ.update(env)
+    # Imported only now: Config reads the database settings at import time
+    from config import Config
+    if args.users is None:
+        args.users = Config.MAX_CONCURRENT_USERS
+    raise_open_file_limit(args.users)
+    queries = load_corpus()
+    port = free_port()
+
+    print(f"⏳ Seeding {args.accounts} accounts x {args.rows_per_user:,} transactions ({args.target})")
+    tokens = None
+    if args.target == 'factory':
+        tokens = seed_factory(db_path, args.accounts, args.rows_per_user, args.seed)
+    server = start_server(args.target, port, env)
+    try:
+        if args.target == 'api':
+            scenario = api_scenario(seed_api(port, args.accounts, args.rows_per_user, args.seed), queries)
+        else:
+            scenario = factory_scenario(tokens, queries)
+
+        peak_in_flight = None
+        if args.arrival_rate:
+            print(f"🏁 Open loop: {args.arrival_rate:g} req/s over {args.users} connections, "
+                  f"{args.ramp_up:.0f}s ramp-up + {args.duration:.0f}s measured")
+            stats, peak_in_flight = asyncio.run(run_open_loop(
+                '127.0.0.1', port, scenario, args.users, args.duration, args.ramp_up,
+                args.arrival_rate, args.timeout
+            ))
+        else:
+            print(f"🏁 {args.users} virtual users, {args.ramp_up:.0f}s ramp-up + {args.duration:.0f}s measured, "
+                  f"think time {args.think}s (closed loop: latency excludes queueing, see --arrival-rate)")
+            stats = asyncio.run(run_load('127.0.0.1', port, scenario, args.users, args.duration,
+                                         args.ramp_up, args.think, args.timeout))
+    finally:
+        server.terminate()
+        server.wait()
+
+    summary = stats.summary(args.duration)
+    report(summary)
+    if peak_in_flight is not None:
+        print(f"\n   Peak requests in flight: {peak_in_flight} (queued for a connection included)")
+
+    limit_ms = Config.QUERY_RESPONSE_TIME * 1000
+    breaches = check_sla(summary, args.percentile, limit_ms, args.max_error_rate)
+    print(f"\n🎯 SLA: p{args.percentile} <= {Config.QUERY_RESPONSE_TIME}s per endpoint, "
+          f"errors <= {args.max_error_rate:.0%}, at {Config.MAX_CONCURRENT_USERS} concurrent users")
+    for name, reason in breaches:
+        print(f"❌ {name}: {reason}")
+    if breaches:
+        verdict = 'failed'
+    elif args.users < Config.MAX_CONCURRENT_USERS:
+        verdict = 'partial'
+        print(f"⚠️ SLA not verified: no breach, but tested at {args.users} of "
+              f"{Config.MAX_CONCURRENT_USERS} concurrent users")
+    else:
+        verdict = 'met'
+        print("✅ SLA met")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'target': args.target,
+                'users': args.users,
+                'duration': args.duration,
+                'load_model': 'open' if args.arrival_rate else 'closed',
+                'arrival_rate': args.arrival_rate,
+                'peak_in_flight': peak_in_flight,
+                'verdict': verdict,
+                'sla': {'percentile': args.percentile, 'limit_ms': limit_ms,
+                        'max_error_rate': args.max_error_rate,
+                        'max_concurrent_users': Config.MAX_CONCURRENT_USERS},
+                'summary': summary,
+                'breaches': [{'endpoint': name, 'reason': reason} for name, reason in breaches]
+            }, f, indent=2)
+
+    if verdict != 'met':
+        sys.exit(1 if verdict == 'failed' else 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""Seeded generator of realistic users and transactions for the SQLAlchemy schema
+
+Each user gets a salary paid monthly or twice a month (with a yearly
+raise), quarterly dividends for some, and expenses drawn per category from
+a log-normal amount distribution. Spending follows the calendar: more
+shopping in November/December, travel and entertainment in summer,
+utilities in winter, more everything at weekends. A small share of
+expenses are outliers several times the usual amount, which is what the
+anomaly detector looks for. Descriptions are merchant names the
+categorizer recognises.
+
+Generation is vectorized per user with NumPy and rows go in through
+`insert_many()`, so the rollup and data-version tables are maintained in
+bulk. History ends at `--end` (DEFAULT_END unless given), so the same
+seed and end always produce the same database.
+
+    python -m benchmarks.synthetic_data --db /tmp/synthetic.db --users 100 --rows 1000000
+    python -m benchmarks.synthetic_data --db /tmp/current.db --end 2026-10-01
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+# Every synthetic user can log in with this password
+SYNTHETIC_PASSWORD = 'synthetic-password'
+
+OUTLIER_RATE = 0.005
+
+# Fixed end of the generated history: datetime.now() would change the data from run to run
+DEFAULT_END = datetime(2026, 1, 1)
+
+# category -> (share of expense transactions, median amount, log-normal sigma, merchants)
+EXPENSE_PROFILES = {
+    'Food & Dining': (0.34, 18.0, 0.7, ['Grocery Mart', 'Corner Cafe', 'Thai Restaurant',
+                                        'Fresh Supermarket', 'Pizza Food Truck', 'Sushi Dining']),
+    'Transportation': (0.16, 25.0, 0.6, ['Uber Trip', 'Lyft Ride', 'Shell Fuel',
+                                         'City Bus Pass', 'Metro Train', 'Yellow Taxi']),
+    'Shopping': (0.16, 45.0, 0.9, ['Amazon Marketplace', 'Walmart Store', 'Target',
+                                   'Outlet Mall', 'Hardware Store']),
+    'Entertainment': (0.10, 20.0, 0.8, ['Netflix', 'Spotify', 'Cinema Movie Tickets',
+                                        'Concert Hall', 'Steam Game']),
+    'Utilities': (0.08, 85.0, 0.4, ['City Electric Co', 'Water Utility', 'Fiber Internet',
+                                    'Mobile Phone Bill']),
+    'Healthcare': (0.05, 60.0, 0.9, ['Pharmacy', 'Family Doctor', 'Dental Health Clinic',
+                                     'Hospital Copay']),
+    'Education': (0.03, 40.0, 1.0, ['Online Course', 'School Supplies', 'University Fees']),
+    'Other': (0.08, 30.0, 1.0, ['Venmo Transfer', 'Cash Withdrawal', 'Post Office',
+                                'Dry Cleaner']),
+}
+
+# Relative transaction volume per calendar month (Jan..Dec), per category
+SEASONALITY = {
+    'Shopping': [0.8, 0.7, 0.8, 0.9, 0.9, 0.9, 1.0, 1.0, 1.0, 1.1, 1.6, 2.0],
+    'Entertainment': [0.8, 0.8, 0.9, 1.0, 1.1, 1.3, 1.4, 1.3, 1.0, 0.9, 0.9, 1.2],
+    'Transportation': [0.9, 0.9, 1.0, 1.0, 1.1, 1.2, 1.3, 1.3, 1.0, 1.0, 0.9, 1.1],
+    'Utilities': [1.4, 1.3, 1.1, 0.9, 0.8, 0.9, 1.1, 1.1, 0.9, 0.9, 1.1, 1.4],
+    'Food & Dining': [0.9, 0.9, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.1, 1.3],
+}
+
+# Monday..Sunday
+WEEKDAY_WEIGHTS = [0.9, 0.9, 0.95, 1.0, 1.2, 1.4, 1.2]
+
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Okafor', 'Novak', 'Silva', 'Patel', 'Kim']
+
+INSERT_TRANSACTION_SQL = '''
+    INSERT INTO transactions
+        (user_id, amount, transaction_type, category, description, transaction_date, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def _income(start, end, rng):
+    """(dates, amounts, categories, descriptions) of salary and dividend payments"""
+    salary = float(rng.lognormal(np.log(4500), 0.35))
+    twice_monthly = rng.random() < 0.5
+    paydays = (1, 15) if twice_monthly else (1,)
+    dates, amounts, categories, descriptions = [], [], [], []
+
+    month = datetime(start.year, start.month, 1)
+    while month <= end:
+        years = (month - start).days / 365.25
+        pay = salary * 1.03 ** int(years) / len(paydays)
+        for day in paydays:
+            date = month.replace(day=day, hour=9)
+            if start <= date <= end:
+                dates.append(date)
+                amounts.append(round(pay * (1 + rng.normal(0, 0.01)), 2))
+                categories.append('Salary')
+                descriptions.append('Acme Corp salary paycheck')
+        if month.month % 3 == 0 and rng.random() < 0.4:
+            date = month.replace(day=20, hour=12)
+            if start <= date <= end:
+                dates.append(date)
+                amounts.append(round(float(rng.lognormal(np.log(120), 0.5)), 2))
+                categories.append('Investment')
+                descriptions.append('Index fund dividend')
+        month = (month + timedelta(days=32)).replace(day=1)
+    return dates, amounts, categories, descriptions
+
+
+def generate_user_transactions(user_id, n_rows, end, months, rng, batch_size=50000):
+    """Yield one user's rows, oldest first, in lists of up to `batch_size` tuples
+
+    Tuples match INSERT_TRANSACTION_SQL.
+    """
+    start = end - timedelta(days=round(months * 30.44))
+    income_dates, income_amounts, income_categories, income_descriptions = _income(start, end, rng)
+    # Very small users keep only their most recent paychecks
+    keep = min(len(income_dates), max(n_rows // 10, 1))
+    income_dates = income_dates[len(income_dates) - keep:]
+    income_amounts = income_amounts[len(income_amounts) - keep:]
+    income_categories = income_categories[len(income_categories) - keep:]
+    income_descriptions = income_descriptions[len(income_descriptions) - keep:]
+    n_expenses = max(n_rows - keep, 0)
+
+    categories = list(EXPENSE_PROFILES)
+    shares = np.array([EXPENSE_PROFILES[c][0] for c in categories])
+    # (12, categories): probability of each category in each calendar month
+    monthly = np.array([[shares[i] * SEASONALITY.get(c, [1.0] * 12)[m]
+                         for i, c in enumerate(categories)] for m in range(12)])
+    month_volume = monthly.sum(axis=1)
+    category_cdf = np.cumsum(monthly / month_volume[:, None], axis=1)
+
+    day_count = (end - start).days + 1
+    day_dates = np.arange(np.datetime64(start.date()), np.datetime64(start.date()) + day_count)
+    day_months = day_dates.astype('datetime64[M]').astype(int) % 12
+    day_weekdays = (day_dates.astype('datetime64[D]').astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    day_weights = month_volume[day_months] * np.array(WEEKDAY_WEIGHTS)[day_weekdays]
+    days = rng.choice(day_count, size=n_expenses, p=day_weights / day_weights.sum())
+
+    category_index = (rng.random(n_expenses)[:, None] > category_cdf[day_months[days]]).sum(axis=1)
+    category_index = np.minimum(category_index, len(categories) - 1)
+
+    medians = np.log([EXPENSE_PROFILES[c][1] for c in categories])
+    sigmas = np.array([EXPENSE_PROFILES[c][2] for c in categories])
+    amounts = np.exp(rng.normal(medians[category_index], sigmas[category_index]))
+    outliers = rng.random(n_expenses) < OUTLIER_RATE
+    amounts[outliers] *= rng.uniform(4, 15, outliers.sum())
+    if n_expenses and income_amounts:
+        # Spend 70-100% of what comes in, however many transactions that takes
+        amounts *= sum(income_amounts) * rng.uniform(0.7, 1.0) / amounts.sum()
+    amounts = np.round(np.maximum(amounts, 0.01), 2)
+
+    merchants = [m for c in categories for m in EXPENSE_PROFILES[c][3]]
+    offsets = np.cumsum([0] + [len(EXPENSE_PROFILES[c][3]) for c in categories])
+    counts = np.diff(offsets)
+    merchant_index = offsets[category_index] + (rng.random(n_expenses) * counts[category_index]).astype(int)
+
+    seconds = rng.integers(7 * 3600, 23 * 3600, n_expenses)
+    timestamps = day_dates[days].astype('datetime64[s]') + seconds
+
+    # Compact per-row arrays (label indexes, not strings) sorted once by time
+    labels = categories + sorted(set(income_categories))
+    texts = merchants + sorted(set(income_descriptions))
+    timestamps = np.concatenate([np.array(income_dates, dtype='datetime64[s]'), timestamps])
+    order = np.argsort(timestamps, kind='stable')
+    timestamps = timestamps[order]
+    all_amounts = np.concatenate([np.array(income_amounts, dtype=float), amounts])[order]
+    is_income = np.concatenate([np.ones(keep, dtype=bool), np.zeros(n_expenses, dtype=bool)])[order]
+    label_index = np.concatenate([
+        np.array([labels.index(c) for c in income_categories], dtype=np.int16),
+        category_index.astype(np.int16)
+    ])[order]
+    text_index = np.concatenate([
+        np.array([texts.index(d) for d in income_descriptions], dtype=np.int16),
+        merchant_index.astype(np.int16)
+    ])[order]
+
+    # Materialize tuples one batch at a time: a 10M-row user never exists as Python objects
+    for offset in range(0, len(timestamps), batch_size):
+        window = slice(offset, offset + batch_size)
+        dates = np.char.replace(np.datetime_as_string(timestamps[window], unit='us'), 'T', ' ').tolist()
+        yield [
+            (user_id, amount, 'income' if income else 'expense', labels[label], texts[text], date, date)
+            for amount, income, label, text, date in zip(
+                all_amounts[window].tolist(), is_income[window].tolist(),
+                label_index[window].tolist(), text_index[window].tolist(), dates
+            )
+        ]
+
+
+def split_rows(total_rows, users, rng):
+    """Uneven but seeded split of a row budget over users (some are much busier)"""
+    shares = rng.lognormal(0, 0.5, users)
+    counts = np.floor(shares / shares.sum() * total_rows).astype(int)
+    counts[:total_rows - counts.sum()] += 1
+    return counts.tolist()
+
+
+def create_schema(path):
+    """Create the SQLAlchemy tables plus rollups, versions and indexes in `path`"""
+    from sqlalchemy import create_engine
+    from app.database.connection import connect
+    from app.database.migrations import migrate
+    from app.database.rollups import ORM_SCHEMA
+    from app.models.user import db
+    from app.models import budget, transaction  # noqa: F401 - register the tables
+
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+    conn = connect(path)
+    try:
+        migrate(conn, ORM_SCHEMA)
+    finally:
+        conn.close()
+
+
+def populate(path, user_rows, seed=42, end=DEFAULT_END, months=24, batch_size=50000):
+    """Create `path` with one user per entry of `user_rows` (its transaction count)
+
+    Returns the list of user ids, in the order of `user_rows`.
+    """
+    import bcrypt
+    from app.database.bulk import insert_many
+    from app.database.connection import connect
+    from app.database.rollups import ORM_SCHEMA
+
+    create_schema(path)
+    # One cheap hash shared by every user: generation stays fast, logins still work
+    password_hash = bcrypt.hashpw(SYNTHETIC_PASSWORD.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8')
+
+    conn = connect(path)
+    try:
+        first_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0] + 1
+        user_ids = list(range(first_id, first_id + len(user_rows)))
+        with conn:
+            conn.executemany(
+                'INSERT INTO users (id, email, password_hash, first_name, last_name, created_at, is_active) '
+                'VALUES (?, ?, ?, ?, ?, ?, 1)',
+                [(user_id, f'user{user_id}@synthetic.example', password_hash,
+                  FIRST_NAMES[user_id % len(FIRST_NAMES)], LAST_NAMES[user_id % len(LAST_NAMES)],
+                  str(end - timedelta(days=round(months * 30.44))))
+                 for user_id in user_ids]
+            )
+
+        for index, (user_id, n_rows) in enumerate(zip(user_ids, user_rows)):
+            rng = np.random.default_rng([seed, index])
+            for rows in generate_user_transactions(user_id, n_rows, end, months, rng, batch_size):
+                conn.execute('BEGIN IMMEDIATE')
+                insert_many(conn, INSERT_TRANSACTION_SQL, rows, ORM_SCHEMA)
+                conn.commit()
+    finally:
+        conn.close()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite file to create or extend')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=100000, help='transactions over all users')
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', type=datetime.fromisoformat, default=DEFAULT_END,
+                        help=f'last day of generated history (default: {DEFAULT_END.date()})')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    user_rows = split_rows(args.rows, args.users, np.random.default_rng(args.seed))
+    user_ids = populate(args.db, user_rows, seed=args.seed, end=args.end, months=args.months)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {args.rows:,} transactions for users {user_ids[0]}-{user_ids[-1]} "
+          f"in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s) -> {os.path.abspath(args.db)}")
+    print(f"   Log in as user<ID>@synthetic.example / {SYNTHETIC_PASSWORD}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-import sqlite3
+from app.database.connection import get_connection, close_connection, close_all_connections
 import os
 
 def clear_all_data():
@@ -7,7 +7,7 @@ def clear_all_data():
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('finance.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Count current data
@@ -29,7 +29,7 @@ def clear_all_data():
         cursor.execute("DELETE FROM sqlite_sequence")
         
         conn.commit()
-        conn.close()
+        close_connection()
         
         print("✅ SUCCESS: All data cleared!")
         print("🎯 Database is now completely empty.")
@@ -43,7 +43,7 @@ def clear_and_create_sample():
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('finance.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Delete all existing data
@@ -72,7 +72,7 @@ def clear_and_create_sample():
         ''', sample_transactions)
         
         conn.commit()
-        conn.close()
+        close_connection()
         
         print("✅ SUCCESS: Database reset complete!")
         print(f"👤 New User Created:")
@@ -90,7 +90,12 @@ def nuclear_option():
     print("=" * 50)
     
     if os.path.exists('finance.db'):
+        close_all_connections()
         os.remove('finance.db')
+        # WAL mode keeps its log and shared-memory index next to the database
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists('finance.db' + suffix):
+                os.remove('finance.db' + suffix)
         print("✅ Database file 'finance.db' deleted!")
         print("🎯 When you restart the app, a new empty database will be created.")
     else:
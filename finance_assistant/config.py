@@ -7,6 +7,17 @@ class Config:
     # Security
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     BCRYPT_LOG_ROUNDS = 13
+    # bcrypt runs in its own process pool; beyond MAX_PENDING hashes in flight
+    # logins and registrations are refused with a 503 instead of queueing
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = 8
+    PASSWORD_HASH_TIMEOUT = 10  # seconds
+    # Login/registration token buckets: (burst capacity, seconds to refill it)
+    LOGIN_RATE_LIMIT_PER_IP = (20, 60)
+    LOGIN_RATE_LIMIT_PER_EMAIL = (5, 300)
+    LOGIN_RATE_LIMIT_MAX_KEYS = 100000
+    # SQLite file shared by all worker processes; unset keeps buckets per process
+    LOGIN_RATE_LIMIT_DB = os.environ.get('LOGIN_RATE_LIMIT_DB')
     
     # Database
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///finance_assistant.db'
@@ -15,11 +26,75 @@ class Config:
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
     
+    # Bearer tokens (Authorization: Bearer <auth_token>) are verified from their
+    # claims alone; verified claims are cached until the token expires
+    AUTH_TOKEN_LIFETIME = timedelta(days=7)
+    AUTH_TOKEN_CACHE_SIZE = 10000
+    AUTH_REVOCATION_FILE = os.environ.get('AUTH_REVOCATION_FILE')  # defaults to <instance>/revoked_tokens.jsonl
+    
     # API Settings
     MAX_CONCURRENT_USERS = 5000
     QUERY_RESPONSE_TIME = 2  # seconds
     DATA_PROCESSING_TIME = 5  # seconds
     
+    # Build the engines (pandas, NLTK, chatbot) on a background thread at startup
+    # instead of on the first request that needs them
+    WARMUP_SERVICES = os.environ.get('WARMUP_SERVICES', '').lower() in ('1', 'true', 'yes')
+    
+    # Tokenize chat queries with NLTK (if installed with punkt data) instead of
+    # the built-in regex tokenizer; nothing is ever downloaded at runtime
+    NLP_USE_NLTK = False
+    # 'classifier' (trained model in app/chatbot/data/intent_model, used above
+    # 0.35 probability, keyword matcher otherwise and when the model or sklearn
+    # is missing) or 'keywords'; compare both on held-out queries with
+    # python -m app.chatbot.intent_classifier --holdout after retraining
+    NLP_INTENT_MODEL = os.environ.get('NLP_INTENT_MODEL') or 'classifier'
+    
+    # Chat: per-user analysis shared by all intents, reused while the data version holds
+    CHAT_CONTEXT_CACHE_SIZE = 4096
+    CHAT_CONTEXT_TTL = 30  # seconds
+    CHAT_BATCH_MAX_QUERIES = 20
+    
+    # Chat sessions (recent turns for follow-ups): LRU bounded by count and bytes
+    CHAT_SESSION_MAX = MAX_CONCURRENT_USERS
+    CHAT_SESSION_MAX_BYTES = 64 * 1024 * 1024
+    CHAT_SESSION_TTL = 1800  # seconds idle
+    CHAT_SESSION_MAX_TURNS = 10
+    
+    # Report cache (entries are also invalidated by the user's data version)
+    REPORT_CACHE_SIZE = 1024
+    REPORT_CACHE_TTL = 300  # seconds
+    
+    # Background report exports
+    EXPORT_DIR = os.environ.get('EXPORT_DIR')  # defaults to <instance>/exports
+    EXPORT_WORKERS = 2
+    EXPORT_MAX_PENDING = 32
+    EXPORT_RETENTION = 3600  # seconds a finished file stays downloadable
+    
+    # Chart rendering (files are keyed by the user's data version)
+    CHART_CACHE_DIR = os.environ.get('CHART_CACHE_DIR')  # defaults to <instance>/charts
+    CHART_WORKERS = 2
+    CHART_TIMEOUT = 30  # seconds before a chart request gives up with 503
+    CHART_CACHE_VARIANTS = 8  # cached files per user and chart type (params, formats)
+    CHART_MAX_MONTHS = 120  # largest `months` a chart accepts
+    
+    # Request latency, SQL and engine-span metrics, served in Prometheus text
+    # format at METRICS_ENDPOINT (per worker process)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_ENDPOINT = '/metrics'
+    
+    # Opt-in slow-request profiler: requests running past SAMPLE_AFTER have their
+    # stacks sampled, and those slower than QUERY_RESPONSE_TIME are kept (stacks,
+    # SQL, DataFrame sizes) in a ring of MAX_PROFILES files under PROFILER_DIR,
+    # served to holders of PROFILER_ADMIN_TOKEN at /api/admin/profiles
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILER_DIR = os.environ.get('PROFILER_DIR')  # defaults to <instance>/profiles
+    PROFILER_MAX_PROFILES = 100
+    PROFILER_SAMPLE_INTERVAL = 0.005  # seconds
+    PROFILER_SAMPLE_AFTER = 0.25  # seconds
+    PROFILER_MAX_STATEMENTS = 500  # distinct SQL statements kept per request
+    PROFILER_ADMIN_TOKEN = os.environ.get('PROFILER_ADMIN_TOKEN')
+    
     # Banking API (Example - would be replaced with actual banking APIs)
     OPEN_BANKING_BASE_URL = "https://api.example-bank.com/v1"
     
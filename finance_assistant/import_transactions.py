@@ -0,0 +1,51 @@
+import argparse
+import sys
+from app.banking.categorizer import KeywordCategorizer, load_categories
+from app.banking.csv_importer import CSVImportError, CSVTransactionImporter
+from app.database.connection import connect
+
+def print_progress(summary):
+    print(f"   📥 {summary['rows_read']:,} rows read | "
+          f"{summary['rows_imported']:,} imported | "
+          f"{summary['rows_rejected']:,} rejected | "
+          f"{summary['rows_per_second']:,.0f} rows/s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Import a bank statement CSV into the finance database')
+    parser.add_argument('csv_file', help='Path to the CSV file (date, description, amount[, type, category])')
+    parser.add_argument('--user-id', type=int, required=True, help='User the transactions belong to')
+    parser.add_argument('--db', default='finance.db', help='SQLite database file (default: finance.db)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per chunk and per commit')
+    parser.add_argument('--start-line', type=int, help='Resume a failed import from this CSV line')
+    parser.add_argument('--defer-indexes', action='store_true',
+                        help='Load in one transaction and rebuild the indexes at the end '
+                             '(fastest for large files; blocks other writers until done)')
+    args = parser.parse_args()
+    
+    print(f"📂 IMPORTING {args.csv_file} FOR USER {args.user_id}")
+    print("=" * 50)
+    
+    importer = CSVTransactionImporter(KeywordCategorizer(load_categories()), chunk_size=args.chunk_size)
+    conn = connect(args.db)
+    try:
+        summary = importer.import_file(conn, args.csv_file, args.user_id, progress=print_progress,
+                                       start_line=args.start_line, defer_indexes=args.defer_indexes)
+    except CSVImportError as e:
+        print(f"❌ {e}")
+        print(f"   Resume with: --start-line {e.summary['resume_line']}")
+        return 1
+    except Exception as e:
+        print(f"❌ Import failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    
+    for error in summary['errors'][:10]:
+        print(f"   ⚠️ Line {error['line']}: {error['error']}")
+    
+    print(f"✅ Imported {summary['rows_imported']:,} of {summary['rows_read']:,} rows "
+          f"in {summary['elapsed_seconds']:.2f}s ({summary['rows_per_second']:,.0f} rows/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
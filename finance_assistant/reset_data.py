@@ -1,4 +1,4 @@
-import sqlite3
+from app.database.connection import get_connection, close_connection
 import os
 
 def reset_database():
@@ -6,7 +6,7 @@ def reset_database():
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('finance.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Count current data
@@ -30,14 +30,14 @@ def reset_database():
             cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('users', 'transactions')")
             
             conn.commit()
-            conn.close()
+            close_connection()
             
             print("✅ SUCCESS: All data cleared!")
             print("🎯 Database is now empty and ready for one fresh user.")
             
         else:
             print("❌ Reset cancelled. No data was deleted.")
-            conn.close()
+            close_connection()
             
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -48,7 +48,7 @@ def reset_and_create_sample():
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('finance.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Delete all existing data
@@ -77,7 +77,7 @@ def reset_and_create_sample():
         ''', sample_transactions)
         
         conn.commit()
-        conn.close()
+        close_connection()
         
         print("✅ SUCCESS: Database reset complete!")
         print(f"👤 New User Created:")
@@ -1,4 +1,4 @@
-import sqlite3
+from app.database.connection import get_connection, close_connection
 from datetime import datetime
 
 def print_table(title, headers, data):
@@ -33,7 +33,7 @@ def view_database():
     
     try:
         # Connect to database
-        conn = sqlite3.connect('finance.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         # 1. View Users
@@ -136,7 +136,7 @@ def view_database():
             print(f"   🎯 Net: ${net:,.2f}")
             print()
         
-        conn.close()
+        close_connection()
         
         print("✅ Data viewing completed successfully!")
         
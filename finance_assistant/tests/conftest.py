@@ -0,0 +1,80 @@
+import importlib.util
+import os
+import pytest
+from config import Config
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The factory app on a fresh SQLite file, with cheap bcrypt and no background pools"""
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'finance.db'}")
+    monkeypatch.setattr(Config, 'BCRYPT_LOG_ROUNDS', 4)
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_WORKERS', 0)
+    monkeypatch.setattr(Config, 'AUTH_REVOCATION_FILE', str(tmp_path / 'revoked_tokens.jsonl'))
+    monkeypatch.setattr(Config, 'LOGIN_RATE_LIMIT_DB', None)
+    monkeypatch.setattr(Config, 'EXPORT_DIR', str(tmp_path / 'exports'))
+    monkeypatch.setattr(Config, 'CHART_CACHE_DIR', str(tmp_path / 'charts'))
+    monkeypatch.setattr(Config, 'PROFILER_ENABLED', False)
+    monkeypatch.setattr(Config, 'WARMUP_SERVICES', False)
+    monkeypatch.setattr(Config, 'SESSION_COOKIE_SECURE', False)
+
+    from app.main import create_app, init_db
+    flask_app = create_app()
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        init_db()
+    yield flask_app
+    with flask_app.app_context():
+        from app.models.user import db
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """Register a user and return (user_id, mfa_token)"""
+    def register(email='alex@example.com', password='correct horse battery'):
+        response = client.post('/api/register', json={
+            'email': email, 'password': password, 'first_name': 'Alex', 'last_name': 'Doe'
+        })
+        result = response.get_json()
+        assert result['success'], result
+        return result['user_id'], result['mfa_token']
+    return register
+
+
+@pytest.fixture
+def login(client, register):
+    """Register and log in a user; returns the login response body (with auth_token)"""
+    def login(email='alex@example.com', password='correct horse battery'):
+        _, mfa_token = register(email, password)
+        response = client.post('/api/login', json={
+            'email': email, 'password': password, 'mfa_token': mfa_token
+        })
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+    return login
+
+
+@pytest.fixture
+def legacy_app(tmp_path, monkeypatch):
+    """The standalone `app.py` application on a fresh SQLite file
+
+    `app.py` is shadowed by the `app` package, so it is loaded from its path.
+    """
+    from app.database import connection
+    monkeypatch.setattr(connection, 'DATABASE_PATH', str(tmp_path / 'finance_data.db'))
+    spec = importlib.util.spec_from_file_location('legacy_app', os.path.join(PROJECT_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.init_db()
+    module.app.config['TESTING'] = True
+    yield module
+    connection.close_all_connections()
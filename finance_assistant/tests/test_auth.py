@@ -0,0 +1,168 @@
+import json
+import time
+import jwt
+import pytest
+from app.auth.rate_limit import LoginRateLimiter, RateLimitExceeded
+from app.auth.security import (HasherBusy, HasherTimeout, PasswordHasher, RevocationList,
+                               TokenVerifier)
+from app.monitoring.metrics import REGISTRY
+from app.processes import pool_context
+
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_bearer_token_authenticates(client, login):
+    token = login()['auth_token']
+    client.post('/api/logout')  # drop the session cookie, keep the token
+
+    assert client.get('/api/auth/stats').status_code == 401
+    assert client.get('/api/auth/stats', headers=bearer(token)).status_code == 200
+
+
+def test_logout_revokes_bearer_token(client, login):
+    token = login()['auth_token']
+    client.post('/api/logout')
+
+    assert client.post('/api/logout', headers=bearer(token)).status_code == 200
+    assert client.get('/api/auth/stats', headers=bearer(token)).status_code == 401
+
+
+def test_logout_with_session_cookie_still_revokes_header_token(app, client, login):
+    token = login()['auth_token']
+
+    # The session cookie authenticates this request, not the header
+    response = client.post('/api/logout', headers=bearer(token))
+
+    assert response.status_code == 200
+    assert app.extensions['token_verifier'].verify(token) is None
+    assert client.get('/api/auth/stats', headers=bearer(token)).status_code == 401
+
+
+def test_revocation_list_loads_without_rewriting_the_file(tmp_path):
+    path = tmp_path / 'revoked.jsonl'
+    now = time.time()
+    path.write_text(json.dumps({'jti': 'expired', 'exp': now - 60}) + '\n'
+                    + json.dumps({'jti': 'live', 'exp': now + 60}) + '\n')
+    before = (path.stat().st_ino, path.read_bytes())
+
+    revocations = RevocationList(str(path))
+
+    assert (path.stat().st_ino, path.read_bytes()) == before
+    assert revocations.is_revoked('live')
+    assert not revocations.is_revoked('expired')
+    assert len(revocations) == 1
+
+
+def test_revocation_list_expires_entries_on_read(tmp_path):
+    revocations = RevocationList(str(tmp_path / 'revoked.jsonl'))
+    revocations.revoke('soon', time.time() + 0.05)
+    assert revocations.is_revoked('soon')
+    time.sleep(0.1)
+    assert not revocations.is_revoked('soon')
+
+
+def test_revocations_reach_other_processes_through_the_file(tmp_path):
+    path = str(tmp_path / 'revoked.jsonl')
+    worker = RevocationList(path, reload_interval=0)
+    RevocationList(path).revoke('jti-1', time.time() + 60)
+    assert worker.is_revoked('jti-1')
+
+
+def test_token_verifier_rejects_revoked_cached_token():
+    verifier = TokenVerifier('test-secret')
+    token = jwt.encode({'user_id': 1, 'jti': 'abc', 'exp': int(time.time()) + 60},
+                       'test-secret', algorithm='HS256')
+    claims = verifier.verify(token)
+    assert claims['user_id'] == 1
+
+    verifier.revoke(claims)
+
+    assert verifier.verify(token) is None
+    assert verifier.stats()['hits'] == 1
+
+
+def test_worker_pools_never_fork_the_server():
+    assert pool_context().get_start_method() in ('forkserver', 'spawn')
+
+
+def test_hasher_pool_verifies_in_worker_processes():
+    hasher = PasswordHasher(rounds=4, workers=1)
+    try:
+        password_hash = hasher.hash('secret')
+        assert hasher.verify(password_hash, 'secret')
+        assert not hasher.verify(password_hash, 'wrong')
+    finally:
+        hasher.shutdown()
+    assert hasher.stats()['pending'] == 0
+    assert hasher.stats()['completed'] == 3
+
+
+def test_hasher_timeout_keeps_the_slot_until_the_worker_is_done():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=1, timeout=0.05)
+    try:
+        hasher._get_executor().submit(time.sleep, 0).result(30)  # start the worker
+        with pytest.raises(HasherTimeout):
+            hasher._run(time.sleep, 0.5)
+        # The sleep still occupies the worker, so its slot is not free yet
+        with pytest.raises(HasherBusy):
+            hasher.hash('secret')
+
+        deadline = time.monotonic() + 10
+        while hasher.stats()['pending'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert hasher.stats()['pending'] == 0
+        assert hasher.stats()['timed_out'] == 1
+    finally:
+        hasher.shutdown()
+
+
+def test_login_returns_503_when_password_check_times_out(app, client, register):
+    register('sam@example.com', 'secret password')
+
+    class SlowHasher(PasswordHasher):
+        def verify(self, password_hash, password):
+            raise HasherTimeout('Sign-in is taking too long, please retry shortly')
+
+    with app.app_context():
+        app.extensions['services'].get('auth_manager').hasher = SlowHasher(rounds=4, workers=0)
+    response = client.post('/api/login', json={'email': 'sam@example.com', 'password': 'secret password'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['success'] is False
+
+
+def rate_limit_counts():
+    return (REGISTRY.get('login_rate_limit_allowed_total').get(),
+            REGISTRY.get('login_rate_limit_rejected_total').get(rule='email'))
+
+
+def test_rate_limiter_counts_decisions_in_the_metrics_registry():
+    now = [1000.0]
+    limiter = LoginRateLimiter({'ip': (10, 60), 'email': (2, 60)}, clock=lambda: now[0])
+    allowed, rejected = rate_limit_counts()
+
+    limiter.check(ip='10.0.0.1', email='sam@example.com')
+    limiter.check(ip='10.0.0.1', email='Sam@Example.com ')
+    with pytest.raises(RateLimitExceeded) as exc:
+        limiter.check(ip='10.0.0.1', email='sam@example.com')
+    assert exc.value.rule == 'email'
+    assert exc.value.retry_after == pytest.approx(30)
+
+    now[0] += 30
+    limiter.check(ip='10.0.0.1', email='sam@example.com')
+
+    assert rate_limit_counts() == (allowed + 3, rejected + 1)
+    assert limiter.stats()['allowed'] == 3
+    assert limiter.stats()['rejected'] == {'ip': 0, 'email': 1}
+
+
+def test_rate_limit_decisions_are_exported_on_metrics(client):
+    client.post('/api/login', json={'email': 'nobody@example.com', 'password': 'x'})
+
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert '# TYPE login_rate_limit_allowed_total counter' in body
+    assert '# TYPE login_rate_limit_rejected_total counter' in body
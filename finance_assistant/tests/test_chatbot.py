@@ -0,0 +1,129 @@
+import os
+import pytest
+from config import Config
+from app.chatbot.intent_classifier import (HOLDOUT_FILE, TRAINING_FILE, IntentClassifier, compare_on_holdout,
+                                          load_training_data)
+from app.chatbot.nlp_processor import NLPProcessor
+
+
+class FixedPrediction:
+    """Stands in for the trained model with one canned prediction"""
+
+    def __init__(self, intent, probability):
+        self.prediction = (intent, probability)
+
+    def predict(self, queries):
+        return [self.prediction for _ in queries]
+
+
+def processor_predicting(intent, probability):
+    processor = NLPProcessor(intent_model='keywords')
+    processor.intent_classifier = FixedPrediction(intent, probability)
+    return processor
+
+
+def test_keyword_matcher_extracts_intent_and_entities():
+    result = NLPProcessor(intent_model='keywords').process_query('What have I spent this month? Over $1,250.50?')
+
+    assert result['intent'] == 'get_spending_summary'
+    assert result['entities'] == {'time_period': 'month', 'amount': 1250.5, 'category': 'spending'}
+
+
+def test_unsure_model_does_not_override_general_query():
+    result = processor_predicting('get_budget_status', 0.2).process_query('hello there')
+    assert result['intent'] == 'general_query'
+
+
+def test_unsure_model_keeps_the_keyword_intent():
+    result = processor_predicting('get_income_report', 0.2).process_query('show my budget')
+    assert result['intent'] == 'get_budget_status'
+
+
+def test_confident_model_overrides_the_keywords():
+    result = processor_predicting('get_income_report', 0.9).process_query('show my budget')
+    assert (result['intent'], result['confidence']) == ('get_income_report', 0.9)
+
+
+@pytest.mark.skipif('NLP_INTENT_MODEL' in os.environ, reason='intent model set by the environment')
+def test_classifier_is_the_default_intent_model():
+    assert Config.NLP_INTENT_MODEL == 'classifier'
+    if IntentClassifier.load() is None:
+        pytest.skip('intent model not trained or scikit-learn missing')
+    assert isinstance(NLPProcessor().intent_classifier, IntentClassifier)
+
+
+def test_missing_model_falls_back_to_the_keyword_matcher(monkeypatch):
+    monkeypatch.setattr(IntentClassifier, 'load', classmethod(lambda cls, model_dir=None: None))
+    processor = NLPProcessor(intent_model='classifier')
+
+    assert processor.intent_classifier is None
+    assert processor.process_query('show my budget')['intent'] == 'get_budget_status'
+
+
+def test_holdout_queries_are_not_training_queries():
+    training, training_labels = load_training_data(TRAINING_FILE)
+    holdout, labels = load_training_data(HOLDOUT_FILE)
+    assert not set(training) & set(holdout)
+    assert set(labels) == set(training_labels)
+
+
+def test_classifier_is_no_worse_than_keywords_on_holdout():
+    """Gate for NLP_INTENT_MODEL='classifier': it must not lose to the keyword matcher"""
+    if IntentClassifier.load() is None:
+        pytest.skip('intent model not trained or scikit-learn missing')
+    accuracy = compare_on_holdout()
+    assert accuracy['classifier'] >= accuracy['keywords']
+
+
+def chat(client, query, session_id='s1'):
+    return client.post('/api/chat', json={'query': query, 'session_id': session_id}).get_json()
+
+
+def test_follow_up_answers_for_the_new_period(app, client, login):
+    from datetime import datetime, timedelta
+    from app.models.transaction import Transaction
+    from app.models.user import db
+
+    user_id = login()['user']['id']
+    with app.app_context():
+        now = datetime.now()
+        db.session.add_all([
+            Transaction(user_id=user_id, amount=50.0, transaction_type='expense', category='Food',
+                        transaction_date=now - timedelta(days=10)),
+            Transaction(user_id=user_id, amount=500.0, transaction_type='expense', category='Travel',
+                        transaction_date=now - timedelta(days=200)),
+        ])
+        db.session.commit()
+
+    first = chat(client, 'How much have I spent this month?')
+    follow_up = chat(client, 'and last year?')
+
+    assert first['processed_data']['intent'] == 'get_spending_summary'
+    assert '$50.00' in first['response'] and '$550.00' not in first['response']
+    assert follow_up['processed_data']['follow_up'] is True
+    assert follow_up['processed_data']['intent'] == 'get_spending_summary'
+    assert follow_up['processed_data']['entities']['time_period'] == 'year'
+    assert '$550.00' in follow_up['response']
+
+
+def test_session_context_expires_with_age_and_at_midnight(app, client, login):
+    from datetime import date, timedelta
+    from app.chatbot.conversation_store import Conversation
+
+    user_id = login()['user']['id']
+    advisor = app.extensions['services'].get('financial_advisor')
+
+    class User:
+        id = user_id
+
+    with app.app_context():
+        conversation = Conversation()
+        context = advisor.get_context(User, conversation)
+        assert advisor.get_context(User, conversation) is context
+
+        context.computed_at -= advisor.context_ttl
+        aged_out = advisor.get_context(User, conversation)
+        assert aged_out is not context
+
+        aged_out.day = date.today() - timedelta(days=1)
+        assert advisor.get_context(User, conversation) is not aged_out
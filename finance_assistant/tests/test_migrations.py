@@ -0,0 +1,96 @@
+import pytest
+from app.database.connection import connect
+from app.database.migrations import MIGRATIONS, check_query_plans, current_version, migrate
+from app.database.rollups import BULK_LOAD_GUARD, ORM_SCHEMA, RAW_SCHEMA, fetch_user_rollups, install_rollups
+
+LATEST_VERSION = 4
+
+# app.py's schema before any migration existed
+RAW_TRANSACTIONS_DDL = '''
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT,
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+@pytest.fixture
+def conn(tmp_path):
+    connection = connect(str(tmp_path / 'finance.db'))
+    connection.execute(RAW_TRANSACTIONS_DDL)
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+def test_latest_version_is_the_last_migration():
+    assert MIGRATIONS[-1][0] == LATEST_VERSION
+    assert [number for number, _, _ in MIGRATIONS] == list(range(1, LATEST_VERSION + 1))
+
+
+def test_migrate_fresh_database(conn):
+    assert current_version(conn) == 0
+
+    assert migrate(conn, RAW_SCHEMA) == list(range(1, LATEST_VERSION + 1))
+    assert current_version(conn) == LATEST_VERSION
+    assert check_query_plans(conn, RAW_SCHEMA) == []
+    insert_triggers = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%after_insert'"
+    ).fetchall()
+    assert len(insert_triggers) == 2
+    assert all(BULK_LOAD_GUARD in sql for sql, in insert_triggers)
+
+
+def test_migrate_existing_database_backfills_rollups(conn):
+    conn.executemany(
+        'INSERT INTO transactions (user_id, amount, type, category, date) VALUES (?, ?, ?, ?, ?)',
+        [(1, 12.5, 'expense', 'Food', '2024-01-03 10:00:00'),
+         (1, 7.5, 'expense', 'Food', '2024-01-20 10:00:00'),
+         (1, 2000.0, 'income', 'Salary', '2024-01-31 09:00:00'),
+         (2, 40.0, 'expense', 'Transport', '2024-02-01 08:00:00')]
+    )
+    conn.commit()
+
+    migrate(conn, RAW_SCHEMA)
+
+    assert current_version(conn) == LATEST_VERSION
+    assert check_query_plans(conn, RAW_SCHEMA) == []
+    rollups = {(row[0], row[1], row[2]): (row[3], row[4]) for row in fetch_user_rollups(conn.execute, 1)}
+    assert rollups == {('2024-01', 'expense', 'Food'): (20.0, 2),
+                       ('2024-01', 'income', 'Salary'): (2000.0, 1)}
+
+
+def test_migrate_rerun_is_a_noop(conn):
+    migrate(conn, RAW_SCHEMA)
+    schema_before = conn.execute('SELECT type, name, sql FROM sqlite_master ORDER BY name').fetchall()
+
+    assert migrate(conn, RAW_SCHEMA) == []
+    assert current_version(conn) == LATEST_VERSION
+    assert conn.execute('SELECT type, name, sql FROM sqlite_master ORDER BY name').fetchall() == schema_before
+
+
+def test_migrate_resumes_from_recorded_version(conn):
+    conn.execute('PRAGMA user_version = 1')
+    install_rollups(conn, RAW_SCHEMA)
+    conn.commit()
+
+    assert migrate(conn, RAW_SCHEMA) == list(range(2, LATEST_VERSION + 1))
+
+
+def test_init_db_migrates_the_orm_database(app):
+    from app.main import init_db
+    from app.models.user import db
+
+    with app.app_context():
+        assert init_db() == []
+        connection = db.engine.raw_connection()
+        try:
+            assert current_version(connection) == LATEST_VERSION
+            assert check_query_plans(connection, ORM_SCHEMA) == []
+        finally:
+            connection.close()
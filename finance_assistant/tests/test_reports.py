@@ -0,0 +1,184 @@
+import os
+import time
+from datetime import datetime
+import pytest
+from app.reporting.export_jobs import ExportJobQueue
+from app.reporting.report_cache import ReportCache
+from app.reporting.visualizations import ChartRenderer, ChartUnavailable
+
+
+def test_chart_renderer_draws_in_a_worker_and_caches_by_version(tmp_path):
+    renderer = ChartRenderer(str(tmp_path / 'charts'), workers=1)
+    calls = []
+
+    def load_data():
+        calls.append(1)
+        return {'labels': ['Food', 'Rent'], 'values': [120.0, 900.0]}
+
+    try:
+        path = renderer.render(1, 7, 'category_breakdown', 'svg', {}, load_data)
+        assert path.endswith('.svg')
+        with open(path, encoding='utf-8') as f:
+            assert '<svg' in f.read()
+
+        assert renderer.render(1, 7, 'category_breakdown', 'svg', {}, load_data) == path
+        assert len(calls) == 1
+
+        newer = renderer.render(1, 8, 'category_breakdown', 'svg', {}, load_data)
+        assert newer != path and len(calls) == 2
+        assert not os.path.exists(path)
+    finally:
+        renderer.shutdown()
+
+
+def test_chart_cache_keeps_a_bounded_number_of_variants(tmp_path):
+    renderer = ChartRenderer(str(tmp_path / 'charts'), workers=1, max_variants=2)
+    data = {'labels': ['Food'], 'values': [120.0]}
+    try:
+        paths = [renderer.render(1, 7, 'category_breakdown', 'svg', {'months': months}, lambda: data)
+                 for months in (1, 2, 3)]
+        assert sorted(os.listdir(tmp_path / 'charts')) == sorted(os.path.basename(p) for p in paths[1:])
+    finally:
+        renderer.shutdown()
+
+
+def test_chart_renderer_times_out_as_unavailable(tmp_path):
+    renderer = ChartRenderer(str(tmp_path / 'charts'), workers=1, timeout=0)
+    try:
+        with pytest.raises(ChartUnavailable):
+            renderer.render(1, 7, 'category_breakdown', 'svg', {}, lambda: {'labels': [], 'values': []})
+    finally:
+        renderer.shutdown()
+
+
+def test_chart_rejects_months_out_of_range(client, login):
+    login()
+    for months in (0, -3, 100000):
+        response = client.get(f'/api/reports/charts/monthly_trend?months={months}')
+        assert response.status_code == 400
+
+
+def test_report_cache_hits_only_at_the_same_version():
+    cache = ReportCache(max_entries=2, ttl=60)
+    assert cache.get(1, 1) is None
+
+    cache.put(1, 1, 'report v1')
+    assert cache.get(1, 1) == 'report v1'
+    assert cache.get(1, 2) is None  # a write bumped the version
+    assert cache.get(1, 1) is None  # and the stale entry is gone
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 3, 0)
+
+
+def test_report_cache_expires_and_evicts():
+    cache = ReportCache(max_entries=2, ttl=0)
+    cache.put(1, 1, 'expired')
+    assert cache.get(1, 1) is None
+    assert cache.stats()['expirations'] == 1
+
+    cache.ttl = 60
+    for user_id in (1, 2, 3):
+        cache.put(user_id, 1, f'report {user_id}')
+    assert cache.get(1, 1) is None
+    assert cache.get(3, 1) == 'report 3'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_stats_requires_login(client):
+    assert client.get('/api/reports/cache-stats').status_code == 401
+
+
+def test_financial_health_report_is_cached_until_a_write(app, client, login):
+    from app.models.transaction import Transaction
+    from app.models.user import db
+
+    user_id = login()['user']['id']
+
+    def add(amount, kind):
+        with app.app_context():
+            db.session.add(Transaction(user_id=user_id, amount=amount, transaction_type=kind,
+                                       category='Salary' if kind == 'income' else 'Food',
+                                       transaction_date=datetime.now()))
+            db.session.commit()
+
+    add(3000.0, 'income')
+    first = client.get('/api/reports/financial-health').get_json()
+    assert client.get('/api/reports/financial-health').get_json() == first
+    stats = client.get('/api/reports/cache-stats').get_json()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+    add(500.0, 'expense')
+    second = client.get('/api/reports/financial-health').get_json()
+    assert second['financial_metrics'] != first['financial_metrics']
+    assert client.get('/api/reports/cache-stats').get_json()['misses'] == 2
+
+
+def write_export(user_id, export_format, path):
+    with open(path, 'w') as f:
+        f.write('report')
+    return 1
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_export_lookup_expires_old_jobs(app, tmp_path):
+    queue = ExportJobQueue(app, write_export, str(tmp_path / 'exports'), workers=1, retention=3600)
+    try:
+        job = queue.submit(1, 'pdf')
+        assert wait_for(lambda: job.status == 'done')
+        assert queue.get(job.id, 1) is job
+        assert queue.get(job.id, 2) is None
+
+        queue.retention = 0
+        assert queue.get(job.id, 1) is None
+        assert not os.path.exists(job.path)
+    finally:
+        queue.shutdown()
+
+
+def test_export_sweeper_deletes_files_without_further_requests(app, tmp_path):
+    queue = ExportJobQueue(app, write_export, str(tmp_path / 'exports'), workers=1, retention=0.05)
+    queue.SWEEP_INTERVAL = 0.05
+    try:
+        job = queue.submit(1, 'xlsx')
+        assert wait_for(lambda: job.status == 'done')
+
+        assert wait_for(lambda: not os.path.exists(job.path))
+        assert job.id not in queue._jobs
+    finally:
+        queue.shutdown()
+
+
+def test_failed_export_reports_a_generic_error(app, tmp_path):
+    def broken_export(user_id, export_format, path):
+        raise RuntimeError('disk full at /srv/secret/path')
+
+    queue = ExportJobQueue(app, broken_export, str(tmp_path / 'exports'), workers=1)
+    try:
+        job = queue.submit(1, 'pdf')
+        assert wait_for(lambda: job.status == 'failed')
+        assert 'secret' not in job.error
+    finally:
+        queue.shutdown()
+
+
+def test_pdf_summary_breaks_long_lists_onto_more_pages(tmp_path):
+    from app.reporting.exporters import write_pdf_report
+
+    report = {
+        'user': {'name': 'Sam Kim', 'email': 'sam@example.com'},
+        'financial_metrics': {'spending_by_category': {f'Category {i}': float(i) for i in range(80)}},
+        'recommendations': [f'Recommendation {i}' for i in range(40)]
+    }
+    path = str(tmp_path / 'report.pdf')
+    write_pdf_report(path, report)
+    with open(path, 'rb') as f:
+        pages = f.read().count(b'/Type /Page\n')
+    # Two summary pages at least, plus the (empty) transaction table
+    assert pages >= 3
@@ -0,0 +1,136 @@
+import pytest
+from app.database.bulk import insert_many
+from app.database.connection import connect
+from app.database.migrations import migrate
+from app.database.rollups import (BULK_LOAD_GUARD, RAW_SCHEMA, ROLLUP_TABLE, fetch_user_rollups,
+                                  rebuild_rollups)
+from app.database.versions import get_data_version
+from .test_migrations import RAW_TRANSACTIONS_DDL
+
+INSERT_SQL = 'INSERT INTO transactions (user_id, amount, type, category, date) VALUES (?, ?, ?, ?, ?)'
+
+
+@pytest.fixture
+def conn(tmp_path):
+    connection = connect(str(tmp_path / 'finance.db'))
+    connection.execute(RAW_TRANSACTIONS_DDL)
+    migrate(connection, RAW_SCHEMA)
+    yield connection
+    connection.close()
+
+
+def rollups(conn):
+    return conn.execute(f'SELECT * FROM {ROLLUP_TABLE} ORDER BY 1, 2, 3, 4').fetchall()
+
+
+def rebuilt(conn):
+    """What the rollups should hold, recomputed from the raw rows"""
+    rebuild_rollups(conn, RAW_SCHEMA)
+    return rollups(conn)
+
+
+def test_inserts_update_rollups(conn):
+    conn.executemany(INSERT_SQL, [
+        (1, 10.0, 'expense', 'Food', '2024-01-05'),
+        (1, 15.0, 'expense', 'Food', '2024-01-25'),
+        (1, 30.0, 'expense', 'Food', '2024-02-01'),
+        (2, 99.0, 'income', 'Salary', '2024-01-31'),
+    ])
+
+    assert fetch_user_rollups(conn.execute, 1) == [
+        ('2024-01', 'expense', 'Food', 25.0, 2),
+        ('2024-02', 'expense', 'Food', 30.0, 1),
+    ]
+    assert fetch_user_rollups(conn.execute, 2, 'income') == [('2024-01', 'income', 'Salary', 99.0, 1)]
+
+
+def test_updates_move_amounts_between_rollups(conn):
+    conn.execute(INSERT_SQL, (1, 10.0, 'expense', 'Food', '2024-01-05'))
+    conn.execute(INSERT_SQL, (1, 20.0, 'expense', 'Food', '2024-01-06'))
+
+    conn.execute("UPDATE transactions SET category = 'Transport', amount = 12.0 WHERE amount = 10.0")
+    conn.execute("UPDATE transactions SET date = '2024-03-01' WHERE amount = 20.0")
+
+    assert fetch_user_rollups(conn.execute, 1) == [
+        ('2024-01', 'expense', 'Transport', 12.0, 1),
+        ('2024-03', 'expense', 'Food', 20.0, 1),
+    ]
+    assert rollups(conn) == rebuilt(conn)
+
+
+def test_deletes_remove_emptied_rollups(conn):
+    conn.execute(INSERT_SQL, (1, 10.0, 'expense', 'Food', '2024-01-05'))
+    conn.execute(INSERT_SQL, (1, 20.0, 'expense', 'Food', '2024-01-06'))
+
+    conn.execute('DELETE FROM transactions WHERE amount = 10.0')
+    assert fetch_user_rollups(conn.execute, 1) == [('2024-01', 'expense', 'Food', 20.0, 1)]
+
+    conn.execute('DELETE FROM transactions')
+    assert rollups(conn) == []
+
+
+def test_rollups_roll_back_with_their_transaction(conn):
+    conn.commit()
+    conn.execute('BEGIN')
+    conn.execute(INSERT_SQL, (1, 10.0, 'expense', 'Food', '2024-01-05'))
+    conn.rollback()
+
+    assert rollups(conn) == []
+
+
+def test_analysis_endpoint_reads_rollups(legacy_app):
+    client = legacy_app.app.test_client()
+    for amount, kind, category in ((3000, 'income', 'Salary'), (500, 'expense', 'Food'),
+                                   (250, 'expense', 'Transport')):
+        client.post('/api/transactions', json={
+            'user_id': 1, 'amount': amount, 'type': kind, 'category': category
+        })
+
+    analysis = client.get('/api/analysis/1').get_json()
+
+    assert analysis['total_income'] == 3000.0
+    assert analysis['total_expenses'] == 750.0
+    assert analysis['spending_by_category'] == {'Food': 500.0, 'Transport': 250.0}
+    assert analysis['savings_rate'] == 75.0
+
+
+def test_insert_many_matches_the_triggers(conn):
+    conn.execute(INSERT_SQL, (1, 5.0, 'expense', 'Food', '2024-01-01'))
+    conn.commit()
+    schema_before = conn.execute('SELECT name, sql FROM sqlite_master ORDER BY name').fetchall()
+
+    conn.execute('BEGIN IMMEDIATE')
+    insert_many(conn, INSERT_SQL, [
+        (1, 10.0, 'expense', 'Food', '2024-01-05'),
+        (1, 20.0, 'expense', 'Rent', '2024-02-01'),
+        (2, 99.0, 'income', 'Salary', '2024-01-31'),
+    ], RAW_SCHEMA)
+    conn.commit()
+
+    assert rollups(conn) == rebuilt(conn)
+    assert get_data_version(conn.execute, 1) == 2  # once for the trigger insert, once for the batch
+    assert get_data_version(conn.execute, 2) == 1
+    assert conn.execute(f'SELECT COUNT(*) FROM {BULK_LOAD_GUARD}').fetchone()[0] == 0
+    # No DDL: the triggers were never dropped or recreated
+    assert conn.execute('SELECT name, sql FROM sqlite_master ORDER BY name').fetchall() == schema_before
+
+    conn.execute(INSERT_SQL, (2, 1.0, 'income', 'Salary', '2024-01-31'))
+    assert fetch_user_rollups(conn.execute, 2) == [('2024-01', 'income', 'Salary', 100.0, 2)]
+
+
+def test_insert_many_leaves_nothing_behind_on_rollback(conn):
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    insert_many(conn, INSERT_SQL, [(1, 10.0, 'expense', 'Food', '2024-01-05')], RAW_SCHEMA)
+    conn.rollback()
+
+    assert rollups(conn) == []
+    assert get_data_version(conn.execute, 1) == 0
+    conn.execute(INSERT_SQL, (1, 3.0, 'expense', 'Food', '2024-01-05'))
+    assert fetch_user_rollups(conn.execute, 1) == [('2024-01', 'expense', 'Food', 3.0, 1)]
+
+
+def test_insert_many_requires_a_transaction(conn):
+    conn.commit()
+    with pytest.raises(RuntimeError):
+        insert_many(conn, INSERT_SQL, [(1, 10.0, 'expense', 'Food', '2024-01-05')], RAW_SCHEMA)
@@ -0,0 +1,318 @@
+import io
+import threading
+import pytest
+from app.database.connection import close_connection, existing_connection, get_connection
+from app.database.writer import GroupCommitWriter
+
+
+def post(legacy_app, **fields):
+    record = {'user_id': 1, 'amount': 25.0, 'type': 'expense', 'category': 'Food', **fields}
+    return legacy_app.app.test_client().post('/api/transactions', json=record)
+
+
+def stored_amounts(legacy_app, user_id=1):
+    return [row[0] for row in get_connection().execute(
+        'SELECT amount FROM transactions WHERE user_id = ? ORDER BY id', (user_id,)
+    )]
+
+
+@pytest.mark.parametrize('amount', ['oops', None, True, float('inf'), '1e999'])
+def test_invalid_amount_is_rejected_before_the_insert(legacy_app, amount):
+    response = post(legacy_app, amount=amount)
+
+    assert response.status_code == 400
+    assert 'amount' in response.get_json()['message']
+    assert stored_amounts(legacy_app) == []
+
+
+def test_invalid_type_is_rejected(legacy_app):
+    assert post(legacy_app, type='refund').status_code == 400
+    assert stored_amounts(legacy_app) == []
+
+
+def test_requests_without_queries_open_no_connection(legacy_app):
+    close_connection()
+    assert legacy_app.app.test_client().get('/api/').status_code == 200
+    assert existing_connection() is None
+
+
+def test_numeric_string_amount_is_stored_as_a_number(legacy_app):
+    response = post(legacy_app, amount='12.50', type=' Expense ')
+
+    assert response.status_code == 200
+    assert stored_amounts(legacy_app) == [12.5]
+    row = get_connection().execute('SELECT type, typeof(amount) FROM transactions').fetchone()
+    assert row == ('expense', 'real')
+
+
+def test_outlier_expense_is_flagged(legacy_app):
+    for amount in (20, 22, 19, 21, 20, 23):
+        assert post(legacy_app, amount=amount).get_json()['anomaly'] is None
+
+    anomaly = post(legacy_app, amount=400).get_json()['anomaly']
+
+    assert anomaly['category'] == 'Food'
+    assert anomaly['amount'] == 400.0
+
+
+def test_stats_are_seeded_from_existing_history(legacy_app):
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO transactions (user_id, amount, type, category) VALUES (1, ?, 'expense', 'Food')",
+        [(amount,) for amount in (20, 22, 19, 21, 20, 23)]
+    )
+    conn.commit()
+
+    assert post(legacy_app, amount=400).get_json()['anomaly'] is not None
+
+
+def test_concurrent_first_expenses_are_each_counted_once(legacy_app):
+    client_count = 16
+    barrier = threading.Barrier(client_count)
+    statuses = []
+
+    def add():
+        barrier.wait()
+        statuses.append(post(legacy_app, amount=10, category='Travel').status_code)
+
+    threads = [threading.Thread(target=add) for _ in range(client_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * client_count
+    stats = legacy_app.anomaly_detector._stats[(1, 'Travel')]
+    assert stats.count == len(stored_amounts(legacy_app)) == client_count
+
+
+def test_writer_call_failure_rolls_back_only_its_own_writes(tmp_path):
+    path = str(tmp_path / 'writer.db')
+    conn = get_connection(path)
+    conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, value TEXT)')
+    conn.commit()
+    writer = GroupCommitWriter(path)
+
+    def insert_then_fail(cursor):
+        cursor.execute("INSERT INTO t (value) VALUES ('lost')")
+        raise RuntimeError('boom')
+
+    failed = writer.submit_call(insert_then_fail)
+    kept = writer.submit('INSERT INTO t (value) VALUES (?)', ('kept',))
+
+    with pytest.raises(RuntimeError):
+        failed.result(5)
+    assert kept.result(5) is not None
+    assert [row[0] for row in conn.execute('SELECT value FROM t')] == ['kept']
+
+
+def post_bulk(legacy_app, records, user_id=1):
+    return legacy_app.app.test_client().post(
+        '/api/transactions/bulk', json={'user_id': user_id, 'transactions': records}
+    )
+
+
+def test_bulk_insert_validates_each_record(legacy_app):
+    response = post_bulk(legacy_app, [
+        {'amount': 12.5, 'type': 'expense', 'category': 'Food'},
+        {'amount': 'oops', 'type': 'expense'},
+        {'amount': 3, 'type': 'refund'},
+        {'amount': '2000', 'type': 'income', 'description': 'ACME payroll', 'date': '2024-01-31'},
+    ]).get_json()
+
+    assert (response['inserted'], response['rejected']) == (2, 2)
+    assert [result['success'] for result in response['results']] == [True, False, False, True]
+    assert response['results'][1]['errors'] == ['missing or invalid amount']
+    assert stored_amounts(legacy_app) == [12.5, 2000.0]
+
+
+@pytest.mark.parametrize('field', ['amount', 'user_id'])
+def test_bulk_insert_rejects_booleans(legacy_app, field):
+    records = [{'user_id': 1, 'amount': 5, 'type': 'expense', 'category': 'Food'} for _ in range(3)]
+    records[1][field] = True
+    records[2][field] = False
+
+    response = post_bulk(legacy_app, records).get_json()
+
+    assert [result['success'] for result in response['results']] == [True, False, False]
+    assert stored_amounts(legacy_app) == [5.0]
+
+
+def test_bulk_insert_rejects_all_boolean_amount_column(legacy_app):
+    response = post_bulk(legacy_app, [{'amount': True, 'type': 'expense', 'category': 'Food'}]).get_json()
+
+    assert response['inserted'] == 0
+    assert stored_amounts(legacy_app) == []
+
+
+def test_bulk_insert_accepts_dates_with_different_offsets(legacy_app):
+    response = post_bulk(legacy_app, [
+        {'amount': 10, 'type': 'expense', 'category': 'Food', 'date': '2024-03-30T10:00:00+01:00'},
+        {'amount': 20, 'type': 'expense', 'category': 'Food', 'date': '2024-04-01T10:00:00+02:00'},
+        {'amount': 30, 'type': 'expense', 'category': 'Food', 'date': '2024-04-02 09:00:00'},
+        {'amount': 40, 'type': 'expense', 'category': 'Food', 'date': 'yesterday'},
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result['success'] for result in body['results']] == [True, True, True, False]
+    dates = [row[0] for row in get_connection().execute('SELECT date FROM transactions ORDER BY id')]
+    assert dates == ['2024-03-30 09:00:00', '2024-04-01 08:00:00', '2024-04-02 09:00:00']
+
+
+def test_csv_import_normalizes_and_reports_rows(legacy_app):
+    csv = (b'Date,Description,Amount\n'
+           b'2024-01-31T09:30:00,ACME payroll,"2,000.00"\n'
+           b'2024-01-03,Grocery store,-12.50\n'
+           b'not a date,Coffee,-3\n'
+           b',Cinema,oops\n')
+
+    response = legacy_app.app.test_client().post('/api/transactions/import', data={
+        'user_id': '1', 'file': (io.BytesIO(csv), 'statement.csv')
+    }, content_type='multipart/form-data').get_json()
+
+    assert (response['rows_imported'], response['rows_rejected']) == (2, 2)
+    assert response['errors'] == [{'line': 4, 'error': 'invalid date'},
+                                  {'line': 5, 'error': 'invalid amount'}]
+    rows = get_connection().execute('SELECT date, type, amount FROM transactions ORDER BY date').fetchall()
+    assert rows == [('2024-01-03 00:00:00', 'expense', -12.5), ('2024-01-31 09:30:00', 'income', 2000.0)]
+    rollups = get_connection().execute('SELECT SUM(count) FROM monthly_rollups').fetchone()[0]
+    assert rollups == 2
+
+
+def test_transaction_frame_is_typed_and_filtered_in_sql(app):
+    from datetime import datetime
+    from app.banking.transaction_loader import load_transaction_frame
+    from app.models.transaction import Transaction
+    from app.models.user import db
+
+    with app.app_context():
+        db.session.add_all([
+            Transaction(user_id=1, amount=12.5, transaction_type='expense', category='Food',
+                        transaction_date=datetime(2024, 1, 3, 10, 0)),
+            Transaction(user_id=1, amount=2000.0, transaction_type='income', category='Salary',
+                        transaction_date=datetime(2024, 1, 31, 9, 0)),
+            Transaction(user_id=1, amount=40.0, transaction_type='expense', category='Transport',
+                        transaction_date=datetime(2024, 2, 1, 8, 0)),
+            Transaction(user_id=2, amount=99.0, transaction_type='expense', category='Food',
+                        transaction_date=datetime(2024, 1, 5)),
+        ])
+        db.session.flush()  # the loader reads inside the session's transaction
+
+        frame = load_transaction_frame(1)
+        assert sorted(frame['amount']) == [12.5, 40.0, 2000.0]
+        assert str(frame['id'].dtype) == 'int64' and str(frame['amount'].dtype) == 'float64'
+        assert str(frame['category'].dtype) == 'category'
+        assert frame['transaction_date'].min() == datetime(2024, 1, 3, 10, 0)
+
+        january = load_transaction_frame(1, columns=('amount', 'category'), transaction_type='expense',
+                                         start_date=datetime(2024, 1, 3, 10, 0),
+                                         end_date=datetime(2024, 2, 1, 8, 0))
+        assert january.to_dict('records') == [{'amount': 12.5, 'category': 'Food'}]
+
+        empty = load_transaction_frame(3)
+        assert len(empty) == 0
+        assert str(empty['amount'].dtype) == 'float64'
+        assert str(empty['transaction_date'].dtype).startswith('datetime64')
+        db.session.rollback()
+
+
+def test_csv_import_accepts_dates_with_different_offsets(legacy_app):
+    csv = (b'Date,Description,Amount\n'
+           b'2024-03-30T10:00:00+01:00,Grocery store,-10\n'
+           b'2024-04-01T10:00:00+02:00,Grocery store,-20\n')
+
+    response = legacy_app.app.test_client().post('/api/transactions/import', data={
+        'user_id': '1', 'file': (io.BytesIO(csv), 'statement.csv')
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    rows = get_connection().execute('SELECT date FROM transactions ORDER BY date').fetchall()
+    assert rows == [('2024-03-30 09:00:00',), ('2024-04-01 08:00:00',)]
+
+
+class FailingCategorizer:
+    """Categorizes everything as Other, but fails on one description"""
+
+    def __init__(self, failing):
+        self.failing = failing
+
+    def categorize_many(self, descriptions):
+        if self.failing in list(descriptions):
+            raise RuntimeError('categorizer unavailable')
+        return ['Other'] * len(descriptions)
+
+
+@pytest.fixture
+def raw_db(tmp_path):
+    from app.database.connection import connect
+    from app.database.migrations import migrate
+    from app.database.rollups import RAW_SCHEMA
+    from .test_migrations import RAW_TRANSACTIONS_DDL
+
+    conn = connect(str(tmp_path / 'finance.db'))
+    conn.execute(RAW_TRANSACTIONS_DDL)
+    migrate(conn, RAW_SCHEMA)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def statement(tmp_path):
+    csv = tmp_path / 'statement.csv'
+    csv.write_text('Date,Description,Amount\n'
+                   + ''.join(f'2024-01-{day:02d},Shop {day},-{day}\n' for day in range(1, 8)))
+    return str(csv)
+
+
+def test_failed_csv_import_reports_where_to_resume(raw_db, statement):
+    from app.banking.csv_importer import CSVImportError, CSVTransactionImporter
+
+    with pytest.raises(CSVImportError) as exc:
+        CSVTransactionImporter(FailingCategorizer('Shop 5'), chunk_size=2).import_file(raw_db, statement, 1)
+    summary = exc.value.summary
+    assert (summary['rows_imported'], summary['resume_line']) == (4, 6)
+
+    summary = CSVTransactionImporter(FailingCategorizer(None), chunk_size=2).import_file(
+        raw_db, statement, 1, start_line=summary['resume_line']
+    )
+    assert summary['rows_imported'] == 3
+    amounts = [row[0] for row in raw_db.execute('SELECT amount FROM transactions ORDER BY date')]
+    assert amounts == [-1.0, -2.0, -3.0, -4.0, -5.0, -6.0, -7.0]
+
+
+def index_names(conn):
+    return sorted(row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_transactions_%'"
+    ))
+
+
+def test_deferred_index_import_rebuilds_the_indexes(raw_db, statement):
+    from app.banking.csv_importer import CSVTransactionImporter
+    from app.database.migrations import check_query_plans
+    from app.database.rollups import RAW_SCHEMA, fetch_user_rollups
+    before = index_names(raw_db)
+
+    summary = CSVTransactionImporter(FailingCategorizer(None), chunk_size=2).import_file(
+        raw_db, statement, 1, defer_indexes=True
+    )
+
+    assert (summary['rows_imported'], summary['resume_line']) == (7, 9)
+    assert index_names(raw_db) == before
+    assert check_query_plans(raw_db, RAW_SCHEMA) == []
+    assert fetch_user_rollups(raw_db.execute, 1) == [('2024-01', 'expense', 'Other', -28.0, 7)]
+
+
+def test_failed_deferred_index_import_keeps_nothing(raw_db, statement):
+    from app.banking.csv_importer import CSVImportError, CSVTransactionImporter
+    before = index_names(raw_db)
+
+    with pytest.raises(CSVImportError) as exc:
+        CSVTransactionImporter(FailingCategorizer('Shop 5'), chunk_size=2).import_file(
+            raw_db, statement, 1, defer_indexes=True
+        )
+
+    assert (exc.value.summary['rows_imported'], exc.value.summary['resume_line']) == (0, 2)
+    assert index_names(raw_db) == before
+    assert raw_db.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] == 0
@@ -1,4 +1,4 @@
-import sqlite3
+from app.database.connection import get_connection, close_connection
 import pandas as pd
 from datetime import datetime
 
@@ -8,7 +8,7 @@ def view_database():
     
     try:
         # Connect to database
-        conn = sqlite3.connect('finance.db')
+        conn = get_connection()
         
         # View Users
         print("\n👥 USERS TABLE:")
@@ -69,7 +69,7 @@ def view_database():
             else:
                 print("⚠️ Warning: You're spending more than you earn.")
         
-        conn.close()
+        close_connection()
         
     except Exception as e:
         print(f"❌ Error: {e}")